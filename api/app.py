@@ -1,38 +1,58 @@
 """Core FastAPI application to requests
 """
 
+import asyncio
+import contextlib
 import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from routes import files, settings
+from models.file import FileMetadata
+from models.history import EncodeAttempt
+from models.setting import Setting
+from routes import files, jobs, maintenance, settings, transfer
+from utils.db import Connector
 from utils.logger import get_logger
-
-from api.models.file import FileMetadata
-from api.models.setting import Setting
+from utils.maintenance import run_periodically
 
 logger = get_logger(__name__)
 
 
 @asynccontextmanager
-async def lifespan():
+async def lifespan(_app: FastAPI):
     """Context manager to handle the lifespan of the application."""
 
+    # Connect once the app is configured, rather than when the models are imported
+    db = Connector()
+    db.connect()
+
     # Initialize tables as needed
     FileMetadata.create_tables()
     Setting.create_tables()
+    EncodeAttempt.create_tables()
+
+    # Archive, compact and checkpoint the database in the background
+    maintenance_task = asyncio.create_task(run_periodically())
 
     # Run application
     yield
 
     # Clean up any resources
     logger.debug("Shutting down the application.")
+    maintenance_task.cancel()
+    # Let a run in progress finish before its connection is closed
+    with contextlib.suppress(asyncio.CancelledError):
+        await maintenance_task
+    db.close()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(files.router)
 app.include_router(settings.router)
+app.include_router(maintenance.router)
+app.include_router(jobs.router)
+app.include_router(transfer.router)
 
 
 # Logging middleware
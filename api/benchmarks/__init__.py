@@ -0,0 +1 @@
+"""Benchmarks for the pyReel service."""
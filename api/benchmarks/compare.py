@@ -0,0 +1,92 @@
+"""Compares two benchmark reports and flags regressions.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+
+Exits with a non-zero status when any metric regressed by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+# Metrics where a larger value is better, everything else is a duration
+HIGHER_IS_BETTER = ("_per_sec", "fps")
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    """Flattens nested results into dotted metric names."""
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = float(value)
+    return metrics
+
+
+def compare(baseline: dict, candidate: dict, threshold: float = 0.1) -> list[dict]:
+    """Compares the metrics of two reports.
+
+    Args:
+        baseline (dict): The reference report.
+        candidate (dict): The report to check.
+        threshold (float): The relative change tolerated before flagging.
+
+    Returns:
+        list[dict]: One entry per metric present in both reports.
+    """
+    before = flatten(baseline["results"])
+    after = flatten(candidate["results"])
+
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        if before[name] == 0:
+            continue
+        change = (after[name] - before[name]) / before[name]
+        if name.endswith(HIGHER_IS_BETTER):
+            regressed = change < -threshold
+        elif name.endswith(("seconds", "_ms")):
+            regressed = change > threshold
+        else:
+            # Counts (rows, files) are context rather than performance
+            regressed = False
+        rows.append(
+            {
+                "metric": name,
+                "baseline": before[name],
+                "candidate": after[name],
+                "change": change,
+                "regressed": regressed,
+            },
+        )
+    return rows
+
+
+def main():
+    """Entry point for the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.candidate, encoding="utf-8") as handle:
+        candidate = json.load(handle)
+
+    rows = compare(baseline, candidate, args.threshold)
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else ""
+        print(
+            f"{row['metric']:<55} {row['baseline']:>14.3f} {row['candidate']:>14.3f}"
+            f" {row['change']:>+8.1%} {flag}",
+        )
+
+    sys.exit(1 if any(row["regressed"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
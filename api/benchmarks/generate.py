@@ -0,0 +1,120 @@
+"""Generators for synthetic libraries used by the benchmarks.
+
+Directory trees are filled with sparse placeholder files so that large libraries
+can be created quickly; real encodable clips are generated separately with
+create_test_video.
+"""
+
+import os
+import random
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov")
+OTHER_EXTENSIONS = (".srt", ".nfo", ".jpg", ".txt")
+
+
+def generate_tree(
+    root_dir: str,
+    files: int = 1000,
+    depth: int = 3,
+    fanout: int = 4,
+    video_ratio: float = 0.8,
+    min_size: int = 50 * 1024**2,
+    max_size: int = 4 * 1024**3,
+    seed: int = 0,
+) -> list[str]:
+    """Generates a nested directory tree of placeholder media files.
+
+    Args:
+        root_dir (str): The directory to generate the tree in.
+        files (int): The total number of files to create.
+        depth (int): The number of directory levels below the root.
+        fanout (int): The number of sub directories per directory.
+        video_ratio (float): The share of files with a video extension.
+        min_size (int): The smallest apparent file size in bytes.
+        max_size (int): The largest apparent file size in bytes.
+        seed (int): Seed so that trees are reproducible across runs.
+
+    Returns:
+        list[str]: The paths of the generated video files.
+    """
+    rng = random.Random(seed)
+
+    directories = [root_dir]
+    level = [root_dir]
+    for current_depth in range(depth):
+        level = [
+            os.path.join(parent, f"d{current_depth}_{index}")
+            for parent in level
+            for index in range(fanout)
+        ]
+        directories.extend(level)
+
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    videos = []
+    for index in range(files):
+        is_video = rng.random() < video_ratio
+        extension = rng.choice(VIDEO_EXTENSIONS if is_video else OTHER_EXTENSIONS)
+        file_path = os.path.join(rng.choice(directories), f"f{index:08d}{extension}")
+
+        # Sparse files report a realistic size without using disk space
+        with open(file_path, "wb") as handle:
+            handle.truncate(rng.randint(min_size, max_size))
+
+        if is_video:
+            videos.append(file_path)
+
+    return videos
+
+
+def create_test_video(
+    filepath: str,
+    duration: int = 5,
+    fps: int = 30,
+    width: int = 1280,
+    height: int = 720,
+    seed: int = 0,
+):
+    """Generates a video with motion, gradients and grain so encoders do real work.
+
+    Args:
+        filepath (str): the path to generate the test video.
+        duration (int): the length for the test video in seconds.
+        fps (int): the frames per second to generate for the video.
+        width (int): the number of pixels wide for the video.
+        height (int): the number of pixels high for the video.
+        seed (int): seed for the grain so clips are reproducible.
+    """
+    rng = np.random.default_rng(seed)
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    out = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
+
+    x_axis = np.linspace(0, 255, width, dtype=np.float32)
+    y_axis = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+
+    for frame_index in range(duration * fps):
+        shift = frame_index * 4
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (np.roll(x_axis, shift)[None, :] + y_axis * 0.5) % 256
+        frame[..., 1] = (y_axis + shift) % 256
+        frame[..., 2] = (np.roll(x_axis, -shift)[None, :] * 0.5 + y_axis) % 256
+
+        # Moving square and film grain
+        left = (shift * 3) % max(width - height // 4, 1)
+        cv2.rectangle(
+            frame,
+            (left, height // 3),
+            (left + height // 4, height // 2),
+            (255, 255, 255),
+            -1,
+        )
+        grain = rng.integers(-12, 12, size=frame.shape, dtype=np.int16)
+        frame = np.clip(frame.astype(np.int16) + grain, 0, 255).astype(np.uint8)
+
+        out.write(frame)
+
+    out.release()
@@ -0,0 +1,104 @@
+"""Measures the import time of the API and checks it against a budget.
+
+Every sample imports the module in a fresh interpreter with `-X importtime`,
+so the numbers match what a spawned worker pays before it can serve requests.
+The fastest sample is reported to keep noise from other processes out.
+
+Usage:
+    python -m benchmarks.imports --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Directory holding the app, the working directory of every sample
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import time allowed for the app, in milliseconds
+DEFAULT_BUDGET_MS = 1500
+
+# Modules that must only be imported once they are used
+DEFERRED_MODULES = ("ffmpeg", "pyarrow")
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Returns the self and cumulative microseconds of every imported module."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def sample(module: str) -> dict[str, tuple[int, int]]:
+    """Imports the module in a fresh interpreter and returns its import times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=API_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_imports(module: str = "app", repeat: int = 5, top: int = 10) -> dict:
+    """Measures the import time of a module.
+
+    Args:
+        module (str): The module to import.
+        repeat (int): The number of fresh interpreters sampled.
+        top (int): The number of slowest modules, by self time, to report.
+
+    Returns:
+        dict: The fastest total, the slowest modules of that sample and the
+            deferred modules that were imported anyway.
+    """
+    samples = [sample(module) for _ in range(max(repeat, 1))]
+    fastest = min(samples, key=lambda modules: modules[module][1])
+    slowest = sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        "module": module,
+        "total_ms": fastest[module][1] / 1000,
+        "modules": len(fastest),
+        "slowest_ms": {name: times[0] / 1000 for name, times in slowest[:top]},
+        "eager": [name for name in DEFERRED_MODULES if name in fastest],
+    }
+
+
+def main():
+    """Entry point for the import time benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    report = measure_imports(args.module, args.repeat)
+    report["budget_ms"] = args.budget_ms
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output)
+    print(output)
+
+    if report["eager"]:
+        print(f"Imported at startup: {', '.join(report['eager'])}", file=sys.stderr)
+        sys.exit(1)
+    if report["total_ms"] > args.budget_ms:
+        print(
+            f"Import time {report['total_ms']:.1f}ms exceeds {args.budget_ms:.0f}ms",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
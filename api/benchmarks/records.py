@@ -0,0 +1,72 @@
+"""Microbenchmark comparing FileMetadata and FileRecord for bulk reads.
+
+Usage:
+    python -m benchmarks.records --rows 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from models.file import FileMetadata, FileRecord
+from utils.db import Connector
+
+
+def populate(rows: int):
+    """Fill the files table with synthetic rows."""
+    FileMetadata.create_tables()
+    FileMetadata.save_records(
+        FileRecord.from_path(f"/library/show/{i:08d}.mkv", f"{i:08d}.mkv", i)
+        for i in range(rows)
+    )
+
+
+def measure(name: str, load) -> dict:
+    """Measure rows/sec and retained bytes/row for a loader."""
+    gc.collect()
+    start = time.perf_counter()
+    rows = load()
+    elapsed = time.perf_counter() - start
+
+    del rows
+    gc.collect()
+    tracemalloc.start()
+    rows = load()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "rows": len(rows),
+        "rows_per_sec": len(rows) / elapsed,
+        "bytes_per_row": retained / len(rows),
+    }
+
+
+def run(rows: int) -> list[dict]:
+    """Run the benchmark and return the results."""
+    populate(rows)
+    results = [
+        measure("FileMetadata", FileMetadata.get_all_files),
+        measure("FileRecord", FileMetadata.get_all_records),
+    ]
+    Connector().close()
+    return results
+
+
+def main():
+    """Entry point for the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for result in run(args.rows):
+        print(
+            f"{result['name']:<14} {result['rows_per_sec']:>12,.0f} rows/s"
+            f" {result['bytes_per_row']:>8,.0f} bytes/row",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Benchmark suite for the scan, database and conversion pipelines.
+
+Results are written as JSON so they can be compared across commits with
+benchmarks.compare.
+
+Usage:
+    python -m benchmarks.run --files 5000 --output bench.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.generate import create_test_video, generate_tree
+from benchmarks.imports import measure_imports
+from models.file import FileMetadata
+from models.setting import Setting
+from routes.files import check_file_status
+from utils import transfer
+from utils.convert import VideoProcessor
+from utils.db import Connector
+from utils.scan import ScanDirectory
+
+
+def git_commit() -> str:
+    """Returns the current git commit, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def latency(func, *args, repeat: int = 20) -> dict:
+    """Measures the latency of a call in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max_ms": samples[-1],
+    }
+
+
+def bench_scan(root_dir: str) -> tuple[dict, ScanDirectory]:
+    """Measures the directory scan rate."""
+    start = time.perf_counter()
+    scan = ScanDirectory(root_dir)
+    elapsed = time.perf_counter() - start
+    found = len(scan.get_files())
+    return {"files": found, "seconds": elapsed, "files_per_sec": found / elapsed}, scan
+
+
+def bench_upsert(scan: ScanDirectory) -> dict:
+    """Measures the rate of bulk inserts and replaces."""
+    records = scan.get_files()
+
+    start = time.perf_counter()
+    FileMetadata.save_records(records, only_new=True)
+    insert_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    FileMetadata.save_records(records)
+    replace_elapsed = time.perf_counter() - start
+
+    return {
+        "rows": len(records),
+        "insert_rows_per_sec": len(records) / insert_elapsed,
+        "replace_rows_per_sec": len(records) / replace_elapsed,
+    }
+
+
+def bench_queries(sample_path: str, repeat: int) -> dict:
+    """Measures the latency of each FileMetadata accessor."""
+    return {
+        "check_if_file_exists": latency(
+            FileMetadata.check_if_file_exists,
+            sample_path,
+            repeat=repeat,
+        ),
+        "get_file_by_path": latency(
+            FileMetadata.get_file_by_path,
+            sample_path,
+            repeat=repeat,
+        ),
+        "get_all_files": latency(FileMetadata.get_all_files, repeat=repeat),
+        "get_all_records": latency(FileMetadata.get_all_records, repeat=repeat),
+        "get_files_by_converted_status": latency(
+            FileMetadata.get_files_by_converted_status,
+            False,
+            repeat=repeat,
+        ),
+        "get_files_by_processed_status": latency(
+            FileMetadata.get_files_by_processed_status,
+            False,
+            repeat=repeat,
+        ),
+        "get_count": latency(FileMetadata.get_count, repeat=repeat),
+        "file_size_saved": latency(FileMetadata.file_size_saved, repeat=repeat),
+        "percentage_saved": latency(FileMetadata.percentage_saved, repeat=repeat),
+    }
+
+
+def bench_transfer() -> dict:
+    """Measures exporting the files table as gzip NDJSON and importing it back."""
+    start = time.perf_counter()
+    export = b"".join(transfer.export_table("files"))
+    export_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = transfer.import_table("files", io.BytesIO(export))
+    import_elapsed = time.perf_counter() - start
+
+    return {
+        "rows": rows,
+        "bytes": len(export),
+        "export_rows_per_sec": rows / export_elapsed,
+        "import_rows_per_sec": rows / import_elapsed,
+    }
+
+
+def bench_check() -> dict:
+    """Measures the time to reconcile the table with the filesystem."""
+    start = time.perf_counter()
+    changed = check_file_status()
+    return {"seconds": time.perf_counter() - start, "changed": len(changed)}
+
+
+def bench_encode(work_dir: str, duration: int, width: int, height: int) -> dict:
+    """Measures the encode speed on a generated clip."""
+    if shutil.which("ffmpeg") is None:
+        return {"skipped": "ffmpeg not found"}
+
+    fps = 30
+    video_path = os.path.join(work_dir, "encode.mp4")
+    create_test_video(
+        video_path,
+        duration=duration,
+        fps=fps,
+        width=width,
+        height=height,
+    )
+
+    processor = VideoProcessor(input_file=video_path)
+    start = time.perf_counter()
+    succeeded = processor.convert_to_h265()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "succeeded": succeeded,
+        "seconds": elapsed,
+        "fps": duration * fps / elapsed,
+        "resolution": f"{width}x{height}",
+    }
+
+
+def run(
+    files: int = 1000,
+    depth: int = 3,
+    fanout: int = 4,
+    repeat: int = 20,
+    encode_seconds: int = 5,
+    encode_width: int = 1280,
+    encode_height: int = 720,
+) -> dict:
+    """Runs every benchmark against a temporary library and database."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        library = os.path.join(work_dir, "library")
+        videos = generate_tree(library, files=files, depth=depth, fanout=fanout)
+
+        # Use an on-disk database so that results include real I/O, restoring
+        # the caller's database afterwards
+        previous_db_path = os.environ.get("DB_PATH")
+        Connector().close()
+        os.environ["DB_PATH"] = os.path.join(work_dir, "bench.db")
+        Connector()
+        FileMetadata.create_tables()
+        Setting.create_tables()
+
+        try:
+            scan_results, scan = bench_scan(library)
+            results = {
+                "scan": scan_results,
+                "upsert": bench_upsert(scan),
+                "queries": bench_queries(videos[len(videos) // 2], repeat),
+                "check": bench_check(),
+                "transfer": bench_transfer(),
+                "imports": measure_imports(repeat=min(repeat, 5), top=0),
+            }
+            if encode_seconds > 0:
+                results["encode"] = bench_encode(
+                    work_dir,
+                    encode_seconds,
+                    encode_width,
+                    encode_height,
+                )
+        finally:
+            Connector().close()
+            if previous_db_path is None:
+                os.environ.pop("DB_PATH")
+            else:
+                os.environ["DB_PATH"] = previous_db_path
+            Connector()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": {
+            "files": files,
+            "depth": depth,
+            "fanout": fanout,
+            "repeat": repeat,
+            "encode_seconds": encode_seconds,
+        },
+        "results": results,
+    }
+
+
+def main():
+    """Entry point for the benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--encode-seconds",
+        type=int,
+        default=5,
+        help="Length of the encode clip, 0 to skip",
+    )
+    parser.add_argument("--encode-width", type=int, default=1280)
+    parser.add_argument("--encode-height", type=int, default=720)
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    args = parser.parse_args()
+
+    report = run(
+        files=args.files,
+        depth=args.depth,
+        fanout=args.fanout,
+        repeat=args.repeat,
+        encode_seconds=args.encode_seconds,
+        encode_width=args.encode_width,
+        encode_height=args.encode_height,
+    )
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
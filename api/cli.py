@@ -0,0 +1,92 @@
+"""Command line tools for the library index.
+
+Exports and imports the files, files_archive, settings and encode_history
+tables without going through the API, e.g. to move the index to another host
+or analyse it offline. Move all four when migrating, or archived files are
+rescanned as new and the encode tuning starts over. The format follows the
+file extension: `.parquet` (needs pyarrow) or gzip NDJSON.
+
+Usage:
+    python cli.py export files files.parquet
+    python cli.py import files files.parquet
+"""
+
+import argparse
+import sys
+
+from models.file import FileMetadata
+from models.history import EncodeAttempt
+from models.setting import Setting
+from utils import transfer
+from utils.db import Connector
+
+
+def export_command(args: argparse.Namespace) -> int:
+    """Writes a table to a file."""
+    file_format = args.format or transfer.format_for_path(args.path)
+    written = 0
+    with open(args.path, "wb") as handle:
+        for data in transfer.export_table(args.table, file_format):
+            written += handle.write(data)
+    print(f"Exported {args.table} to {args.path} ({written} bytes)")
+    return 0
+
+
+def import_command(args: argparse.Namespace) -> int:
+    """Writes a file into a table."""
+    file_format = args.format or transfer.format_for_path(args.path)
+    with open(args.path, "rb") as handle:
+        imported = transfer.import_table(
+            args.table,
+            handle,
+            file_format,
+            chunk_size=args.chunk_size,
+        )
+    print(f"Imported {imported} rows into {args.table} from {args.path}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point for the command line tools."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, func, help_text in (
+        ("export", export_command, "Write a table to a file"),
+        ("import", import_command, "Write a file into a table"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("table", choices=sorted(transfer.TABLES))
+        command.add_argument("path")
+        command.add_argument(
+            "--format",
+            choices=("ndjson", "parquet"),
+            help="Defaults to the format of the file extension",
+        )
+        command.set_defaults(func=func)
+    commands.choices["import"].add_argument(
+        "--chunk-size",
+        type=int,
+        default=transfer.CHUNK_SIZE,
+        help="Rows written per transaction",
+    )
+    args = parser.parse_args(argv)
+
+    Connector().connect()
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    EncodeAttempt.create_tables()
+    try:
+        return args.func(args)
+    except (ValueError, ImportError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        Connector().close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
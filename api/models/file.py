@@ -1,6 +1,9 @@
 """This module contains the class definition for the various models used in the application."""
 
 import hashlib
+import os
+import time
+from collections.abc import Iterable, Iterator
 
 from pydantic import BaseModel
 from utils.db import Connector
@@ -11,6 +14,24 @@ logger = get_logger(__name__)
 # Static instance of the database connector
 db = Connector()
 
+# Number of rows fetched from sqlite per round trip when streaming records
+FETCH_SIZE = 10_000
+
+
+def file_id_for_path(file_path: str) -> str:
+    """Returns the stable identifier for a file path."""
+    return hashlib.sha256(file_path.encode()).hexdigest()
+
+
+def path_prefix_range(directory: str) -> tuple[str, str]:
+    """Returns the bounds of the file paths under a directory.
+
+    Used as `file_path >= ? AND file_path < ?`, so the lookup is a range scan
+    on the file path index instead of a LIKE over every row.
+    """
+    prefix = directory.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
 
 class FileMetadata(BaseModel):
     """Representation of a file's metadata."""
@@ -23,11 +44,22 @@ class FileMetadata(BaseModel):
     deleted: bool = False
     converted: bool = False
     processed: bool = False
+    ssim: float = 0.0
+    psnr: float = 0.0
+    vmaf: float = 0.0
+    video_codec: str = ""
+    width: int = 0
+    height: int = 0
+    duration: float = 0.0
+    bit_rate: int = 0
+    encode_seconds: float = 0.0
+    updated_at: float = 0.0
 
     def __init__(self, **data):
         """Post-initialization to set up additional attributes."""
-        data["current_size"] = data.get("initial_size", 0)
-        data["file_id"] = hashlib.sha256(data["file_path"].encode()).hexdigest()
+        data.setdefault("current_size", data.get("initial_size", 0))
+        if not data.get("file_id"):
+            data["file_id"] = file_id_for_path(data["file_path"])
         super().__init__(**data)
 
     def __str__(self) -> str:
@@ -37,98 +69,183 @@ class FileMetadata(BaseModel):
             f"{self.deleted}, {self.converted}, {self.processed})"
         )
 
+    def to_record(self) -> "FileRecord":
+        """Returns the compact record representation of this file."""
+        return FileRecord(*(getattr(self, column) for column in FILE_COLUMNS))
+
     def save(self):
         """Save the file metadata to the database, and on conflict, update the existing record."""
+        self.updated_at = time.time()
         db.execute(
+            f"""
+            INSERT OR REPLACE INTO files ({", ".join(FILE_COLUMNS)})
+            VALUES ({", ".join("?" * len(FILE_COLUMNS))})
+            """,
+            self.to_record().as_tuple(),
+        )
+        logger.info(f"Saved file metadata: {self.file_path}")
+
+    @staticmethod
+    def save_records(records: Iterable["FileRecord"], only_new: bool = False) -> int:
+        """Saves many records in a single transaction.
+
+        Args:
+            records (Iterable[FileRecord]): The records to write.
+            only_new (bool): Skip records whose file path is already tracked,
+                or was archived after it finished, instead of replacing the
+                existing row.
+
+        Returns:
+            int: The number of records handed to the database.
+        """
+        columns = ", ".join(FILE_COLUMNS)
+        placeholders = ", ".join("?" * len(FILE_COLUMNS))
+        # updated_at is the last column, stamped on the way in
+        updated_at = time.time()
+        if only_new:
+            sql = f"""
+                INSERT OR IGNORE INTO files ({columns})
+                SELECT {placeholders}
+                WHERE NOT EXISTS (SELECT 1 FROM files WHERE file_path = ?)
+                AND NOT EXISTS (
+                    SELECT 1 FROM files_archive WHERE file_path = ? AND deleted = 0
+                )
             """
-            INSERT OR REPLACE INTO files (
-                file_id, file_name, file_path, initial_size,
-                current_size, deleted, converted, processed
+            params = [
+                record.as_tuple()[:-1]
+                + (updated_at, record.file_path, record.file_path)
+                for record in records
+            ]
+        else:
+            sql = f"INSERT OR REPLACE INTO files ({columns}) VALUES ({placeholders})"
+            params = [record.as_tuple()[:-1] + (updated_at,) for record in records]
+
+        db.executemany(sql, params)
+        logger.info(f"Saved {len(params)} file records")
+        return len(params)
+
+    @staticmethod
+    def iter_records(where: str = "", params: tuple = ()) -> Iterator["FileRecord"]:
+        """Streams rows of the files table as FileRecord objects.
+
+        Args:
+            where (str): Optional SQL condition (without the WHERE keyword).
+            params (tuple): Parameters bound to the condition.
+        """
+        sql = f"SELECT {', '.join(FILE_COLUMNS)} FROM files"
+        if where:
+            sql += f" WHERE {where}"
+        cursor = db.query(sql, params)
+        from_row = FileRecord.from_row
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for row in rows:
+                yield from_row(row)
+
+    @staticmethod
+    def get_all_records() -> list["FileRecord"]:
+        """Returns all the files from the database as records."""
+        return list(FileMetadata.iter_records())
+
+    @staticmethod
+    def get_records_by_converted_status(
+        converted: bool,
+        deleted: bool = False,
+    ) -> list["FileRecord"]:
+        """Returns the file records based on the converted status."""
+        return list(
+            FileMetadata.iter_records(
+                "converted = ? AND deleted = ?",
+                (converted, deleted),
+            ),
+        )
+
+    @staticmethod
+    def get_outcome_stats() -> list[dict]:
+        """Returns the size and encode time outcomes of processed files by source codec.
+
+        Archived files are included so the history outlives the retention policy.
+        """
+        cursor = db.execute(
+            f"""
+            SELECT
+                video_codec,
+                COUNT(*),
+                SUM(initial_size),
+                SUM(current_size),
+                SUM(encode_seconds),
+                SUM(CASE WHEN width > 0 THEN width * height * duration ELSE 0 END),
+                SUM(CASE WHEN width > 0 THEN encode_seconds ELSE 0 END)
+            FROM (
+                SELECT {OUTCOME_COLUMNS} FROM files
+                UNION ALL
+                SELECT {OUTCOME_COLUMNS} FROM files_archive
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            WHERE processed = 1
+            AND encode_seconds > 0
+            GROUP BY video_codec
             """,
-            (
-                self.file_id,
-                self.file_name,
-                self.file_path,
-                self.initial_size,
-                self.current_size,
-                self.deleted,
-                self.converted,
-                self.processed,
-            ),
         )
-        logger.info(f"Saved file metadata: {self.file_path}")
+        return [
+            {
+                "video_codec": row[0],
+                "count": row[1],
+                "initial_size": row[2],
+                "current_size": row[3],
+                "encode_seconds": row[4],
+                "pixel_seconds": row[5],
+                "pixel_encode_seconds": row[6],
+            }
+            for row in cursor.fetchall()
+        ]
 
     @staticmethod
     def check_if_file_exists(file_path: str) -> bool:
-        """Checks if the file exists in the database."""
+        """Checks if the file exists in the database, including archived finished files."""
         cursor = db.execute(
             """
-            SELECT COUNT(*)
-            FROM files
-            WHERE file_path = ?
+            SELECT
+                EXISTS (SELECT 1 FROM files WHERE file_path = ?)
+                + EXISTS (
+                    SELECT 1 FROM files_archive WHERE file_path = ? AND deleted = 0
+                )
             """,
-            (file_path,),
+            (file_path, file_path),
         )
         count = cursor.fetchone()[0]
         does_exist = count > 0
         logger.info(f"File exists: {file_path} => {does_exist}")
         return does_exist
 
+    @staticmethod
+    def get_file_by_id(file_id: str):
+        """Returns the file metadata by the file id."""
+        record = next(FileMetadata.iter_records("file_id = ?", (file_id,)), None)
+        return record.to_metadata() if record else None
+
     @staticmethod
     def get_file_by_path(file_path: str):
         """Returns the file metadata by the file path."""
-        cursor = db.execute(
-            """
-            SELECT *
-            FROM files
-            WHERE file_path = ?
-            """,
-            (file_path,),
-        )
-        row = cursor.fetchone()
-        if row:
+        record = next(FileMetadata.iter_records("file_path = ?", (file_path,)), None)
+        if record:
             logger.info(f"Found file by path: {file_path}")
-            return FileMetadata(
-                **dict(zip([column[0] for column in cursor.description], row)),
-            )
+            return record.to_metadata()
         logger.info(f"File not found by path: {file_path}")
         return None
 
     @staticmethod
     def get_all_files():
         """Returns all the files from the database."""
-        cursor = db.execute("SELECT * FROM files")
-        rows = cursor.fetchall()
-        # Convert the rows to FileMetadata objects (using column names)
-        rows = [
-            FileMetadata(
-                **dict(zip([column[0] for column in cursor.description], row)),
-            )
-            for row in rows
-        ]
-        return rows
+        return [record.to_metadata() for record in FileMetadata.iter_records()]
 
     @staticmethod
     def get_files_by_converted_status(converted: bool, deleted: bool = False):
         """Returns the files based on the converted status."""
-        cursor = db.execute(
-            """
-            SELECT *
-            FROM files
-            WHERE converted = ?
-            AND deleted = ?
-            """,
-            (converted, deleted),
-        )
-        rows = cursor.fetchall()
-        # Convert the rows to FileMetadata objects (using column names)
         rows = [
-            FileMetadata(
-                **dict(zip([column[0] for column in cursor.description], row)),
+            record.to_metadata()
+            for record in FileMetadata.get_records_by_converted_status(
+                converted,
+                deleted,
             )
-            for row in rows
         ]
         logger.info(f"Found {len(rows)} files by converted status: {converted}")
         return rows
@@ -136,22 +253,12 @@ class FileMetadata(BaseModel):
     @staticmethod
     def get_files_by_processed_status(processed: bool, deleted: bool = False):
         """Returns the files based on the processed status."""
-        cursor = db.execute(
-            """
-            SELECT *
-            FROM files
-            WHERE processed = ?
-            AND deleted = ?
-            """,
-            (processed, deleted),
-        )
-        rows = cursor.fetchall()
-        # Convert the rows to FileMetadata objects (using column names)
         rows = [
-            FileMetadata(
-                **dict(zip([column[0] for column in cursor.description], row)),
+            record.to_metadata()
+            for record in FileMetadata.iter_records(
+                "processed = ? AND deleted = ?",
+                (processed, deleted),
             )
-            for row in rows
         ]
         logger.info(f"Found {len(rows)} files by processed status: {processed}")
         return rows
@@ -166,8 +273,14 @@ class FileMetadata(BaseModel):
 
     @staticmethod
     def file_size_saved():
-        """Returns the total file size saved by the conversion."""
-        cursor = db.execute("SELECT SUM(initial_size - current_size) FROM files")
+        """Returns the total file size saved by the conversion, including archived files."""
+        cursor = db.execute(
+            """
+            SELECT
+                (SELECT TOTAL(initial_size - current_size) FROM files)
+                + (SELECT TOTAL(initial_size - current_size) FROM files_archive)
+            """,
+        )
         saved = cursor.fetchone()[0]
         logger.info(f"Total space saved: {saved}")
         return saved
@@ -176,11 +289,54 @@ class FileMetadata(BaseModel):
     def percentage_saved():
         """Returns the percentage of space saved by the conversion."""
         saved = FileMetadata.file_size_saved()
-        cursor = db.execute("SELECT SUM(initial_size) FROM files")
+        cursor = db.execute(
+            """
+            SELECT
+                (SELECT TOTAL(initial_size) FROM files)
+                + (SELECT TOTAL(initial_size) FROM files_archive)
+            """,
+        )
         total = cursor.fetchone()[0]
         logger.info(f"Percentage space saved: {(saved / total) * 100}")
         return (saved / total) * 100
 
+    @staticmethod
+    def archive_records(where: str, params: tuple = ()) -> int:
+        """Moves matching rows of the files table into the archive.
+
+        Args:
+            where (str): SQL condition (without the WHERE keyword) selecting the rows.
+            params (tuple): Parameters bound to the condition.
+
+        Returns:
+            int: The number of rows archived.
+        """
+        columns = ", ".join(ARCHIVE_COLUMNS)
+        _, deleted = db.transaction(
+            [
+                (
+                    f"""
+                    INSERT OR REPLACE INTO files_archive ({columns}, archived_at)
+                    SELECT {columns}, ? FROM files WHERE {where}
+                    """,
+                    (time.time(), *params),
+                ),
+                (f"DELETE FROM files WHERE {where}", params),
+            ],
+        )
+        logger.info(f"Archived {deleted} files")
+        return deleted
+
+    @staticmethod
+    def purge_archive(archived_before: float) -> int:
+        """Deletes archived rows older than a timestamp, returning how many were removed."""
+        cursor = db.execute(
+            "DELETE FROM files_archive WHERE archived_at < ?",
+            (archived_before,),
+        )
+        logger.info(f"Purged {cursor.rowcount} archived files")
+        return cursor.rowcount
+
     @staticmethod
     def create_tables():
         """Creates the tables if they don't exist, based on the FileMetadata model."""
@@ -204,4 +360,195 @@ class FileMetadata(BaseModel):
         ddl = ddl.replace("file_id string", "file_id string PRIMARY KEY")
 
         db.execute(ddl)
+
+        # Add columns introduced after the table was first created
+        existing = {
+            row[1] for row in db.execute("PRAGMA table_info('files')").fetchall()
+        }
+        for column in schema["properties"]:
+            if column not in existing:
+                column_type = schema["properties"][column]["type"]
+                default = schema["properties"][column].get("default")
+                if isinstance(default, bool):
+                    default = int(default)
+                db.execute(
+                    f"ALTER TABLE files ADD COLUMN {column} {column_type}"
+                    f" DEFAULT {default!r}",
+                )
+                logger.info(f"Added column to files: {column}")
+
+        # Lookups by path back the scan de-duplication and single file processing
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_files_file_path ON files (file_path)",
+        )
+
+        # Bulk selections filter by size range and codec
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_files_initial_size ON files (initial_size)",
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_files_video_codec ON files (video_codec)",
+        )
+
+        # Compact history of deleted and long finished files moved out of files
+        db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS files_archive (
+                {', '.join(
+                    f"{column} {schema['properties'][column]['type']}"
+                    for column in ARCHIVE_COLUMNS
+                )},
+                archived_at number,
+                PRIMARY KEY (file_id)
+            ) WITHOUT ROWID
+            """,
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_files_archive_file_path"
+            " ON files_archive (file_path)",
+        )
         logger.info("Created tables for FileMetadata")
+
+
+# Column order shared by the files table, FileRecord and bulk statements
+FILE_COLUMNS = tuple(FileMetadata.model_fields)
+
+# Columns kept for archived files, enough for savings totals and outcome history
+ARCHIVE_COLUMNS = (
+    "file_id",
+    "file_path",
+    "initial_size",
+    "current_size",
+    "deleted",
+    "converted",
+    "processed",
+    "video_codec",
+    "width",
+    "height",
+    "duration",
+    "encode_seconds",
+    "updated_at",
+)
+
+# Columns read by the outcome statistics from both tables
+OUTCOME_COLUMNS = ", ".join(
+    (
+        "video_codec",
+        "initial_size",
+        "current_size",
+        "encode_seconds",
+        "processed",
+        "width",
+        "height",
+        "duration",
+    ),
+)
+
+
+class FileRecord:
+    """Compact representation of a row in the files table.
+
+    Bulk paths (listing, reconciliation and scanning) work on these instead of
+    FileMetadata to skip Pydantic validation and hashing per row. Convert with
+    to_metadata() at the API boundary.
+    """
+
+    __slots__ = FILE_COLUMNS
+
+    def __init__(
+        self,
+        file_id: str,
+        file_name: str,
+        file_path: str,
+        initial_size: int,
+        current_size: int,
+        deleted: bool = False,
+        converted: bool = False,
+        processed: bool = False,
+        ssim: float = 0.0,
+        psnr: float = 0.0,
+        vmaf: float = 0.0,
+        video_codec: str = "",
+        width: int = 0,
+        height: int = 0,
+        duration: float = 0.0,
+        bit_rate: int = 0,
+        encode_seconds: float = 0.0,
+        updated_at: float = 0.0,
+    ):
+        self.file_id = file_id
+        self.file_name = file_name
+        self.file_path = file_path
+        self.initial_size = initial_size
+        self.current_size = current_size
+        self.deleted = deleted
+        self.converted = converted
+        self.processed = processed
+        self.ssim = ssim
+        self.psnr = psnr
+        self.vmaf = vmaf
+        self.video_codec = video_codec
+        self.width = width
+        self.height = height
+        self.duration = duration
+        self.bit_rate = bit_rate
+        self.encode_seconds = encode_seconds
+        self.updated_at = updated_at
+
+    def __repr__(self) -> str:
+        return f"FileRecord({', '.join(repr(value) for value in self.as_tuple())})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FileRecord) and self.as_tuple() == other.as_tuple()
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "FileRecord":
+        """Builds a record from a row selected in FILE_COLUMNS order."""
+        record = cls.__new__(cls)
+        (
+            record.file_id,
+            record.file_name,
+            record.file_path,
+            record.initial_size,
+            record.current_size,
+            deleted,
+            converted,
+            processed,
+            record.ssim,
+            record.psnr,
+            record.vmaf,
+            record.video_codec,
+            record.width,
+            record.height,
+            record.duration,
+            record.bit_rate,
+            record.encode_seconds,
+            record.updated_at,
+        ) = row
+        record.deleted = bool(deleted)
+        record.converted = bool(converted)
+        record.processed = bool(processed)
+        return record
+
+    @classmethod
+    def from_path(cls, file_path: str, file_name: str, file_size: int) -> "FileRecord":
+        """Builds a record for a newly discovered file."""
+        return cls(
+            file_id_for_path(file_path),
+            file_name,
+            file_path,
+            file_size,
+            file_size,
+        )
+
+    def as_tuple(self) -> tuple:
+        """Returns the values in FILE_COLUMNS order."""
+        return tuple(getattr(self, column) for column in FILE_COLUMNS)
+
+    def as_dict(self) -> dict:
+        """Returns the values keyed by column name."""
+        return {column: getattr(self, column) for column in FILE_COLUMNS}
+
+    def to_metadata(self) -> FileMetadata:
+        """Converts the record to the Pydantic model used by the API."""
+        return FileMetadata(**self.as_dict())
@@ -0,0 +1,187 @@
+"""This module contains the history of encode attempts, one row per processed file attempt."""
+
+from pydantic import BaseModel
+from utils.db import Connector
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Static instance of the database connector
+db = Connector()
+
+# Upper bounds of the resolution buckets, by frame height
+RESOLUTION_BUCKETS = ((480, "sd"), (720, "720p"), (1080, "1080p"), (1440, "1440p"))
+
+# Lower bounds of the bit rate buckets, in Mb/s
+BITRATE_BUCKETS = (32, 16, 8, 4, 2, 0)
+
+
+def resolution_bucket(height: int) -> str:
+    """Returns the resolution bucket of a frame height."""
+    if not height:
+        return "unknown"
+    for max_height, bucket in RESOLUTION_BUCKETS:
+        if height <= max_height:
+            return bucket
+    return "2160p"
+
+
+def bitrate_bucket(bit_rate: int) -> int:
+    """Returns the bit rate bucket, the lower bound in Mb/s, of a bit rate."""
+    megabits = bit_rate / 1_000_000
+    return next(bucket for bucket in BITRATE_BUCKETS if megabits >= bucket)
+
+
+class EncodeAttempt(BaseModel):
+    """An attempt at processing a file, kept to tune future encodes.
+
+    Args:
+        file_id (str): The file that was processed.
+        file_path (str): The path of the source at the time.
+        started_at (float): Unix time the attempt started.
+        mode (str): encode or remux.
+        crf (int): The x265 CRF, 0 for remuxes.
+        preset (str): The x265 preset, empty for remuxes.
+        source_codec (str): The video codec of the source.
+        resolution (str): The resolution bucket of the source.
+        bitrate (int): The bit rate bucket of the source in Mb/s.
+        input_size (int): The size of the source.
+        output_size (int): The size of the output, 0 if it was rejected.
+        encode_seconds (float): Wall time of ffmpeg.
+        cpu_seconds (float): CPU time of ffmpeg.
+        fps (float): Frames processed per second.
+        ssim (float): The sampled SSIM of the output.
+        psnr (float): The sampled PSNR of the output.
+        vmaf (float): The sampled VMAF of the output.
+        verified (bool): The output passed verification.
+        converted (bool): The output replaced the source.
+    """
+
+    file_id: str
+    file_path: str
+    started_at: float
+    mode: str
+    crf: int = 0
+    preset: str = ""
+    source_codec: str = ""
+    resolution: str = "unknown"
+    bitrate: int = 0
+    input_size: int = 0
+    output_size: int = 0
+    encode_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    fps: float = 0.0
+    ssim: float = 0.0
+    psnr: float = 0.0
+    vmaf: float = 0.0
+    verified: bool = False
+    converted: bool = False
+
+    def save(self):
+        """Appends the attempt to the history."""
+        columns = tuple(EncodeAttempt.model_fields)
+        db.execute(
+            f"""
+            INSERT INTO encode_history ({", ".join(columns)})
+            VALUES ({", ".join("?" * len(columns))})
+            """,
+            tuple(getattr(self, column) for column in columns),
+        )
+        logger.info(f"Saved encode attempt: {self.file_path}")
+
+    @staticmethod
+    def get_attempts(file_id: str) -> list["EncodeAttempt"]:
+        """Returns the attempts at processing a file, oldest first."""
+        columns = tuple(EncodeAttempt.model_fields)
+        cursor = db.execute(
+            f"""
+            SELECT {", ".join(columns)} FROM encode_history
+            WHERE file_id = ?
+            ORDER BY started_at
+            """,
+            (file_id,),
+        )
+        return [EncodeAttempt(**dict(zip(columns, row))) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_profile_stats(
+        source_codec: str,
+        resolution: str,
+        bitrate: int,
+    ) -> list[dict]:
+        """Returns the outcomes of the x265 profiles tried on similar sources.
+
+        Rejected outputs count as saving nothing, so profiles that fail
+        verification are penalised for the time they spent.
+        """
+        cursor = db.execute(
+            """
+            SELECT
+                crf,
+                preset,
+                COUNT(*),
+                SUM(CASE WHEN converted = 1 THEN input_size - output_size ELSE 0 END),
+                SUM(CASE WHEN cpu_seconds > 0 THEN cpu_seconds ELSE encode_seconds END)
+            FROM encode_history
+            WHERE mode = 'encode'
+            AND source_codec = ?
+            AND resolution = ?
+            AND bitrate = ?
+            GROUP BY crf, preset
+            """,
+            (source_codec, resolution, bitrate),
+        )
+        return [
+            {
+                "crf": row[0],
+                "preset": row[1],
+                "attempts": row[2],
+                "saved": row[3],
+                "cpu_seconds": row[4],
+            }
+            for row in cursor.fetchall()
+        ]
+
+    @staticmethod
+    def purge(started_before: float) -> int:
+        """Deletes attempts older than a timestamp, returning how many were removed."""
+        cursor = db.execute(
+            "DELETE FROM encode_history WHERE started_at < ?",
+            (started_before,),
+        )
+        logger.info(f"Purged {cursor.rowcount} encode attempts")
+        return cursor.rowcount
+
+    @staticmethod
+    def create_tables():
+        """Creates the tables if they don't exist, based on the EncodeAttempt model."""
+
+        # Uses the EncodeAttempt model to create a schema dict for the table creation
+        schema = EncodeAttempt.model_json_schema()
+
+        ddl: str = f"""
+        CREATE TABLE IF NOT EXISTS encode_history (
+            attempt_id integer PRIMARY KEY,
+            {', '.join(
+                    [
+                        f"{column} {schema['properties'][column]['type']}"
+                        for column in schema['properties'].keys()
+                    ]
+                )
+            }
+        )
+        """
+        db.execute(ddl)
+
+        # The tuner looks up the attempts on similar sources
+        db.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_encode_history_source
+            ON encode_history (source_codec, resolution, bitrate)
+            """,
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_encode_history_file_id"
+            " ON encode_history (file_id)",
+        )
+        logger.info("Created tables for encode history")
@@ -1,5 +1,7 @@
 """This module contains the class definition for the various models used in the application."""
 
+from typing import ClassVar
+
 from pydantic import BaseModel
 from utils.db import Connector
 from utils.logger import get_logger
@@ -46,9 +48,17 @@ class Setting(BaseModel):
         values = cursor.fetchall()
         settings = []
         for value in values:
-            settings.append({"key": value[0], "value": value[1]})
+            settings.append({"key": value[0], "value": str(value[1])})
         return settings
 
+    @staticmethod
+    def get_value(key: str, default: str | None = None) -> str | None:
+        """Return the value of a single setting, or the default if it is not set."""
+        cursor = db.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        # The column has numeric affinity, so numbers come back as int or float
+        return str(row[0]) if row else default
+
     @staticmethod
     def create_tables():
         """Creates the tables if they don't exist, based on the Setting model."""
@@ -73,3 +83,27 @@ class Setting(BaseModel):
 
         db.execute(ddl)
         logger.info("Created tables for settings")
+
+
+class SettingsGroup(BaseModel):
+    """Base class for a typed group of settings stored in the settings table.
+
+    Subclasses declare their fields with defaults and a key prefix; load() reads
+    the stored overrides (e.g. `quality_min_ssim` for the `min_ssim` field) and
+    lets Pydantic coerce the stored strings to the declared types.
+    """
+
+    prefix: ClassVar[str] = ""
+
+    @classmethod
+    def load(cls):
+        """Return the group populated from the settings table."""
+        stored = {
+            setting["key"]: setting["value"] for setting in Setting.get_settings()
+        }
+        overrides = {
+            field: stored[f"{cls.prefix}{field}"]
+            for field in cls.model_fields
+            if f"{cls.prefix}{field}" in stored
+        }
+        return cls(**overrides)
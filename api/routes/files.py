@@ -4,108 +4,398 @@ Routes:
     - /files: GET - Return a list of all files.
     - /files/check: GET - Returns a list of files that have been modified or deleted.
     - /files/scan: POST - Scan the directory and save new files.
-    - /files/process: POST - Process all unconverted files.
+    - /files/probe: POST - Probe the codec, resolution and duration of new files.
+    - /files/queue: GET - Preview the unconverted files in processing order.
+    - /files/plan: GET - Estimate the time and savings of processing the unconverted files.
+    - /files/process: POST - Process all unconverted files, biggest expected savings first.
+    - /files/process/batch: POST - Process the files matching filters as a background job.
     - /files/process/single: POST - Process a single file based on its path.
 """
 
 import os
+import time
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from models.file import FileMetadata, FileRecord
+from models.history import EncodeAttempt, bitrate_bucket, resolution_bucket
 from pydantic import BaseModel
-from utils.convert import VideoProcessor
+from utils.cache import response_cache
+from utils.convert import ProcessMode, VideoProcessor
+from utils.jobs import Job, job_manager
+from utils.lazy import lazy_import
 from utils.logger import get_logger
+from utils.plan import CapacityPlan, plan_capacity
+from utils.priority import RankedFile, get_ranked_queue, rank_files
+from utils.probe import MediaInfo
+from utils.resources import ResourceSettings, auto_workers
 from utils.scan import ScanDirectory
+from utils.selection import FileSelection
+from utils.tuning import choose_profile
+from utils.volumes import VolumeScheduler, VolumeSettings
 
-from api.models.file import FileMetadata
-
+ffmpeg = lazy_import("ffmpeg")
 logger = get_logger(__name__)
 router = APIRouter()
 
+# Files waiting to be processed
+PENDING = "converted = 0 AND deleted = 0"
+
 
 # START Route models
 class ProcessSingleFileRequest(BaseModel):
     """Model for a single file to process."""
 
     file_path: str
+    mode: ProcessMode = "auto"
 
 
 class ProcessScanRequest(BaseModel):
-    """Model for a directory to scan."""
+    """Model for the directories to scan, defaults to the configured library roots."""
+
+    directory: str = ""
+    directories: list[str] = []
+
 
-    directory: str
+class ProcessBatchRequest(FileSelection):
+    """Model for the filters selecting the files of a batch."""
+
+    mode: ProcessMode = "auto"
 
 
 # END Route Models
 
 
+def get_file_size(file) -> int | None:
+    """Return the size of a file, or None if it no longer exists."""
+    try:
+        return os.path.getsize(file.file_path)
+    except FileNotFoundError:
+        return None
+
+
+def get_current(file: FileRecord) -> FileMetadata | None:
+    """Re-reads a queued file, or returns None if it no longer needs processing.
+
+    Queues are snapshots, and other jobs may have converted, moved or deleted
+    a file by the time its turn comes. Processing the snapshot would encode a
+    path that is gone and overwrite the newer row.
+    """
+    current = FileMetadata.get_file_by_id(file.file_id)
+    if (
+        current is None
+        or current.deleted
+        or current.file_path != file.file_path
+        or (current.converted and not file.converted)
+    ):
+        logger.info(f"Skipping {file.file_path}, it changed since it was queued")
+        return None
+    return current
+
+
+def file_directory(file: FileMetadata | FileRecord) -> str:
+    """Returns the directory of a file, which identifies its volume."""
+    return os.path.dirname(file.file_path)
+
+
+def plan_encodes(files: list[FileRecord]) -> tuple[VolumeScheduler, int]:
+    """Returns the scheduler of a batch of encodes and how many run at once.
+
+    The memory and cores are shared by the encodes that actually run in
+    parallel rather than the global cap, so a single volume encoding one file
+    at a time gives it the whole budget.
+    """
+    settings = VolumeSettings.load()
+    max_encodes = auto_workers(ResourceSettings.load(), settings.max_encodes, files)
+    scheduler = VolumeScheduler(
+        settings.encode_concurrency,
+        max_encodes,
+        settings.get_overrides(),
+    )
+    return scheduler, scheduler.get_concurrency(files, path=file_directory)
+
+
+def record_attempt(file: FileMetadata, processor: VideoProcessor, started_at: float):
+    """Saves the outcome of processing a file to the encode history.
+
+    The file is expected to carry the probe of the processor, so the source is
+    bucketed even when it was not probed before processing.
+    """
+    encoded = processor.mode == "encode"
+    EncodeAttempt(
+        file_id=file.file_id,
+        file_path=processor.input_file,
+        started_at=started_at,
+        mode=processor.mode,
+        crf=processor.crf if encoded else 0,
+        preset=processor.preset if encoded else "",
+        source_codec=file.video_codec,
+        resolution=resolution_bucket(file.height),
+        bitrate=bitrate_bucket(file.bit_rate),
+        # Only measured once an output is compared, rejected attempts keep the source size
+        input_size=processor.input_size or file.current_size,
+        output_size=processor.output_size,
+        encode_seconds=processor.encode_seconds,
+        cpu_seconds=processor.cpu_seconds,
+        fps=processor.fps,
+        ssim=processor.ssim,
+        psnr=processor.psnr,
+        vmaf=processor.vmaf,
+        verified=processor.verified,
+        converted=processor.converted,
+    ).save()
+
+
+def process_file(file: FileMetadata, mode: ProcessMode = "auto", workers: int = 1):
+    """Process a file and save the outcome, including its quality scores.
+
+    The x265 CRF and preset are picked from the encode history of similar
+    sources, and the attempt is added to that history.
+
+    Args:
+        file (FileMetadata): The file to process.
+        mode (ProcessMode): Encode, remux or pick based on the codec.
+        workers (int): Files processed in parallel, sharing the resources.
+    """
+    processor = VideoProcessor(input_file=file.file_path, mode=mode, workers=workers)
+
+    # Scans do not probe, so unprobed files are probed here for the profile to
+    # be picked from the same group the attempt is recorded under
+    if not file.video_codec:
+        try:
+            processor.media_info = MediaInfo.from_file(file.file_path)
+            processor.media_info.apply_to(file)
+        except ffmpeg.Error as e:
+            logger.info(f"Failed to probe {file.file_path}: {e}")
+
+    profile = choose_profile(file.video_codec, file.height, file.bit_rate)
+    processor.crf = profile.crf
+    processor.preset = profile.preset
+    started_at = time.time()
+    processor.process()
+
+    file.processed = processor.processed
+    file.converted = processor.converted
+    file.ssim = processor.ssim
+    file.psnr = processor.psnr
+    file.vmaf = processor.vmaf
+    file.encode_seconds = processor.encode_seconds
+    if processor.media_info:
+        processor.media_info.apply_to(file)
+    record_attempt(file, processor, started_at)
+
+    if file.converted:
+        file.file_path = processor.output_file
+        file.file_name = os.path.basename(file.file_path)
+        file.current_size = processor.output_size
+
+    file.save()
+
+
 # START Routes
 @router.get("/files", response_model=list[FileMetadata])
-def get_all_files():
-    """Return a list of all files."""
-    return FileMetadata.get_all_files()
+def get_all_files(request: Request):
+    """Return a list of all files.
+
+    The serialized list is cached until the database changes and supports
+    If-None-Match, so unchanged polls are answered with a 304.
+    """
+    return response_cache.respond(
+        request,
+        lambda: [record.as_dict() for record in FileMetadata.iter_records()],
+    )
 
 
 @router.get("/files/check", response_model=list[FileMetadata])
 def check_file_status():
-    """Update files if deleted."""
-    files = FileMetadata.get_all_files()
+    """Update files that were deleted or changed outside pyReel.
+
+    Files are checked in parallel with the read concurrency of each volume.
+    """
+    settings = VolumeSettings.load()
+    scheduler = VolumeScheduler(
+        settings.read_concurrency,
+        settings.max_workers,
+        settings.get_overrides(),
+    )
+    results = scheduler.run(
+        get_file_size,
+        FileMetadata.iter_records("deleted = 0"),
+        path=lambda file: os.path.dirname(file.file_path),
+    )
+
     changed_files = []
-    for file in files:
+    for file, file_size, error in results:
+        if error:
+            continue
 
-        if not os.path.exists(file.file_path) and file.deleted is False:
+        if file_size is None:
             file.deleted = True
-            file.save()
             changed_files.append(file)
             continue
 
-        if file.deleted is False:
-            file_size = os.path.getsize(file.file_path)
-            if file_size != file.initial_size or file_size != file.current_size:
-                file.initial_size = file_size
-                file.current_size = file_size
-                file.converted = False
-                file.processed = False
-                file.deleted = False
-                changed_files.append(file)
-                continue
+        # Converted files are smaller than their initial size on purpose, so
+        # only a size that differs from the last one written counts as a
+        # change made outside pyReel
+        if file_size != file.current_size:
+            file.initial_size = file_size
+            file.current_size = file_size
+            file.converted = False
+            file.processed = False
+            changed_files.append(file)
 
-    return changed_files
+    FileMetadata.save_records(changed_files)
+    return [file.to_metadata() for file in changed_files]
 
 
 @router.post("/files/scan")
 def scan_and_save_files(request: ProcessScanRequest):
-    """Scan the directory and save new files."""
+    """Scan the directories and save new files."""
     logger.info(f"Scanning directory: {request}")
-    scan = ScanDirectory(request.directory)
+    settings = VolumeSettings.load()
+    roots = [request.directory] if request.directory else []
+    roots += request.directories or ([] if roots else settings.get_library_roots())
+    if not roots:
+        roots = [os.getenv("ROOT_DIR", ".")]
 
-    # Save the files to the database
-    for file in scan.get_files():
-        if FileMetadata.check_if_file_exists(file.file_path):
-            continue
-        file.save()
+    scan = ScanDirectory(roots[0], root_dirs=roots[1:], settings=settings)
+
+    # Save the new files to the database, skipping paths that are already tracked
+    FileMetadata.save_records(scan.get_files(), only_new=True)
 
     return {"message": "Directory scanned and new files saved."}
 
 
-@router.post("/files/process")
-def process_unconverted_files():
-    """Process all unconverted files."""
-    files = FileMetadata.get_files_by_converted_status(converted=False)
-    for file in files:
-        processor = VideoProcessor(input_file=file.file_path)
-        processor.process()
+def probe_unprobed(where: str = "deleted = 0") -> int:
+    """Probes and saves the files matching a condition that have not been probed.
+
+    Files are probed in parallel with the read concurrency of each volume.
 
-        file.processed = processor.processed
-        file.converted = processor.converted
+    Returns:
+        int: The number of files probed.
+    """
+    files = list(FileMetadata.iter_records(f"video_codec = '' AND {where}"))
+    if not files:
+        return 0
 
-        if file.converted:
-            file.file_path = processor.output_file
-            file.file_name = os.path.basename(file.file_path)
+    def probe(file):
+        try:
+            MediaInfo.from_file(file.file_path).apply_to(file)
+        except ffmpeg.Error as e:
+            logger.info(f"Unable to probe {file.file_path}: {e}")
+            file.video_codec = "unknown"
 
-        file.save()
+    settings = VolumeSettings.load()
+    VolumeScheduler(
+        settings.read_concurrency,
+        settings.max_workers,
+        settings.get_overrides(),
+    ).run(probe, files, path=lambda file: os.path.dirname(file.file_path))
+
+    FileMetadata.save_records(files)
+    return len(files)
+
+
+@router.post("/files/probe")
+def probe_files():
+    """Probe the codec, resolution and duration of files that have not been probed."""
+    return {"message": f"Probed {probe_unprobed()} files."}
+
+
+@router.get("/files/queue", response_model=list[RankedFile])
+def get_processing_queue(limit: int = 100, probe: bool = True):
+    """Preview the unconverted files in the order they will be processed.
+
+    Without probe data every file has the same expected savings per encode
+    second, so pending files are probed first unless probe is false.
+    """
+    if probe:
+        probe_unprobed(PENDING)
+    return [ranked for _, ranked in get_ranked_queue()[:limit]]
+
+
+@router.get("/files/plan", response_model=CapacityPlan)
+def get_capacity_plan(
+    workers: int | None = None,
+    directory: str = "",
+    depth: int = 0,
+    limit: int = 100,
+):
+    """Estimate the encode time and savings of the unconverted files without touching them.
+
+    Args:
+        workers (int): Encodes running at once, defaults to the max encodes setting.
+        directory (str): Only plan the files under this directory.
+        depth (int): Path components the directories are grouped by, 0 for
+            the parent directory of every file.
+        limit (int): The number of directories returned.
+    """
+    if workers is None:
+        workers = VolumeSettings.load().max_encodes
+    return plan_capacity(workers, directory=directory, depth=depth, limit=limit)
+
+
+@router.post("/files/process")
+def process_unconverted_files(mode: ProcessMode = "auto"):
+    """Process all unconverted files, biggest expected savings per encode second first.
+
+    In auto mode files that are already HEVC/AV1 are remuxed instead of re-encoded.
+    Conversions run in parallel with the encode concurrency of each volume, and
+    no more at once than fit in the memory and read bandwidth. Pending files
+    are probed first, as the ranking needs their resolution and duration.
+    """
+    probe_unprobed(PENDING)
+    files = [file for file, _ in get_ranked_queue()]
+    scheduler, workers = plan_encodes(files)
+
+    def process(file: FileRecord):
+        if current := get_current(file):
+            process_file(current, mode, workers)
+
+    scheduler.run(process, files, path=file_directory)
     return {"message": "All unconverted files processed."}
 
 
+@router.post("/files/process/batch", response_model=Job)
+def process_batch(request: ProcessBatchRequest):
+    """Process the files matching the filters as one background job.
+
+    The files are processed biggest expected savings per encode second first,
+    with the encode concurrency of each volume. Files are re-read when their
+    turn comes and skipped if another job converted, moved or deleted them in
+    the meantime. Poll /jobs/{job_id} for progress.
+    """
+    files = [file for file, _ in rank_files(list(request.iter_records()))]
+    scheduler, workers = plan_encodes(files)
+
+    def work(job: Job):
+        def process(file):
+            metadata = get_current(file)
+            if metadata is None:
+                job_manager.advance(job, file.initial_size, skipped=True)
+                return
+            try:
+                process_file(metadata, request.mode, workers)
+            except Exception:
+                job_manager.advance(job, file.initial_size, failed=True)
+                raise
+            saved = metadata.initial_size - metadata.current_size
+            job_manager.advance(
+                job,
+                file.initial_size,
+                saved if metadata.converted else 0,
+                converted=metadata.converted,
+            )
+
+        scheduler.run(process, files, path=file_directory)
+
+    return job_manager.submit(
+        "process",
+        work,
+        total=len(files),
+        total_size=sum(file.initial_size for file in files),
+    )
+
+
 @router.post("/files/process/single")
 def process_single_file(request: ProcessSingleFileRequest):
     """Process a single file based on its path."""
@@ -113,17 +403,7 @@ def process_single_file(request: ProcessSingleFileRequest):
     if not file:
         raise HTTPException(status_code=404, detail="File not found")
 
-    processor = VideoProcessor(input_file=file.file_path)
-    processor.process()
-
-    file.processed = processor.processed
-    file.converted = processor.converted
-
-    if file.converted:
-        file.file_path = processor.output_file
-        file.file_name = os.path.basename(file.file_path)
-
-    file.save()
+    process_file(file, request.mode)
     return {"message": f"File {file.file_path} processed."}
 
 
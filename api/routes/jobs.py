@@ -0,0 +1,32 @@
+"""Routes for background jobs.
+
+Routes:
+    - /jobs: GET - Return the known jobs, newest first.
+    - /jobs/{job_id}: GET - Return the progress of a job.
+"""
+
+from fastapi import APIRouter, HTTPException
+from utils.jobs import Job, job_manager
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+# START Routes
+@router.get("/jobs", response_model=list[Job])
+def get_jobs():
+    """Return the known jobs, newest first."""
+    return job_manager.get_jobs()
+
+
+@router.get("/jobs/{job_id}", response_model=Job)
+def get_job(job_id: str):
+    """Return the progress of a job."""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# END Routes
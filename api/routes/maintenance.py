@@ -0,0 +1,37 @@
+"""Routes for database maintenance.
+
+Routes:
+    - /maintenance: GET - Return the report of the last maintenance run.
+    - /maintenance: POST - Run maintenance now and return its report, optionally
+      converting the database to incremental vacuum.
+"""
+
+from fastapi import APIRouter, HTTPException
+from utils import maintenance
+from utils.logger import get_logger
+from utils.maintenance import MaintenanceReport, run_maintenance
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+
+# START Routes
+@router.get("/maintenance", response_model=MaintenanceReport)
+def get_last_report():
+    """Return the report of the last maintenance run."""
+    if maintenance.last_report is None:
+        raise HTTPException(status_code=404, detail="Maintenance has not run yet")
+    return maintenance.last_report
+
+
+@router.post("/maintenance", response_model=MaintenanceReport)
+def run_maintenance_now(convert_vacuum: bool = False):
+    """Run maintenance now, archiving, vacuuming and checkpointing the database.
+
+    Pass convert_vacuum to enable incremental vacuum on a database created
+    without it. The full VACUUM this needs blocks every other request.
+    """
+    return run_maintenance(convert_vacuum=convert_vacuum)
+
+
+# END Routes
@@ -5,12 +5,12 @@ Routes:
     - /settings: POST - Update a setting by ID (request body is a setting name/value pair).
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+from models.setting import Setting
 from pydantic import BaseModel
+from utils.cache import response_cache
 from utils.logger import get_logger
 
-from api.models.setting import Setting
-
 logger = get_logger(__name__)
 router = APIRouter()
 
@@ -28,9 +28,9 @@ class ProcessSettingRequest(BaseModel):
 
 # START Routes
 @router.get("/settings", response_model=list[Setting])
-def get_all_settings():
-    """Return a list of all settings."""
-    return Setting.get_settings()
+def get_all_settings(request: Request):
+    """Return a list of all settings, answering unchanged polls with a 304."""
+    return response_cache.respond(request, Setting.get_settings)
 
 
 @router.post("/settings")
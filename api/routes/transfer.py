@@ -0,0 +1,78 @@
+"""Routes for bulk transfers of the library index.
+
+Routes:
+    - /export/{table}: GET - Stream a table as gzip NDJSON, or Parquet with `format=parquet`.
+    - /import/{table}: POST - Write an export sent as the request body into a table.
+"""
+
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from utils import transfer
+from utils.logger import get_logger
+from utils.transfer import TransferFormat
+
+logger = get_logger(__name__)
+router = APIRouter()
+
+# Uploads larger than this are spooled to a temporary file instead of memory
+SPOOL_SIZE = 64 * 1024**2
+
+
+# START Routes
+@router.get("/export/{table}")
+def export_table(
+    table: str,
+    file_format: TransferFormat = Query("ndjson", alias="format"),
+):
+    """Stream a table, one chunk of rows at a time."""
+    try:
+        chunks = transfer.export_table(table, file_format)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    except ImportError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    file_name = f"{table}{transfer.FILE_EXTENSIONS[file_format]}"
+    return StreamingResponse(
+        chunks,
+        media_type=transfer.MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+@router.post("/import/{table}")
+async def import_table(
+    table: str,
+    request: Request,
+    file_format: TransferFormat = Query("ndjson", alias="format"),
+):
+    """Write an export sent as the request body into a table.
+
+    The body is spooled to disk rather than held in memory, as Parquet has to
+    be read from a seekable file. Rows are committed a chunk at a time, so the
+    chunks before an invalid row are kept.
+    """
+    if table not in transfer.TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as body:
+        async for data in request.stream():
+            body.write(data)
+        body.seek(0)
+        try:
+            imported = await run_in_threadpool(
+                transfer.import_table,
+                table,
+                body,
+                file_format,
+            )
+        except (ValueError, ImportError, OSError) as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    return {"message": f"Imported {imported} rows into {table}."}
+
+
+# END Routes
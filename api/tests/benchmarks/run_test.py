@@ -0,0 +1,58 @@
+"""Smoke test for the benchmark suite so the harness keeps working."""
+
+import os
+
+from benchmarks.compare import compare
+from benchmarks.generate import generate_tree
+from benchmarks.imports import parse_importtime
+from benchmarks.run import run
+
+
+def test_generate_tree(tmpdir):
+    """Test the synthetic tree generator."""
+    videos = generate_tree(str(tmpdir), files=40, depth=2, fanout=2, max_size=10**9)
+
+    assert 0 < len(videos) <= 40
+    assert all(os.path.getsize(video) >= 50 * 1024**2 for video in videos)
+    assert generate_tree(str(tmpdir.mkdir("again")), files=40, depth=2, fanout=2)
+
+
+def test_run_and_compare():
+    """Test a small benchmark run and comparing it against itself."""
+    report = run(files=30, depth=1, fanout=2, repeat=2, encode_seconds=0)
+
+    results = report["results"]
+    assert results["scan"]["files"] == results["upsert"]["rows"]
+    assert "get_all_records" in results["queries"]
+    assert results["check"]["changed"] == 0
+    assert results["transfer"]["rows"] == results["upsert"]["rows"]
+    assert results["imports"]["total_ms"] > 0
+    assert results["imports"]["eager"] == []
+
+    rows = compare(report, report)
+    assert rows
+    assert not any(row["regressed"] for row in rows)
+
+
+def test_parse_importtime():
+    """Test parsing the -X importtime output."""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   utils.logger\n"
+        "import time:      1000 |       1120 | app\n"
+    )
+
+    assert parse_importtime(stderr) == {
+        "utils.logger": (120, 120),
+        "app": (1000, 1120),
+    }
+
+
+def test_run_restores_db_path(tmpdir, monkeypatch):
+    """Test a database path set by the caller is restored after a run."""
+    db_path = str(tmpdir.join("caller.db"))
+    monkeypatch.setenv("DB_PATH", db_path)
+
+    run(files=4, depth=1, fanout=2, repeat=1, encode_seconds=0)
+
+    assert os.environ["DB_PATH"] == db_path
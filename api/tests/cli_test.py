@@ -0,0 +1,29 @@
+"""Test the command line tools."""
+
+import cli
+from models.file import FileMetadata, FileRecord
+from models.setting import Setting
+from utils.db import Connector
+
+
+def test_export_and_import(tmpdir, monkeypatch, capsys):
+    """Test moving the files table to a new database through a file."""
+    monkeypatch.setenv("DB_PATH", str(tmpdir.join("old.db")))
+    Connector().connect()
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    FileMetadata.save_records(
+        [FileRecord.from_path("/videos/one.mkv", "one.mkv", 10**6)],
+    )
+    export = str(tmpdir.join("files.ndjson.gz"))
+
+    assert cli.main(["export", "files", export]) == 0
+
+    monkeypatch.setenv("DB_PATH", str(tmpdir.join("new.db")))
+    assert cli.main(["import", "files", export]) == 0
+    assert "Imported 1 rows" in capsys.readouterr().out
+
+    Connector().connect()
+    assert FileMetadata.get_file_by_path("/videos/one.mkv").initial_size == 10**6
+    Connector().close()
+    assert cli.main(["import", "files", str(tmpdir.join("missing.gz"))]) == 1
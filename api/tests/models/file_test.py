@@ -0,0 +1,81 @@
+"""Test the FileMetadata model and its compact FileRecord representation."""
+
+import hashlib
+
+from models.file import FILE_COLUMNS, FileMetadata, FileRecord
+from utils.db import Connector
+
+
+def test_file_record_round_trip():
+    """Test converting between FileRecord and FileMetadata."""
+    record = FileRecord.from_path("/videos/movie.mp4", "movie.mp4", 100)
+
+    assert record.file_id == hashlib.sha256(b"/videos/movie.mp4").hexdigest()
+    assert record.current_size == 100
+    assert FileRecord.__slots__ == FILE_COLUMNS
+
+    metadata = record.to_metadata()
+    assert isinstance(metadata, FileMetadata)
+    assert metadata.to_record() == record
+
+
+def test_metadata_keeps_stored_values():
+    """Test that an existing file_id and current_size are not recomputed."""
+    metadata = FileMetadata(
+        file_id="stored-id",
+        file_name="movie.mkv",
+        file_path="/videos/movie.mkv",
+        initial_size=100,
+        current_size=40,
+    )
+
+    assert metadata.file_id == "stored-id"
+    assert metadata.current_size == 40
+
+
+def test_save_records():
+    """Test bulk saving and reading records."""
+    FileMetadata.create_tables()
+
+    records = [
+        FileRecord.from_path(f"/videos/{i}.mp4", f"{i}.mp4", i + 1) for i in range(5)
+    ]
+    assert FileMetadata.save_records(records) == 5
+    assert FileMetadata.get_count() == 5
+
+    # Known paths are skipped even when their file_id differs
+    moved = FileRecord("other-id", "0.mp4", "/videos/0.mp4", 1, 1)
+    FileMetadata.save_records([moved, records[1]], only_new=True)
+    assert FileMetadata.get_count() == 5
+
+    stored = sorted(
+        FileMetadata.get_all_records(),
+        key=lambda record: record.initial_size,
+    )
+    assert [record.as_tuple()[:-1] for record in stored] == [
+        record.as_tuple()[:-1] for record in records
+    ]
+    assert all(record.updated_at > 0 for record in stored)
+
+    records[0].converted = True
+    FileMetadata.save_records(records[:1])
+    pending = FileMetadata.get_records_by_converted_status(converted=False)
+    assert len(pending) == 4
+    assert all(isinstance(record.converted, bool) for record in pending)
+
+
+def test_create_tables_adds_new_columns():
+    """Test that columns added to the model are added to an existing table."""
+    db = Connector()
+    db.execute(
+        "CREATE TABLE files (file_id string PRIMARY KEY, file_name string,"
+        " file_path string, initial_size integer, current_size integer,"
+        " deleted boolean, converted boolean, processed boolean)",
+    )
+    db.execute("INSERT INTO files VALUES ('id', 'a.mp4', '/a.mp4', 1, 1, 0, 0, 0)")
+
+    FileMetadata.create_tables()
+
+    columns = [row[1] for row in db.execute("PRAGMA table_info('files')").fetchall()]
+    assert list(FILE_COLUMNS) == columns
+    assert FileMetadata.get_all_records()[0].ssim == 0.0
@@ -0,0 +1,86 @@
+"""Test the encode history."""
+
+from models.history import EncodeAttempt, bitrate_bucket, resolution_bucket
+
+
+def test_buckets():
+    """Test sources are bucketed by resolution and bit rate."""
+    assert resolution_bucket(0) == "unknown"
+    assert resolution_bucket(576) == "720p"
+    assert resolution_bucket(1080) == "1080p"
+    assert resolution_bucket(2160) == "2160p"
+    assert bitrate_bucket(0) == 0
+    assert bitrate_bucket(5_000_000) == 4
+    assert bitrate_bucket(80_000_000) == 32
+
+
+def test_profile_stats():
+    """Test attempts are grouped by profile, counting rejected outputs as no savings."""
+    EncodeAttempt.create_tables()
+    source = {
+        "source_codec": "h264",
+        "resolution": "1080p",
+        "bitrate": 8,
+        "mode": "encode",
+        "input_size": 1000,
+    }
+    attempts = [
+        EncodeAttempt(
+            file_id="a",
+            file_path="/videos/a.mkv",
+            started_at=1.0,
+            crf=28,
+            preset="medium",
+            output_size=400,
+            cpu_seconds=10.0,
+            converted=True,
+            **source,
+        ),
+        EncodeAttempt(
+            file_id="b",
+            file_path="/videos/b.mkv",
+            started_at=2.0,
+            crf=28,
+            preset="medium",
+            output_size=1200,
+            encode_seconds=5.0,
+            **source,
+        ),
+        EncodeAttempt(
+            file_id="a",
+            file_path="/videos/a.mkv",
+            started_at=3.0,
+            crf=30,
+            preset="fast",
+            output_size=300,
+            cpu_seconds=4.0,
+            converted=True,
+            **source,
+        ),
+        EncodeAttempt(
+            file_id="c",
+            file_path="/videos/c.mkv",
+            started_at=4.0,
+            mode="remux",
+            source_codec="h264",
+            resolution="1080p",
+            bitrate=8,
+        ),
+    ]
+    for attempt in attempts:
+        attempt.save()
+
+    assert EncodeAttempt.get_attempts("a") == [attempts[0], attempts[2]]
+
+    stats = {
+        (stat["crf"], stat["preset"]): stat
+        for stat in EncodeAttempt.get_profile_stats("h264", "1080p", 8)
+    }
+    assert set(stats) == {(28, "medium"), (30, "fast")}
+    assert stats[(28, "medium")]["attempts"] == 2
+    assert stats[(28, "medium")]["saved"] == 600
+    assert stats[(28, "medium")]["cpu_seconds"] == 15.0
+    assert EncodeAttempt.get_profile_stats("hevc", "1080p", 8) == []
+
+    assert EncodeAttempt.purge(started_before=3.0) == 2
+    assert EncodeAttempt.get_attempts("a") == [attempts[2]]
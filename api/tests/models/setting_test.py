@@ -1,6 +1,6 @@
 """Test the Setting model."""
 
-from models.setting import Setting
+from models.setting import Setting, SettingsGroup
 from utils.db import Connector
 
 
@@ -28,3 +28,25 @@ def test_create_tables():
     assert fetch[0][2] == "string"
     assert fetch[1][1] == "value"
     assert fetch[1][2] == "string"
+
+
+def test_settings_group_load():
+    """Test loading a typed group of settings."""
+    Setting.create_tables()
+
+    class ExampleSettings(SettingsGroup):
+        prefix = "example_"
+
+        enabled: bool = True
+        limit: int = 3
+
+    assert ExampleSettings.load() == ExampleSettings()
+
+    Setting(key="example_limit", value="10").save()
+    Setting(key="example_enabled", value="false").save()
+
+    loaded = ExampleSettings.load()
+    assert loaded.limit == 10
+    assert loaded.enabled is False
+    assert Setting.get_value("example_limit") == "10"
+    assert Setting.get_value("missing", "default") == "default"
@@ -0,0 +1,295 @@
+"""Test the file routes."""
+
+import os
+import threading
+from unittest.mock import patch
+
+from models.file import FileMetadata, FileRecord
+from models.history import EncodeAttempt
+from models.setting import Setting
+from routes import files
+from routes.files import check_file_status, get_processing_queue, probe_files
+from routes.jobs import get_job
+from utils.jobs import job_manager
+from utils.probe import MediaInfo
+from utils.resources import MIB, ResourceSettings, plan_budget
+from utils.volumes import VolumeSettings
+
+PROBE = {
+    "format": {"duration": "60.0", "bit_rate": "8000000"},
+    "streams": [
+        {
+            "codec_type": "video",
+            "codec_name": "mpeg2video",
+            "width": 720,
+            "height": 576,
+        },
+    ],
+}
+
+
+@patch("routes.files.MediaInfo.from_file", return_value=MediaInfo.from_probe(PROBE))
+def test_probe_and_queue(mock_from_file):
+    """Test probing new files and previewing the ranked queue."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    FileMetadata.save_records(
+        [
+            FileRecord.from_path("/videos/small.mpg", "small.mpg", 10**6),
+            FileRecord.from_path("/videos/large.mpg", "large.mpg", 10**9),
+        ],
+    )
+
+    assert probe_files() == {"message": "Probed 2 files."}
+    assert mock_from_file.call_count == 2
+
+    stored = FileMetadata.get_file_by_path("/videos/large.mpg")
+    assert stored.video_codec == "mpeg2video"
+    assert stored.width == 720
+
+    # Probed files are not probed again
+    assert probe_files() == {"message": "Probed 0 files."}
+
+    queue = get_processing_queue(limit=10)
+    assert [file.file_path for file in queue] == [
+        "/videos/large.mpg",
+        "/videos/small.mpg",
+    ]
+    assert queue[0].expected_saved > queue[1].expected_saved
+
+
+@patch("routes.files.process_file")
+def test_process_batch(mock_process_file):
+    """Test processing the files matching filters as a background job."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    FileMetadata.save_records(
+        [
+            FileRecord.from_path("/videos/a/one.mkv", "one.mkv", 10**9),
+            FileRecord.from_path("/videos/a/two.avi", "two.avi", 10**8),
+            FileRecord.from_path("/videos/b/three.mkv", "three.mkv", 10**9),
+        ],
+    )
+
+    def convert(file, mode, workers):
+        file.converted = True
+        file.current_size = file.initial_size // 2
+
+    mock_process_file.side_effect = convert
+
+    request = files.ProcessBatchRequest(directory="/videos/a", mode="encode")
+    job = files.process_batch(request)
+    job_manager.join()
+
+    assert get_job(job.job_id) is job
+    assert job.state == "finished"
+    assert (job.total, job.done, job.converted) == (2, 2, 2)
+    assert job.total_size == job.done_size == 10**9 + 10**8
+    assert job.saved_size == (10**9 + 10**8) // 2
+    assert {call.args[0].file_path for call in mock_process_file.call_args_list} == {
+        "/videos/a/one.mkv",
+        "/videos/a/two.avi",
+    }
+
+
+@patch("routes.files.MediaInfo.from_file", return_value=MediaInfo.from_probe(PROBE))
+@patch("routes.files.VideoProcessor.process", autospec=True)
+def test_process_file_records_attempt(mock_process, mock_from_file):
+    """Test processing a file adds the attempt to the encode history."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    EncodeAttempt.create_tables()
+    Setting(key="tuning_explore_rate", value="0").save()
+    FileMetadata.save_records(
+        [
+            FileRecord.from_path("/videos/large.mpg", "large.mpg", 10**9),
+            FileRecord.from_path("/videos/other.mpg", "other.mpg", 10**9),
+        ],
+    )
+
+    def process(processor):
+        processor.mode = "encode"
+        processor.input_size = 10**9
+        processor.output_size = 4 * 10**8
+        processor.cpu_seconds = 120.0
+        processor.processed = processor.converted = processor.verified = True
+
+    mock_process.side_effect = process
+
+    file = FileMetadata.get_file_by_path("/videos/large.mpg")
+    files.process_file(file, mode="auto")
+
+    (attempt,) = EncodeAttempt.get_attempts(file.file_id)
+    assert (attempt.crf, attempt.preset) == (28, "medium")
+    assert attempt.file_path == "/videos/large.mpg"
+    assert (attempt.source_codec, attempt.resolution, attempt.bitrate) == (
+        "mpeg2video",
+        "720p",
+        8,
+    )
+    assert attempt.input_size - attempt.output_size == 6 * 10**8
+    assert attempt.converted and attempt.cpu_seconds == 120.0
+    assert FileMetadata.get_file_by_path("/videos/large.temp.mkv").converted
+
+    # Unprobed files are probed before the profile is picked, so they get the
+    # profile tuned for the group their attempts are recorded under
+    for started_at in range(3):
+        attempt.model_copy(
+            update={"crf": 30, "preset": "fast", "started_at": started_at},
+        ).save()
+    other = FileMetadata.get_file_by_path("/videos/other.mpg")
+    assert not other.video_codec
+    files.process_file(other, mode="auto")
+
+    (tuned,) = EncodeAttempt.get_attempts(other.file_id)
+    assert (tuned.crf, tuned.preset) == (30, "fast")
+    assert mock_from_file.call_count == 2
+
+
+@patch("routes.files.ResourceSettings.load")
+@patch("routes.files.VolumeSettings.load", return_value=VolumeSettings(max_encodes=4))
+def test_single_volume_gets_full_budget(mock_volumes, mock_resources):
+    """Test one encode at a time on a single volume gets every core and all the memory."""
+    resources = ResourceSettings(memory_limit_mb=16 * 1024)
+    mock_resources.return_value = resources
+    records = [
+        FileRecord.from_path(f"/videos/{name}.mkv", f"{name}.mkv", 10**9)
+        for name in ("one", "two", "three")
+    ]
+
+    _, workers = files.plan_encodes(records)
+    budget = plan_budget(1920, 1080, resources, workers)
+
+    assert workers == 1
+    assert budget.memory == 16 * 1024 * MIB
+    assert budget.pools == os.cpu_count()
+
+    # Budgets are only shared between volumes that encode at the same time
+    mock_volumes.return_value = VolumeSettings(max_encodes=4, encode_concurrency=2)
+    assert files.plan_encodes(records)[1] == 2
+
+
+def test_check_keeps_converted_files(tmpdir):
+    """Test checking leaves converted files alone and resets files changed outside."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    converted = tmpdir.join("converted.mkv")
+    converted.write(b"0" * 500)
+    replaced = tmpdir.join("replaced.mkv")
+    replaced.write(b"0" * 700)
+
+    records = [
+        FileRecord.from_path(str(converted), "converted.mkv", 1000),
+        FileRecord.from_path(str(replaced), "replaced.mkv", 1000),
+        FileRecord.from_path(str(tmpdir.join("gone.mkv")), "gone.mkv", 1000),
+    ]
+    for record in records[:2]:
+        record.processed = record.converted = True
+        record.current_size = 500
+    FileMetadata.save_records(records)
+
+    changed = check_file_status()
+
+    assert sorted(file.file_name for file in changed) == ["gone.mkv", "replaced.mkv"]
+    assert FileMetadata.file_size_saved() == 500
+    stored = FileMetadata.get_file_by_path(str(converted))
+    assert stored.converted and stored.initial_size == 1000
+    stored = FileMetadata.get_file_by_path(str(replaced))
+    assert not stored.converted and stored.initial_size == stored.current_size == 700
+    assert check_file_status() == []
+
+
+def test_queue_probes_pending_files():
+    """Test unprobed files are probed before ranking, so sizes tell them apart."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    sizes = {"small": 10**6, "large": 100 * 10**9, "medium": 10**9}
+    FileMetadata.save_records(
+        [
+            FileRecord.from_path(f"/videos/{name}.mpg", f"{name}.mpg", size)
+            for name, size in sizes.items()
+        ],
+    )
+
+    # Without probe data every file gets the same score
+    unprobed = get_processing_queue(probe=False)
+    assert len({ranked.score for ranked in unprobed}) == 1
+
+    def from_file(path: str) -> MediaInfo:
+        info = MediaInfo.from_probe(PROBE)
+        # The same length, so bigger files have more bits to save per frame
+        info.bit_rate = int(sizes[os.path.basename(path)[:-4]] * 8 / info.duration)
+        return info
+
+    with patch("routes.files.MediaInfo.from_file", side_effect=from_file):
+        queue = get_processing_queue()
+
+    assert [ranked.file_path for ranked in queue] == [
+        "/videos/large.mpg",
+        "/videos/medium.mpg",
+        "/videos/small.mpg",
+    ]
+    assert queue[0].score > queue[1].score > queue[2].score
+
+
+@patch("routes.files.process_file")
+def test_overlapping_batches_skip_processed_files(mock_process_file):
+    """Test a queued file converted by an earlier job is skipped, not processed again."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    FileMetadata.save_records(
+        [
+            FileRecord.from_path("/videos/a/one.mp4", "one.mp4", 10**9),
+            FileRecord.from_path("/videos/a/two.mp4", "two.mp4", 10**8),
+        ],
+    )
+
+    submitted = threading.Event()
+
+    def convert(file, mode, workers):
+        submitted.wait(timeout=5)
+        file.file_path = file.file_path.replace(".mp4", ".mkv")
+        file.converted = file.processed = True
+        file.current_size = file.initial_size // 2
+        file.save()
+
+    mock_process_file.side_effect = convert
+
+    # Both selections are resolved before the first job converts anything
+    request = files.ProcessBatchRequest(directory="/videos/a", mode="encode")
+    first = files.process_batch(request)
+    second = files.process_batch(request)
+    submitted.set()
+    job_manager.join()
+
+    assert (first.done, first.converted, first.skipped) == (2, 2, 0)
+    assert (second.done, second.converted, second.skipped) == (2, 0, 2)
+    assert mock_process_file.call_count == 2
+    assert FileMetadata.get_file_by_path("/videos/a/one.mkv").converted
+    assert FileMetadata.get_file_by_path("/videos/a/one.mp4") is None
+
+
+@patch("routes.files.MediaInfo.from_file", return_value=MediaInfo.from_probe(PROBE))
+@patch("routes.files.VideoProcessor.process", autospec=True)
+def test_rejected_attempt_keeps_input_size(mock_process, mock_from_file):
+    """Test an attempt rejected by verification still records the source size."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    EncodeAttempt.create_tables()
+    FileMetadata.save_records(
+        [FileRecord.from_path("/videos/rejected.mpg", "rejected.mpg", 10**9)],
+    )
+
+    def process(processor):
+        processor.mode = "encode"
+        processor.processed = True
+        processor.verified = processor.converted = False
+
+    mock_process.side_effect = process
+
+    file = FileMetadata.get_file_by_path("/videos/rejected.mpg")
+    files.process_file(file, mode="auto")
+
+    (attempt,) = EncodeAttempt.get_attempts(file.file_id)
+    assert attempt.input_size == 10**9
+    assert not attempt.verified and not attempt.converted
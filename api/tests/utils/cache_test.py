@@ -0,0 +1,92 @@
+"""Test the response cache and ETag handling."""
+
+import gzip
+import json
+
+import pytest
+from fastapi import Request
+from models.setting import Setting
+from routes.settings import get_all_settings
+from utils.cache import ResponseCache, choose_encoding
+
+
+def make_request(path: str = "/settings", **headers) -> Request:
+    """Create a GET request with the given headers."""
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [
+                (key.replace("_", "-").encode(), value.encode())
+                for key, value in headers.items()
+            ],
+        },
+    )
+
+
+def test_choose_encoding():
+    """Test negotiating the content encoding."""
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("gzip; q=0, identity") is None
+    assert choose_encoding("gzip;q=0.0") is None
+    assert choose_encoding("GZIP;Q=0.000, br;q=0") is None
+    assert choose_encoding("gzip;q=0.5") == "gzip"
+    assert choose_encoding("gzip;q=bogus") is None
+
+
+def test_respond_with_etags():
+    """Test that unchanged data is answered with a 304 and changes are served."""
+    Setting.create_tables()
+    Setting(key="key", value="value").save()
+
+    response = get_all_settings(make_request())
+    assert response.status_code == 200
+    assert json.loads(response.body) == [{"key": "key", "value": "value"}]
+    etag = response.headers["etag"]
+
+    not_modified = get_all_settings(make_request(if_none_match=etag))
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+
+    Setting(key="key", value="changed").save()
+    changed = get_all_settings(make_request(if_none_match=etag))
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert json.loads(changed.body) == [{"key": "key", "value": "changed"}]
+
+
+def test_respond_builds_once_and_compresses():
+    """Test that bodies are built once per version and compressed on request."""
+    cache = ResponseCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        return [{"value": "x" * 2000}]
+
+    first = cache.respond(make_request("/files", accept_encoding="gzip"), build)
+    second = cache.respond(make_request("/files"), build)
+
+    assert len(calls) == 1
+    assert first.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in second.headers
+    assert gzip.decompress(first.body) == second.body
+
+
+def test_respond_with_brotli():
+    """Test that brotli is preferred when the optional package is installed."""
+    brotli = pytest.importorskip("brotli")
+    assert choose_encoding("gzip, br") == "br"
+
+    cache = ResponseCache()
+    response = cache.respond(
+        make_request("/files", accept_encoding="gzip, br"),
+        lambda: [{"value": "x" * 2000}],
+    )
+
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(response.body)) == [{"value": "x" * 2000}]
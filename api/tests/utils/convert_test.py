@@ -2,6 +2,12 @@
 
 from unittest.mock import MagicMock, patch
 
+from utils.convert import VideoProcessor
+from utils.probe import MediaInfo
+from utils.resources import ResourceSettings
+from utils.streams import StreamSettings
+from utils.verify import QualityReport
+
 
 def test_video_processor_initialization(video_processor):
     """Test VideoProcessor initialization."""
@@ -13,14 +19,48 @@ def test_video_processor_initialization(video_processor):
     assert video_processor.converted is False
 
 
+@patch("utils.convert.resources.wait_with_usage", return_value=(b"", 12.5))
+@patch("utils.convert.resources.limit_memory")
+@patch("utils.convert.ResourceSettings.load", return_value=ResourceSettings())
+@patch("utils.convert.StreamSettings.load", return_value=StreamSettings())
+@patch("utils.convert.MediaInfo.from_file")
+@patch("utils.convert.ffmpeg.output")
 @patch("utils.convert.ffmpeg.input")
-def test_convert_to_h265(mock_ffmpeg_input, video_processor):
+def test_convert_to_h265(
+    mock_ffmpeg_input,
+    mock_ffmpeg_output,
+    mock_from_file,
+    mock_load,
+    mock_resources_load,
+    mock_limit_memory,
+    mock_wait_with_usage,
+    video_processor,
+):
     """Test convert_to_h265 method."""
     mock_ffmpeg_input.return_value = MagicMock()
+    mock_ffmpeg_output.return_value.run_async.return_value.returncode = 0
+    video_processor.crf = 24
+    mock_from_file.return_value = MediaInfo.from_probe(
+        {
+            "streams": [
+                {"index": 0, "codec_type": "video", "codec_name": "h264"},
+                {"index": 1, "codec_type": "audio", "codec_name": "aac"},
+            ],
+        },
+    )
 
     result = video_processor.convert_to_h265()
 
     mock_ffmpeg_input.assert_called_once_with(video_processor.input_file)
+    args, kwargs = mock_ffmpeg_output.call_args
+    assert args[-1] == video_processor.output_file
+    assert kwargs["vcodec"] == "libx265"
+    assert kwargs["x265-params"].startswith("pools=")
+    assert (kwargs["crf"], kwargs["preset"]) == (24, "medium")
+    assert mock_limit_memory.called
+    assert video_processor.cpu_seconds == 12.5
+    assert kwargs["c:a:0"] == "copy"
+    assert video_processor.expected_streams == {"video": 1, "audio": 1, "subtitle": 0}
 
     assert result is True
 
@@ -54,9 +94,15 @@ def test_compare_and_replace(
     mock_os_remove.assert_called_once_with("output.mp4")
 
 
+@patch("utils.convert.VideoProcessor.verify", return_value=True)
 @patch("utils.convert.VideoProcessor.convert_to_h265")
 @patch("utils.convert.VideoProcessor.compare_and_replace")
-def test_process(mock_compare_and_replace, mock_convert_to_h265, video_processor):
+def test_process(
+    mock_compare_and_replace,
+    mock_convert_to_h265,
+    mock_verify,
+    video_processor,
+):
     """Test process method."""
     # Simulate successful conversion
     mock_convert_to_h265.return_value = True
@@ -73,3 +119,63 @@ def test_process(mock_compare_and_replace, mock_convert_to_h265, video_processor
     video_processor.process()
     mock_convert_to_h265.assert_called()
     mock_compare_and_replace.assert_not_called()
+
+
+@patch("utils.convert.os.remove")
+@patch("utils.convert.verify_output")
+@patch("utils.convert.VideoProcessor.convert_to_h265", return_value=True)
+@patch("utils.convert.VideoProcessor.compare_and_replace")
+def test_process_rejected_by_verification(
+    mock_compare_and_replace,
+    mock_convert_to_h265,
+    mock_verify_output,
+    mock_os_remove,
+    video_processor,
+):
+    """Test that an output failing verification never replaces the original."""
+    mock_verify_output.return_value = QualityReport(
+        ssim=0.5,
+        passed=False,
+        reasons=["SSIM 0.500 is below 0.95"],
+    )
+
+    video_processor.process()
+
+    mock_compare_and_replace.assert_not_called()
+    mock_os_remove.assert_called_once_with(video_processor.output_file)
+    assert video_processor.processed is True
+    assert video_processor.converted is False
+    assert video_processor.ssim == 0.5
+
+
+@patch("utils.convert.MediaInfo.from_file")
+def test_resolve_mode(mock_from_file):
+    """Test that auto mode remuxes files that are already HEVC."""
+    mock_from_file.return_value = MediaInfo(video_codec="hevc")
+    assert VideoProcessor(input_file="input.mkv", mode="auto").resolve_mode() == "remux"
+
+    mock_from_file.return_value = MediaInfo(video_codec="mpeg2video")
+    assert (
+        VideoProcessor(input_file="input.mpg", mode="auto").resolve_mode() == "encode"
+    )
+
+    # Explicit modes are not probed
+    mock_from_file.reset_mock()
+    assert (
+        VideoProcessor(input_file="input.mpg", mode="remux").resolve_mode() == "remux"
+    )
+    mock_from_file.assert_not_called()
+
+
+@patch("utils.convert.verify_output", return_value=QualityReport(passed=True))
+@patch("utils.convert.VideoProcessor.run_ffmpeg", return_value=True)
+@patch("utils.convert.VideoProcessor.compare_and_replace")
+def test_process_remux(mock_compare_and_replace, mock_run_ffmpeg, mock_verify_output):
+    """Test that remux mode copies the video stream and skips quality scoring."""
+    processor = VideoProcessor(input_file="input.mkv", mode="remux")
+    processor.process()
+
+    mock_run_ffmpeg.assert_called_once_with(vcodec="copy")
+    assert mock_verify_output.call_args.kwargs["measure"] is False
+    mock_compare_and_replace.assert_called_once()
+    assert processor.processed is True
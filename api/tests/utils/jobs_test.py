@@ -0,0 +1,32 @@
+"""Test the background job manager."""
+
+from utils.jobs import JobManager
+
+
+def test_job_manager_runs_jobs_in_order():
+    """Test jobs run in the background one at a time and report progress."""
+    manager = JobManager()
+    order = []
+
+    def work(job):
+        order.append(job.job_id)
+        manager.advance(job, size=10, saved=4, converted=True)
+        manager.advance(job, size=5, failed=True)
+
+    def fail(job):
+        raise RuntimeError("disk full")
+
+    first = manager.submit("process", work, total=2, total_size=15)
+    second = manager.submit("process", fail)
+    manager.join()
+
+    assert order == [first.job_id]
+    assert manager.get(first.job_id).state == "finished"
+    assert (first.done, first.failed, first.converted) == (2, 1, 1)
+    assert (first.done_size, first.saved_size) == (15, 4)
+    assert first.finished_at >= first.started_at > 0
+
+    assert second.state == "failed"
+    assert second.error == "disk full"
+    assert [job.job_id for job in manager.get_jobs()] == [second.job_id, first.job_id]
+    assert manager.get("missing") is None
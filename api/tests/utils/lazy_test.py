@@ -0,0 +1,36 @@
+"""Test the deferred imports and database connection."""
+
+import sys
+from unittest.mock import patch
+
+from utils.db import Connector
+from utils.lazy import LazyModule, lazy_import
+
+
+def test_lazy_import():
+    """Test the module is only imported on first use and can be patched."""
+    sys.modules.pop("tabnanny", None)
+    tabnanny = lazy_import("tabnanny")
+
+    assert isinstance(tabnanny, LazyModule)
+    assert lazy_import("tabnanny") is tabnanny
+    assert "tabnanny" not in sys.modules
+
+    with patch.object(tabnanny, "check", return_value="patched"):
+        assert tabnanny.check("file.py") == "patched"
+    assert "tabnanny" in sys.modules
+    assert tabnanny.check is sys.modules["tabnanny"].check
+
+    # Already imported modules are returned as is
+    assert lazy_import("sys") is sys
+
+
+def test_connector_connects_on_first_use():
+    """Test the connector opens the database lazily and closes idempotently."""
+    db = Connector()
+    db.close()
+    db.close()
+    assert db._conn is None  # pylint: disable=protected-access
+
+    assert db.execute("SELECT 1").fetchone() == (1,)
+    assert db._conn is not None  # pylint: disable=protected-access
@@ -0,0 +1,150 @@
+"""Test the database maintenance."""
+
+import asyncio
+import contextlib
+import sqlite3
+import time
+from unittest.mock import patch
+
+from models.file import FileMetadata, FileRecord
+from models.history import EncodeAttempt
+from models.setting import Setting
+from utils import maintenance
+from utils.db import Connector
+from utils.maintenance import DAY_SECONDS, MaintenanceSettings, run_maintenance
+
+
+def create_files(now: float):
+    """Saves a pending, a recently deleted, an old deleted and an old finished file."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    EncodeAttempt.create_tables()
+    records = [
+        FileRecord.from_path(f"/videos/{name}.mkv", f"{name}.mkv", 10**6)
+        for name in ("pending", "deleted", "old_deleted", "finished")
+    ]
+    records[1].deleted = records[2].deleted = True
+    records[3].processed = records[3].converted = True
+    records[3].current_size = 4 * 10**5
+    FileMetadata.save_records(records)
+
+    Connector().execute(
+        "UPDATE files SET updated_at = ? WHERE file_path IN (?, ?)",
+        (now - 100 * DAY_SECONDS, "/videos/old_deleted.mkv", "/videos/finished.mkv"),
+    )
+    return records
+
+
+def test_run_maintenance_archives_by_retention():
+    """Test deleted and finished files past their retention are moved to the archive."""
+    now = time.time()
+    records = create_files(now)
+    saved = FileMetadata.file_size_saved()
+
+    report = run_maintenance(MaintenanceSettings(), now=now)
+
+    assert report.errors == {}
+    assert report.archived_deleted == 1
+    assert report.archived_finished == 1
+    assert list(report.steps) == [
+        "stamp",
+        "archive",
+        "purge",
+        "optimize",
+        "vacuum",
+        "checkpoint",
+    ]
+    assert report.checkpoint == []
+    assert {record.file_path for record in FileMetadata.iter_records()} == {
+        "/videos/pending.mkv",
+        "/videos/deleted.mkv",
+    }
+
+    # Archived history still counts towards savings and outcomes
+    assert FileMetadata.file_size_saved() == saved
+    assert FileMetadata.check_if_file_exists("/videos/finished.mkv")
+    assert not FileMetadata.check_if_file_exists("/videos/old_deleted.mkv")
+
+    # Rescans skip archived finished files, but pick up deleted files that came back
+    FileMetadata.save_records([records[2], records[3]], only_new=True)
+    assert FileMetadata.get_count() == 3
+
+    # History past its retention is purged
+    report = run_maintenance(
+        MaintenanceSettings(history_retention_days=1),
+        now=now + 2 * DAY_SECONDS,
+    )
+    assert report.purged == 2
+
+
+def test_run_maintenance_on_file_database(tmp_path, monkeypatch):
+    """Test a file database is switched to WAL and incremental vacuum and checkpointed."""
+    Connector().close()
+    monkeypatch.setenv("DB_PATH", str(tmp_path / "pyreel.db"))
+    try:
+        db = Connector()
+        now = time.time()
+        create_files(now)
+
+        report = run_maintenance(MaintenanceSettings(), now=now)
+
+        assert report.errors == {}
+        assert db.pragma("journal_mode") == "wal"
+        assert db.pragma("auto_vacuum") == 2
+        assert len(report.checkpoint) == 3
+    finally:
+        Connector().close()
+        monkeypatch.delenv("DB_PATH")
+        Connector()
+
+
+def test_vacuum_conversion_is_on_demand(tmp_path, monkeypatch):
+    """Test a database without incremental vacuum is only converted when asked."""
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as legacy:
+        legacy.execute("CREATE TABLE legacy (value integer)")
+    legacy.close()
+
+    Connector().close()
+    monkeypatch.setenv("DB_PATH", str(path))
+    try:
+        db = Connector()
+        create_files(time.time())
+
+        report = run_maintenance(MaintenanceSettings())
+        assert report.errors == {}
+        assert not report.incremental_vacuum
+        assert db.pragma("auto_vacuum") == 0
+
+        report = run_maintenance(MaintenanceSettings(), convert_vacuum=True)
+        assert report.incremental_vacuum
+        assert db.pragma("auto_vacuum") == 2
+    finally:
+        Connector().close()
+        monkeypatch.delenv("DB_PATH")
+        Connector()
+
+
+@patch("utils.maintenance.run_maintenance")
+def test_cancel_waits_for_run(mock_run_maintenance):
+    """Test cancelling a run in progress waits for its thread to finish."""
+    finished = []
+
+    def run(_settings):
+        time.sleep(0.2)
+        finished.append(True)
+
+    mock_run_maintenance.side_effect = run
+
+    async def cancel_during_run():
+        task = asyncio.create_task(
+            maintenance.run_in_thread(MaintenanceSettings()),
+        )
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        return task.cancelled()
+
+    assert asyncio.run(cancel_during_run())
+    assert finished == [True]
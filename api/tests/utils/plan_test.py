@@ -0,0 +1,64 @@
+"""Test the capacity planner."""
+
+import pytest
+from models.file import FileMetadata, FileRecord
+from utils.plan import directory_key, makespan, plan_capacity
+from utils.priority import OutcomeModel
+
+
+def make_record(path: str, size: int, codec: str = "h264", **kwargs) -> FileRecord:
+    """Create a record for a probed file."""
+    record = FileRecord.from_path(path, path.rsplit("/", 1)[-1], size)
+    record.video_codec = codec
+    for key, value in kwargs.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_makespan_schedules_longest_first():
+    """Test the wall time of jobs spread across workers."""
+    assert makespan([], 4) == 0
+    assert makespan([4, 3, 3, 2], 2) == 6
+    assert makespan([5, 1, 1], 8) == 5
+
+
+def test_directory_key():
+    """Test grouping files by directory depth."""
+    assert directory_key("/mnt/media/movies/a/b.mkv") == "/mnt/media/movies/a"
+    assert directory_key("/mnt/media/movies/a/b.mkv", depth=3) == "/mnt/media/movies"
+    assert directory_key("/mnt/b.mkv", depth=3) == "/mnt"
+
+
+def test_plan_capacity():
+    """Test the plan totals, per directory savings and the directory filter."""
+    FileMetadata.create_tables()
+    FileMetadata.save_records(
+        [
+            make_record("/lib/movies/a.mp4", 4 * 10**9),
+            make_record("/lib/movies/b.mp4", 2 * 10**9),
+            make_record("/lib/shows/c.mpg", 10**9, "mpeg2video"),
+            make_record("/lib/shows/d.mkv", 10**9, ""),
+            make_record("/lib/done.mp4", 10**9, converted=True),
+            make_record("/library-old/e.mp4", 10**9),
+        ],
+    )
+    model = OutcomeModel(byte_rate=10**6)
+
+    plan = plan_capacity(workers=2, directory="/lib/", model=model)
+
+    assert plan.files == 4
+    assert plan.unprobed == 1
+    assert plan.initial_size == 8 * 10**9
+    assert plan.encode_hours == pytest.approx(8000 / 3600)
+    assert plan.cpu_hours == pytest.approx(4 * plan.encode_hours)
+    assert plan.wall_hours == pytest.approx(4000 / 3600)
+    assert [group.directory for group in plan.directories] == [
+        "/lib/movies",
+        "/lib/shows",
+    ]
+    assert plan.directories[0].expected_saved == int(6 * 10**9 * 0.4)
+    assert plan.expected_saved == sum(
+        group.expected_saved for group in plan.directories
+    )
+
+    assert plan_capacity(workers=1, model=model).files == 5
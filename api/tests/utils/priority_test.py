@@ -0,0 +1,87 @@
+"""Test the prioritization of pending files."""
+
+from models.file import FileMetadata, FileRecord
+from utils.priority import OutcomeModel, rank_files
+
+
+def make_record(name: str, size: int, codec: str, **kwargs) -> FileRecord:
+    """Create a record for a probed file."""
+    record = FileRecord.from_path(f"/videos/{name}", name, size)
+    record.video_codec = codec
+    for key, value in kwargs.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_rank_files_prefers_biggest_savings_per_second():
+    """Test the ranking of files with the default priors.
+
+    HEVC is only remuxed, so its small saving comes at almost no cost.
+    """
+    mpeg2 = make_record("mpeg2.mpg", 8 * 1024**3, "mpeg2video")
+    h264 = make_record("h264.mp4", 8 * 1024**3, "h264")
+    hevc = make_record("hevc.mkv", 8 * 1024**3, "hevc")
+    attempted = make_record("attempted.mp4", 8 * 1024**3, "mpeg2video", processed=True)
+
+    ranked = rank_files([hevc, attempted, h264, mpeg2], OutcomeModel())
+
+    assert [file.file_name for file, _ in ranked] == [
+        "hevc.mkv",
+        "mpeg2.mpg",
+        "h264.mp4",
+        "attempted.mp4",
+    ]
+    assert ranked[-1][1].expected_saved == 0
+
+
+def test_rank_files_uses_resolution_and_duration():
+    """Test that a short clip beats a long file of the same size."""
+    short = make_record(
+        "short.mp4",
+        10**9,
+        "h264",
+        width=1920,
+        height=1080,
+        duration=600,
+    )
+    long = make_record(
+        "long.mp4",
+        10**9,
+        "h264",
+        width=1920,
+        height=1080,
+        duration=7200,
+    )
+
+    ranked = rank_files([long, short], OutcomeModel())
+
+    assert ranked[0][0] is short
+    assert ranked[0][1].encode_seconds < ranked[1][1].encode_seconds
+
+
+def test_outcome_model_from_history():
+    """Test learning size ratios and throughput from processed files."""
+    FileMetadata.create_tables()
+    processed = [
+        make_record(
+            f"{i}.mp4",
+            1000,
+            "h264",
+            current_size=200,
+            processed=True,
+            converted=True,
+            width=100,
+            height=100,
+            duration=10,
+            encode_seconds=10,
+        )
+        for i in range(5)
+    ]
+    FileMetadata.save_records(processed)
+
+    model = OutcomeModel.from_history()
+
+    # Half way between the observed 0.2 and the prior of 0.6 with 5 files each
+    assert round(model.size_ratios["h264"], 6) == 0.4
+    assert model.pixel_rate == 100 * 100
+    assert model.byte_rate == 100
@@ -0,0 +1,101 @@
+"""Test the memory and bandwidth caps of ffmpeg jobs."""
+
+import resource
+import subprocess
+import sys
+from unittest.mock import patch
+
+from models.file import FileRecord
+from utils import resources
+from utils.resources import MIB, EncodeBudget, ResourceSettings
+
+
+def make_record(width: int, height: int) -> FileRecord:
+    """Create a record for a probed file."""
+    record = FileRecord.from_path("/videos/a.mkv", "a.mkv", 10**9)
+    record.width = width
+    record.height = height
+    return record
+
+
+def test_detect_memory_prefers_cgroup_limit(tmp_path, monkeypatch):
+    """Test the cgroup limit is used when it is below the physical memory."""
+    memory_max = tmp_path / "memory.max"
+    monkeypatch.setattr(resources, "CGROUP_MEMORY_FILES", (str(memory_max),))
+
+    memory_max.write_text("max\n")
+    physical = resources.detect_memory()
+    assert physical > 0
+
+    memory_max.write_text(f"{512 * MIB}\n")
+    assert resources.detect_memory() == 512 * MIB
+
+
+@patch("utils.resources.os.cpu_count", return_value=32)
+def test_plan_budget(mock_cpu_count):
+    """Test the thread layout fits the memory share and reads share the bandwidth."""
+    settings = ResourceSettings(memory_limit_mb=8192, read_bandwidth_mb=100)
+
+    budget = resources.plan_budget(1920, 1080, settings, workers=2)
+    assert budget.memory == 4096 * MIB
+    assert budget.pools == 16
+    assert budget.frame_threads == 5
+    assert budget.read_rate == 50 * MIB
+
+    # 4K frames do not fit five frame threads in 2GB
+    budget = resources.plan_budget(3840, 2160, settings, workers=4)
+    assert budget.pools == 8
+    assert budget.frame_threads == 1
+    assert resources.estimate_encode_memory(3840, 2160, 2) > budget.memory
+    assert budget.x265_params() == "pools=8:frame-threads=1"
+
+    settings = ResourceSettings(memory_limit_mb=8192, job_read_rate_mb=10)
+    assert resources.plan_budget(0, 0, settings, workers=4).read_rate == 10 * MIB
+
+
+def test_input_options_throttle_relative_to_bit_rate():
+    """Test the read rate is converted into a multiple of real time."""
+    budget = EncodeBudget(read_rate=10 * MIB)
+
+    assert budget.input_options(8 * MIB) == {"readrate": 10.0}
+    assert budget.input_options(0) == {}
+    assert EncodeBudget().input_options(8 * MIB) == {}
+
+
+def test_auto_workers():
+    """Test parallel encodes are lowered to fit memory and bandwidth."""
+    files = [make_record(1920, 1080), make_record(3840, 2160)]
+    settings = ResourceSettings(memory_limit_mb=4096)
+
+    assert resources.auto_workers(settings, 8, files) == 2
+    assert resources.auto_workers(settings, 1, files) == 1
+    assert resources.auto_workers(ResourceSettings(memory_limit_mb=1), 8, files) == 1
+    assert (
+        resources.auto_workers(
+            ResourceSettings(memory_limit_mb=1, auto_workers=False),
+            8,
+            files,
+        )
+        == 8
+    )
+
+    settings = ResourceSettings(
+        memory_limit_mb=10**6,
+        read_bandwidth_mb=100,
+        job_read_rate_mb=40,
+    )
+    assert resources.auto_workers(settings, 8, files) == 2
+
+
+def test_limit_memory():
+    """Test the data segment of a running process is capped."""
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        resources.limit_memory(process.pid, 512 * MIB)
+        assert resource.prlimit(process.pid, resource.RLIMIT_DATA) == (
+            512 * MIB,
+            512 * MIB,
+        )
+    finally:
+        process.kill()
+        process.wait()
@@ -1,5 +1,6 @@
 """Testing the scan method."""
 
+from tests.conftest import create_n_files
 from utils.scan import ScanDirectory
 
 
@@ -27,3 +28,16 @@ def test_scan_directory(generate_test_files):
     scan.scan_directory()
 
     assert len(scan.get_files()) == len(generated_files) / 2
+
+
+def test_scan_multiple_roots(tmpdir):
+    """Test scanning several library roots at once."""
+    roots = [tmpdir.mkdir("disk1"), tmpdir.mkdir("disk2")]
+    expected = []
+    for root in roots:
+        expected.extend(create_n_files(root, n=2))
+        expected.extend(create_n_files(root.mkdir("show"), n=2))
+
+    scan = ScanDirectory(str(roots[0]), root_dirs=[str(roots[1])])
+
+    assert sorted(file.file_path for file in scan.get_files()) == sorted(expected)
@@ -0,0 +1,64 @@
+"""Test the bulk file selection."""
+
+from models.file import FileMetadata, FileRecord
+from utils.db import Connector
+from utils.selection import FileSelection
+
+
+def make_record(path: str, size: int, codec: str = "h264", **kwargs) -> FileRecord:
+    """Create a record for a probed file."""
+    record = FileRecord.from_path(path, path.rsplit("/", 1)[-1], size)
+    record.video_codec = codec
+    for key, value in kwargs.items():
+        setattr(record, key, value)
+    return record
+
+
+def select(**filters) -> list[str]:
+    """Returns the sorted paths selected by the filters."""
+    return sorted(
+        record.file_path for record in FileSelection(**filters).iter_records()
+    )
+
+
+def test_file_selection_filters():
+    """Test every filter and their combination."""
+    FileMetadata.create_tables()
+    FileMetadata.save_records(
+        [
+            make_record("/lib/movies/a.mkv", 4 * 10**9),
+            make_record("/lib/movies/b.MP4", 10**9, "mpeg4"),
+            make_record("/lib/shows/x/Season 1/c.mkv", 2 * 10**9, "hevc"),
+            make_record("/lib/shows/x/Season 2/d_e.avi", 10**8),
+            make_record("/lib/movies-old/f.mkv", 10**9),
+            make_record("/lib/movies/done.mkv", 10**9, converted=True),
+            make_record("/lib/movies/gone.mkv", 10**9, deleted=True),
+        ],
+    )
+
+    assert select(directory="/lib/movies") == ["/lib/movies/a.mkv", "/lib/movies/b.MP4"]
+    assert select(glob="/lib/shows/*/Season 1/*") == ["/lib/shows/x/Season 1/c.mkv"]
+    assert select(extensions=["mp4", ".avi"]) == [
+        "/lib/movies/b.MP4",
+        "/lib/shows/x/Season 2/d_e.avi",
+    ]
+    assert select(min_size=10**9, max_size=2 * 10**9, codecs=["h264", "hevc"]) == [
+        "/lib/movies-old/f.mkv",
+        "/lib/shows/x/Season 1/c.mkv",
+    ]
+    assert len(select(directory="/lib/movies/", include_converted=True)) == 3
+
+
+def test_file_selection_uses_indexes():
+    """Test the directory and size filters are resolved with the indexes."""
+    FileMetadata.create_tables()
+    for selection in (
+        FileSelection(directory="/lib/movies"),
+        FileSelection(min_size=10**9),
+    ):
+        where, params = selection.to_where()
+        plan = Connector().query(
+            f"EXPLAIN QUERY PLAN SELECT * FROM files WHERE {where}",
+            params,
+        )
+        assert any("USING INDEX" in row[-1] for row in plan.fetchall())
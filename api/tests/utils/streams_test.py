@@ -0,0 +1,83 @@
+"""Test the audio and subtitle stream planning."""
+
+from utils.probe import MediaInfo
+from utils.streams import StreamSettings, plan_streams
+
+PROBE = {
+    "streams": [
+        {"index": 0, "codec_type": "video", "codec_name": "h264"},
+        {
+            "index": 1,
+            "codec_type": "audio",
+            "codec_name": "truehd",
+            "channels": 8,
+            "tags": {"language": "eng"},
+        },
+        {
+            "index": 2,
+            "codec_type": "audio",
+            "codec_name": "ac3",
+            "channels": 6,
+            "bit_rate": "640000",
+            "tags": {"language": "eng"},
+        },
+        {
+            "index": 3,
+            "codec_type": "audio",
+            "codec_name": "dts",
+            "profile": "DTS-HD MA",
+            "channels": 6,
+            "tags": {"language": "fre"},
+        },
+        {"index": 4, "codec_type": "subtitle", "codec_name": "subrip"},
+        {
+            "index": 5,
+            "codec_type": "subtitle",
+            "codec_name": "mov_text",
+            "tags": {"language": "fre"},
+        },
+        {"index": 6, "codec_type": "subtitle", "codec_name": "eia_608"},
+    ],
+}
+
+
+def test_plan_streams_defaults():
+    """Test that lossless audio is transcoded and compatible streams copied."""
+    plan = plan_streams(MediaInfo.from_probe(PROBE), StreamSettings())
+
+    assert plan.streams == ["0", "1", "2", "3", "4", "5"]
+    assert plan.options["c:a:0"] == "aac"
+    assert plan.options["b:a:0"] == "768k"
+    assert plan.options["c:a:1"] == "copy"
+    assert plan.options["c:a:2"] == "aac"
+    assert plan.options["c:s:0"] == "copy"
+    assert plan.options["c:s:1"] == "srt"
+    assert plan.expected_streams == {"video": 1, "audio": 3, "subtitle": 2}
+
+
+def test_plan_streams_languages_and_downmix():
+    """Test pruning languages and downmixing."""
+    settings = StreamSettings(
+        audio_languages="eng",
+        subtitle_languages="eng",
+        audio_max_channels=2,
+    )
+    plan = plan_streams(MediaInfo.from_probe(PROBE), settings)
+
+    # Untagged subtitles are kept, French tracks are dropped
+    assert plan.streams == ["0", "1", "2", "4"]
+    assert plan.options["ac:a:0"] == "2"
+    assert plan.options["ac:a:1"] == "2"
+    assert plan.options["b:a:1"] == "192k"
+    assert plan.expected_streams == {"video": 1, "audio": 2, "subtitle": 1}
+
+
+def test_plan_streams_keeps_audio_without_matching_language():
+    """Test that a language filter never removes every audio track."""
+    plan = plan_streams(
+        MediaInfo.from_probe(PROBE),
+        StreamSettings(audio_languages="jpn", keep_subtitles=False),
+    )
+
+    assert plan.streams == ["0", "1", "2", "3"]
+    assert plan.expected_streams["subtitle"] == 0
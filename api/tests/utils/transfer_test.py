@@ -0,0 +1,122 @@
+"""Test the bulk export and import of tables."""
+
+import gzip
+import io
+import json
+
+import pytest
+from models.file import FileMetadata, FileRecord
+from models.history import EncodeAttempt
+from models.setting import Setting
+from utils import transfer
+from utils.db import Connector
+
+
+def create_index() -> list[FileRecord]:
+    """Saves a pending and a converted file and a setting."""
+    FileMetadata.create_tables()
+    Setting.create_tables()
+    records = [
+        FileRecord.from_path(f"/videos/{name}.mkv", f"{name}.mkv", 10**6)
+        for name in ("pending", "converted")
+    ]
+    records[1].processed = records[1].converted = True
+    records[1].current_size = 4 * 10**5
+    FileMetadata.save_records(records)
+    Setting(key="quality_min_ssim", value="0.98").save()
+    return FileMetadata.get_all_records()
+
+
+def clear_index():
+    """Empties the tables, as on a new host."""
+    Connector().transaction([("DELETE FROM files", ()), ("DELETE FROM settings", ())])
+
+
+def test_ndjson_round_trip():
+    """Test a table exported as gzip NDJSON is imported back unchanged."""
+    records = create_index()
+    files = b"".join(transfer.export_table("files"))
+    settings = b"".join(transfer.export_table("settings"))
+
+    rows = [json.loads(line) for line in gzip.decompress(files).splitlines()]
+    assert [row["file_path"] for row in rows] == [r.file_path for r in records]
+    assert rows[1]["converted"] is True
+
+    clear_index()
+    assert transfer.import_table("files", io.BytesIO(files), chunk_size=1) == 2
+    assert transfer.import_table("settings", io.BytesIO(settings)) == 1
+
+    assert FileMetadata.get_all_records() == records
+    assert Setting.get_value("quality_min_ssim") == "0.98"
+
+
+def test_import_fills_missing_columns():
+    """Test rows written before a column existed take the model defaults."""
+    FileMetadata.create_tables()
+    sizes = {"initial_size": 10, "current_size": 10}
+    lines = [
+        {"file_path": "/videos/old.mkv", "file_name": "old.mkv", **sizes},
+        {"file_path": "/videos/new.mkv", "file_name": "new.mkv", "extra": 1, **sizes},
+    ]
+    export = gzip.compress(
+        "".join(json.dumps(line) + "\n" for line in lines).encode(),
+    )
+
+    assert transfer.import_table("files", io.BytesIO(export)) == 2
+
+    stored = FileMetadata.get_file_by_path("/videos/old.mkv")
+    assert stored.file_id and stored.initial_size == 10
+    assert not stored.converted
+
+    with pytest.raises(ValueError):
+        transfer.import_table("settings", io.BytesIO(export))
+
+
+def test_unknown_table():
+    """Test only the tables of the library index can be transferred."""
+    with pytest.raises(ValueError):
+        transfer.export_table("sqlite_master")
+
+
+def test_parquet_round_trip():
+    """Test a table exported as Parquet is imported back unchanged."""
+    pytest.importorskip("pyarrow")
+    records = create_index()
+    export = b"".join(transfer.export_table("files", "parquet"))
+
+    clear_index()
+    assert transfer.import_table("files", io.BytesIO(export), "parquet") == 2
+    assert FileMetadata.get_all_records() == records
+
+
+def test_archive_and_history_round_trip():
+    """Test archived files and encode attempts move with the index."""
+    create_index()
+    EncodeAttempt.create_tables()
+    FileMetadata.archive_records("converted = 1")
+    EncodeAttempt(
+        file_id="a",
+        file_path="/videos/converted.mkv",
+        started_at=1.0,
+        mode="encode",
+        crf=26,
+        preset="slow",
+        input_size=10**6,
+    ).save()
+    saved = FileMetadata.file_size_saved()
+    exports = {
+        table: b"".join(transfer.export_table(table))
+        for table in ("files", "files_archive", "encode_history")
+    }
+
+    Connector().transaction(
+        [(f"DELETE FROM {table}", ()) for table in exports],
+    )
+    for table, export in exports.items():
+        assert transfer.import_table(table, io.BytesIO(export)) == 1
+
+    assert FileMetadata.get_count() == 1
+    assert FileMetadata.check_if_file_exists("/videos/converted.mkv")
+    assert FileMetadata.file_size_saved() == saved > 0
+    (attempt,) = EncodeAttempt.get_attempts("a")
+    assert (attempt.crf, attempt.preset) == (26, "slow")
@@ -0,0 +1,82 @@
+"""Test the adaptive encode profiles."""
+
+import random
+
+from utils.tuning import TuningSettings, choose_profile
+
+
+def stat(crf: int, preset: str, attempts: int, saved: int, cpu_seconds: float):
+    """Returns the outcome of a profile as read from the history."""
+    return {
+        "crf": crf,
+        "preset": preset,
+        "attempts": attempts,
+        "saved": saved,
+        "cpu_seconds": cpu_seconds,
+    }
+
+
+def test_candidates():
+    """Test the default profile is the first candidate, and not repeated."""
+    settings = TuningSettings(crfs="26,28", presets="fast,medium")
+    assert settings.get_candidates() == [
+        (28, "medium"),
+        (26, "fast"),
+        (26, "medium"),
+        (28, "fast"),
+    ]
+
+
+def test_default_without_history():
+    """Test the default profile is used until it has enough history."""
+    settings = TuningSettings(explore_rate=1.0)
+    stats = [stat(28, "medium", 2, 10**9, 100.0)]
+
+    profile = choose_profile("h264", 1080, 8_000_000, settings, stats)
+
+    assert (profile.crf, profile.preset, profile.reason) == (28, "medium", "default")
+    assert choose_profile("h264", 1080, 8_000_000, settings, []).reason == "default"
+
+
+def test_best_savings_per_cpu_second():
+    """Test the trusted profile saving the most per CPU second is picked."""
+    settings = TuningSettings(explore_rate=0.0)
+    stats = [
+        stat(28, "medium", 5, 10**9, 1000.0),
+        stat(30, "fast", 3, 8 * 10**8, 400.0),
+        # Untrusted, however good it looks
+        stat(26, "slow", 1, 10**9, 1.0),
+        # Not a candidate anymore
+        stat(22, "fast", 9, 10**10, 1.0),
+    ]
+
+    profile = choose_profile("h264", 1080, 8_000_000, settings, stats)
+
+    assert (profile.crf, profile.preset, profile.reason) == (30, "fast", "history")
+    assert profile.score == 2 * 10**6
+
+
+def test_explore_least_tried():
+    """Test exploring picks the candidate with the fewest attempts."""
+    settings = TuningSettings(crfs="28,30", presets="medium", explore_rate=0.5)
+    stats = [stat(28, "medium", 5, 10**9, 1000.0)]
+
+    profiles = [
+        choose_profile("h264", 1080, 8_000_000, settings, stats, random.Random(seed))
+        for seed in range(20)
+    ]
+
+    assert {profile.reason for profile in profiles} == {"history", "explore"}
+    assert all(
+        (profile.crf, profile.preset) == (30, "medium")
+        for profile in profiles
+        if profile.reason == "explore"
+    )
+
+
+def test_disabled():
+    """Test the default profile is always used when tuning is disabled."""
+    settings = TuningSettings(enabled=False, default_crf=24)
+    stats = [stat(30, "fast", 5, 10**9, 1.0)]
+
+    assert choose_profile("h264", 1080, 8_000_000, settings, stats).crf == 24
@@ -0,0 +1,104 @@
+"""Test the post-encode verification."""
+
+from unittest.mock import patch
+
+from utils import verify
+from utils.probe import MediaInfo
+
+PROBE = {
+    "format": {"duration": "60.0", "bit_rate": "8000000", "format_name": "mov"},
+    "streams": [
+        {
+            "codec_type": "video",
+            "codec_name": "h264",
+            "width": 1920,
+            "height": 1080,
+            "avg_frame_rate": "24000/1001",
+        },
+        {
+            "codec_type": "video",
+            "codec_name": "mjpeg",
+            "disposition": {"attached_pic": 1},
+        },
+        {"codec_type": "audio", "codec_name": "aac"},
+        {"codec_type": "subtitle", "codec_name": "mov_text"},
+    ],
+}
+
+SSIM_LOG = b"[Parsed_ssim_4 @ 0x1] SSIM Y:0.98 (17.1) U:0.99 V:0.99 All:0.985 (18.2)\n"
+PSNR_LOG = (
+    b"[Parsed_psnr_5 @ 0x2] PSNR y:44.1 u:46.2 v:46.3 average:inf min:40 max:inf\n"
+)
+
+
+def test_media_info_from_probe():
+    """Test summarising ffprobe output."""
+    info = MediaInfo.from_probe(PROBE)
+
+    assert info.duration == 60.0
+    assert info.video_codec == "h264"
+    assert info.width == 1920
+    assert round(info.frame_rate, 3) == 23.976
+    assert info.stream_counts() == {"video": 1, "audio": 1, "subtitle": 1}
+
+
+def test_check_parity():
+    """Test duration and stream parity checks."""
+    source = MediaInfo.from_probe(PROBE)
+    truncated = MediaInfo.from_probe(
+        {"format": {"duration": "31.5"}, "streams": PROBE["streams"][:1]},
+    )
+
+    assert verify.check_parity(source, source, 1.0) == []
+
+    reasons = verify.check_parity(source, truncated, 1.0)
+    assert len(reasons) == 3
+    assert "duration" in reasons[0]
+
+    expected = {"video": 1, "audio": 0, "subtitle": 0}
+    assert len(verify.check_parity(source, truncated, 30.0, expected)) == 0
+
+
+def test_sample_offsets():
+    """Test sampled segments stay inside the file."""
+    assert verify.sample_offsets(1.0, 3, 2.0) == [0.0]
+    offsets = verify.sample_offsets(62.0, 3, 2.0)
+    assert offsets == [15.0, 30.0, 45.0]
+
+
+@patch("utils.verify.ffmpeg.output")
+def test_measure_quality(mock_output):
+    """Test parsing the scores from the ffmpeg log."""
+    mock_output.return_value.run.return_value = (b"", SSIM_LOG + PSNR_LOG)
+
+    scores = verify.measure_quality("input.mp4", "output.mkv", 10.0, 2.0)
+
+    assert scores == {"ssim": 0.985, "psnr": 100.0}
+
+
+@patch("utils.verify.measure_quality")
+@patch("utils.verify.MediaInfo.from_file")
+def test_verify_output(mock_from_file, mock_measure_quality):
+    """Test the quality floor gating."""
+    mock_from_file.return_value = MediaInfo.from_probe(PROBE)
+    mock_measure_quality.return_value = {"ssim": 0.97, "psnr": 40.0}
+
+    report = verify.verify_output(
+        "input.mp4",
+        "output.mkv",
+        verify.QualitySettings(samples=2),
+    )
+    assert report.passed is True
+    assert report.ssim == 0.97
+    assert mock_measure_quality.call_count == 2
+
+    report = verify.verify_output(
+        "input.mp4",
+        "output.mkv",
+        verify.QualitySettings(min_ssim=0.99),
+    )
+    assert report.passed is False
+    assert "SSIM" in report.reasons[0]
+
+    disabled = verify.verify_output("a", "b", verify.QualitySettings(enabled=False))
+    assert disabled.passed is True
@@ -0,0 +1,102 @@
+"""Test the per volume scheduling."""
+
+import threading
+import time
+from unittest.mock import patch
+
+from utils.volumes import VolumeScheduler, VolumeSettings, interleave
+
+
+def test_interleave():
+    """Test merging groups round-robin."""
+    assert interleave([[1, 2, 3], [4], [], [5, 6]]) == [1, 4, 5, 2, 6, 3]
+
+
+def test_volume_settings():
+    """Test parsing the library roots and overrides."""
+    settings = VolumeSettings(library_roots="/mnt/a, /mnt/b", overrides="/mnt/nas=1")
+
+    assert settings.get_library_roots() == ["/mnt/a", "/mnt/b"]
+    assert settings.get_overrides() == {"/mnt/nas": 1}
+
+
+@patch("utils.volumes.device_of", side_effect=lambda path: path.split("/")[2])
+def test_scheduler_limits_each_device(mock_device_of):
+    """Test that every device runs at most its budget at once."""
+    running: dict[str, int] = {}
+    peaks: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def work(path: str) -> str:
+        device = path.split("/")[2]
+        with lock:
+            running[device] = running.get(device, 0) + 1
+            peaks[device] = max(peaks.get(device, 0), running[device])
+        time.sleep(0.01)
+        with lock:
+            running[device] -= 1
+        if path.endswith("bad"):
+            raise OSError("unreadable")
+        return path.upper()
+
+    items = [f"/mnt/fast/{i}" for i in range(12)]
+    items += [f"/mnt/nas/{i}" for i in range(6)] + ["/mnt/nas/bad"]
+    scheduler = VolumeScheduler(3, 32, overrides={"/mnt/nas": 1})
+
+    results = scheduler.run(work, items)
+
+    assert len(results) == len(items)
+    assert peaks == {"fast": 3, "nas": 1}
+    assert mock_device_of.call_count == len(items)
+
+    errors = [item for item, _, error in results if error]
+    assert errors == ["/mnt/nas/bad"]
+    assert ("/mnt/fast/0", "/MNT/FAST/0", None) in results
+
+
+@patch("utils.volumes.device_of", side_effect=lambda path: path)
+def test_scheduler_respects_global_cap(mock_device_of):
+    """Test that budgets are scaled down to the global worker cap."""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(path: str):
+        with lock:
+            running.append(path)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(path)
+
+    items = [f"/disk{d}" for d in range(4) for _ in range(4)]
+    VolumeScheduler(4, 4).run(work, items)
+
+    assert max(peak) <= 4
+
+
+@patch("utils.volumes.device_of", side_effect=lambda path: path)
+def test_scheduler_caps_more_devices_than_workers(mock_device_of):
+    """Test that the global cap holds when every device needs a worker."""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(path: str):
+        with lock:
+            running.append(path)
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(path)
+
+    items = [f"/disk{d}" for d in range(12) for _ in range(2)]
+    scheduler = VolumeScheduler(1, 2)
+
+    results = scheduler.run(work, items)
+
+    assert len(results) == len(items)
+    assert max(peak) <= 2
+    assert scheduler.get_concurrency(items) == 2
+    assert VolumeScheduler(1, 8).get_concurrency(["/disk0"] * 5) == 1
+    assert VolumeScheduler(3, 8).get_concurrency(["/disk0", "/disk1"]) == 2
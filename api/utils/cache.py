@@ -0,0 +1,168 @@
+"""
+Caches serialized responses of list endpoints against the database version.
+
+Responses carry an ETag built from the database version, so a client polling an
+unchanged table gets a 304 after a single integer compare. Changed tables are
+serialized once per version and compressed once per encoding.
+"""
+
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import Request, Response
+from utils.db import Connector
+from utils.logger import get_logger
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+logger = get_logger(__name__)
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compresses a body with the given content encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def quality_of(params: list[str]) -> float:
+    """Returns the q value of an Accept-Encoding entry, 0 when it is malformed."""
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Returns the preferred supported encoding accepted by the client.
+
+    Codings with a q value of 0, in any spelling such as `q=0.0` or `; q=0`,
+    are refused.
+    """
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, *params = part.split(";")
+        if quality_of(params) > 0:
+            accepted.add(coding.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class CachedBody:
+    """A serialized response body and its compressed variants."""
+
+    __slots__ = ("etag", "body", "encoded")
+
+    def __init__(self, etag: str, body: bytes):
+        self.etag = etag
+        self.body = body
+        self.encoded: dict[str, bytes] = {}
+
+    def get(self, encoding: str | None) -> bytes:
+        """Returns the body in an encoding, compressing it on first use."""
+        if encoding is None:
+            return self.body
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.body, encoding)
+        return self.encoded[encoding]
+
+
+class ResponseCache:
+    """Serialized responses keyed by request path and query string.
+
+    Args:
+        max_entries (int): The number of distinct requests kept.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, CachedBody] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def etag(self, version: int) -> str:
+        """Returns the ETag for a database version.
+
+        The tag is weak as the same tag is served for every content encoding.
+        """
+        return f'W/"{Connector().generation}-{version}"'
+
+    def get_body(self, key: str, etag: str, build: Callable[[], Any]) -> CachedBody:
+        """Returns the cached body for the ETag, building it if needed."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry.etag == etag:
+                self.entries.move_to_end(key)
+                return entry
+
+        entry = CachedBody(etag, json.dumps(build(), separators=(",", ":")).encode())
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        logger.debug(f"Cached response for {key} at {etag}")
+        return entry
+
+    def clear(self):
+        """Drops every cached response."""
+        with self.lock:
+            self.entries.clear()
+
+    def respond(self, request: Request, build: Callable[[], Any]) -> Response:
+        """Returns the JSON response for a request, or a 304 if the client is current.
+
+        Args:
+            request (Request): The incoming request.
+            build (Callable): Returns the JSON serializable content when the
+                cached body is missing or stale.
+        """
+        etag = self.etag(Connector().version)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = request.headers.get("if-none-match", "")
+        opaque_tag = etag.removeprefix("W/")
+        if any(
+            tag.strip().removeprefix("W/") == opaque_tag
+            for tag in if_none_match.split(",")
+        ):
+            return Response(status_code=304, headers=headers)
+
+        key = f"{request.url.path}?{request.url.query}"
+        entry = self.get_body(key, etag, build)
+
+        encoding = None
+        if len(entry.body) >= MIN_COMPRESS_SIZE:
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        return Response(
+            content=entry.get(encoding),
+            media_type="application/json",
+            headers=headers,
+        )
+
+
+# Shared cache for the list endpoints
+response_cache = ResponseCache()
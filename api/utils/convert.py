@@ -1,20 +1,36 @@
 """
-Converts a video file to H.265 format using ffmpeg.
-Replaces the original file if the new file is smaller in size.
+Converts a video file to H.265 format using ffmpeg, or remuxes files that are
+already HEVC/AV1 by copying the video stream.
+Replaces the original file if the new file passes verification and is smaller in size.
 """
 
 import os
+import time
+from typing import Literal
 
-import ffmpeg
 from pydantic import BaseModel
+from utils import resources
+from utils.lazy import lazy_import
 from utils.logger import get_logger
+from utils.probe import MediaInfo
+from utils.resources import ResourceSettings, plan_budget
+from utils.streams import StreamSettings, plan_streams
+from utils.verify import verify_output
 
+# The bindings are loaded on first use, keeping them out of startup
+ffmpeg = lazy_import("ffmpeg")
 logger = get_logger(__name__)
 
+# Video codecs that are already efficient, so auto mode only remuxes them
+REMUX_CODECS = {"hevc", "av1"}
+
+ProcessMode = Literal["auto", "encode", "remux"]
+
 
 class VideoProcessor(BaseModel):
     input_file: str
     output_file: str = ""
+    mode: ProcessMode = "encode"
 
     input_size: int = 0
     output_size: int = 0
@@ -22,28 +38,130 @@ class VideoProcessor(BaseModel):
     processed: bool = False
     converted: bool = False
 
-    def __init__(self, input_file: str):
+    ssim: float = 0.0
+    psnr: float = 0.0
+    vmaf: float = 0.0
+
+    expected_streams: dict[str, int] = {}
+    media_info: MediaInfo | None = None
+    encode_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    fps: float = 0.0
+    verified: bool = False
+
+    # x265 profile, picked by the tuner for the source
+    crf: int = 28
+    preset: str = "medium"
+
+    # Encodes running in parallel, sharing the memory and read bandwidth
+    workers: int = 1
+
+    def __init__(
+        self,
+        input_file: str,
+        mode: ProcessMode = "encode",
+        workers: int = 1,
+        crf: int = 28,
+        preset: str = "medium",
+    ):
         """Post-initialization to set up additional attributes."""
-        super().__init__(input_file=input_file)
+        super().__init__(
+            input_file=input_file,
+            mode=mode,
+            workers=workers,
+            crf=crf,
+            preset=preset,
+        )
         file_without_ext, _ = os.path.splitext(input_file)
         self.output_file = f"{file_without_ext}.temp.mkv"
         logger.info(f"Setup Processor for: {input_file} => {self.output_file}")
 
-    def convert_to_h265(self):
-        """Converts the input video file to H.265 format using ffmpeg."""
+    def resolve_mode(self) -> ProcessMode:
+        """Resolves auto mode to remux or encode based on the probed video codec.
+
+        Only the codec decides: HEVC/AV1 files are remuxed whatever their
+        container, and any other file is encoded, which also rewrites it into
+        Matroska with the planned streams. The container alone never selects a
+        remux, as copying an older codec forgoes the savings of the encode.
+        """
+        if self.mode == "auto":
+            self.media_info = self.media_info or MediaInfo.from_file(self.input_file)
+            self.mode = (
+                "remux" if self.media_info.video_codec in REMUX_CODECS else "encode"
+            )
+            logger.info(f"Selected {self.mode} for {self.input_file}")
+        return self.mode
+
+    def run_ffmpeg(self, **video_options) -> bool:
+        """Writes the output with the planned audio and subtitle streams.
+
+        Audio and subtitle streams are mapped individually according to the
+        stream settings instead of relying on ffmpeg's default selection.
+        The process gets its share of the memory and read bandwidth, and x265
+        a thread layout that fits in it.
+        """
         try:
-            logger.info(f"Converting {self.input_file} to H.265 format")
-            ffmpeg.input(self.input_file).output(
+            self.media_info = self.media_info or MediaInfo.from_file(self.input_file)
+            plan = plan_streams(self.media_info, StreamSettings.load())
+            self.expected_streams = plan.expected_streams
+            budget = plan_budget(
+                self.media_info.width,
+                self.media_info.height,
+                ResourceSettings.load(),
+                self.workers,
+            )
+            if video_options.get("vcodec") == "libx265":
+                video_options["x265-params"] = budget.x265_params()
+
+            start = time.perf_counter()
+            source = ffmpeg.input(
+                self.input_file,
+                **budget.input_options(self.media_info.bit_rate),
+            )
+            process = ffmpeg.output(
+                *[source[stream] for stream in plan.streams],
                 self.output_file,
-                vcodec="libx265",
-                crf=28,
-            ).run(overwrite_output=True, quiet=True)
+                **video_options,
+                **plan.options,
+            ).run_async(overwrite_output=True, pipe_stderr=True)
+            resources.limit_memory(process.pid, budget.memory)
+            err, self.cpu_seconds = resources.wait_with_usage(process)
+            if process.returncode:
+                raise ffmpeg.Error("ffmpeg", b"", err)
+            self.encode_seconds = time.perf_counter() - start
+            frames = self.media_info.duration * self.media_info.frame_rate
+            self.fps = frames / max(self.encode_seconds, 1e-3)
             logger.info(f"Converted {self.input_file} to {self.output_file}")
             return True
         except ffmpeg.Error as e:
             logger.info(f"Error occurred: {e}")
             return False
 
+    def convert_to_h265(self):
+        """Converts the input video file to H.265 format using ffmpeg."""
+        logger.info(f"Converting {self.input_file} to H.265 format")
+        return self.run_ffmpeg(vcodec="libx265", crf=self.crf, preset=self.preset)
+
+    def remux(self):
+        """Copies the video stream into a Matroska container without re-encoding."""
+        logger.info(f"Remuxing {self.input_file}")
+        return self.run_ffmpeg(vcodec="copy")
+
+    def verify(self) -> bool:
+        """Checks the output is complete and above the configured quality floor."""
+        report = verify_output(
+            self.input_file,
+            self.output_file,
+            expected_streams=self.expected_streams or None,
+            measure=self.mode != "remux",
+        )
+        self.ssim = report.ssim
+        self.psnr = report.psnr
+        self.vmaf = report.vmaf
+        if not report.passed:
+            logger.info(f"Rejected {self.output_file}: {', '.join(report.reasons)}")
+        return report.passed
+
     def compare_and_replace(self):
         """Compares the size of the input and output files.
         Replaces the input file with the output file if the output file is smaller.
@@ -73,15 +191,25 @@ class VideoProcessor(BaseModel):
             self.converted = False
 
     def process(self):
-        """Converts the video file to H.265 format and
-        replaces the original file if the new file is smaller.
+        """Converts (or remuxes) the video file and replaces the original
+        file if the new file passes verification and is smaller.
 
         Args:
             file_path (str): Path to the video file.
         """
         try:
-            if self.convert_to_h265():
-                self.compare_and_replace()
+            if self.resolve_mode() == "remux":
+                written = self.remux()
+            else:
+                written = self.convert_to_h265()
+
+            if written:
+                self.verified = self.verify()
+                if self.verified:
+                    self.compare_and_replace()
+                else:
+                    os.remove(self.output_file)
+                    self.converted = False
                 self.processed = True
             else:
                 if os.path.exists(self.output_file):
@@ -3,6 +3,7 @@
 import os
 import sqlite3
 import threading
+import uuid
 
 from utils.logger import get_logger
 
@@ -10,51 +11,207 @@ logger = get_logger(__name__)
 
 
 class Connector:
-    """Sqlite interface for tracking the state of the directories and files."""
+    """Sqlite interface for tracking the state of the directories and files.
+
+    The connection is opened on first use rather than when the connector is
+    created, so importing the models does not touch the database. The app
+    connects explicitly from its lifespan.
+    """
 
     _instance = None
-    _lock = threading.Lock()
+    _lock = threading.RLock()
 
     db_path: str
-    conn: sqlite3.Connection
-    cursor: sqlite3.Cursor
+    _conn: sqlite3.Connection | None
+
+    # Identifies the connection and counts the statements that changed rows,
+    # so readers can tell whether anything changed since they last looked
+    generation: str
+    version: int
 
     def __new__(cls, *args, **kwargs):
         """Create a singleton instance of the class."""
         with cls._lock:
             if cls._instance is None:
-                logger.info("Creating a new instance of the database connector.")
+                logger.debug("Creating a new instance of the database connector.")
                 cls._instance = super().__new__(cls)
                 cls._instance._initialize()
-
-            # If connection is closed then reinitialize
-            elif cls._instance.conn is None:
-                logger.info("Reinitializing the database connection.")
-                cls._instance._initialize()
         return cls._instance
 
     def _initialize(self):
-        """Initializes the database connection and creates the tables if they don't exist."""
+        """Resets the connector state without connecting."""
         self.db_path = os.getenv("DB_PATH", ":memory:")
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.cursor = self.conn.cursor()
+        self._conn = None
+        self.generation = uuid.uuid4().hex[:8]
+        self.version = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The database connection, opened on first use."""
+        conn = self._conn
+        if conn is None:
+            conn = self.connect()
+        return conn
+
+    def connect(self) -> sqlite3.Connection:
+        """Opens the database connection if it is not open yet.
+
+        The database path is read from DB_PATH at connection time, so it can be
+        configured after the models are imported.
+        """
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+
+            self._initialize()
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            if self.db_path != ":memory:":
+                # Incremental auto vacuum only applies to new database files and
+                # must be set before WAL writes the header; existing ones are
+                # converted on demand by the maintenance job. WAL lets reads
+                # proceed during writes
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("PRAGMA journal_mode = WAL")
+            self._conn = conn
         logger.info(f"Connected to database: {self.db_path}")
+        return conn
 
     def execute(self, sql: str, params: tuple = ()):
-        """Executes the sql query."""
-        self.cursor.execute(sql, params)
-        self.conn.commit()
+        """Executes the sql query.
+
+        Each call gets its own cursor so results are not overwritten by statements
+        executed from other threads before they are fetched.
+        """
+        with self._lock:
+            changes = self.conn.total_changes
+            cursor = self.conn.execute(sql, params)
+            self.conn.commit()
+            self._bump_version(changes)
         logger.debug(f"Executed sql: {sql}")
-        return self.cursor
+        return cursor
+
+    def executemany(self, sql: str, params: list[tuple]):
+        """Executes the sql query for every parameter tuple in a single transaction."""
+        with self._lock:
+            changes = self.conn.total_changes
+            with self.conn:
+                self.conn.executemany(sql, params)
+            self._bump_version(changes)
+        logger.debug(f"Executed sql in bulk: {sql}")
+
+    def transaction(self, statements: list[tuple[str, tuple]]) -> list[int]:
+        """Executes several statements atomically, returning the rows each changed."""
+        with self._lock:
+            changes = self.conn.total_changes
+            with self.conn:
+                counts = [
+                    self.conn.execute(sql, params).rowcount
+                    for sql, params in statements
+                ]
+            self._bump_version(changes)
+        logger.debug(f"Executed {len(statements)} statements in a transaction")
+        return counts
+
+    def _bump_version(self, changes_before: int):
+        """Increments the version if the last statement changed any rows."""
+        if self.conn.total_changes != changes_before:
+            self.version += 1
+
+    def query(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Runs a read-only query on a dedicated cursor.
+
+        Unlike execute, the returned cursor is not shared, so it can be iterated
+        lazily while other statements are executed on the connection.
+        """
+        logger.debug(f"Queried sql: {sql}")
+        return self.conn.execute(sql, params)
 
     def close(self):
-        """Closes the database connection"""
-        self.conn.close()
-        self.conn = None
+        """Closes the database connection, the next statement reconnects."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._conn.close()
+            self._conn = None
         logger.info(f"Closed database connection: {self.db_path}")
 
+    def pragma(self, name: str) -> int | str:
+        """Returns the value of a single valued pragma."""
+        with self._lock:
+            return self.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def optimize(self, analyze: bool = False):
+        """Refreshes the query planner statistics.
+
+        Args:
+            analyze (bool): Run a full ANALYZE instead of letting PRAGMA optimize
+                decide which tables need it.
+        """
+        with self._lock:
+            self.conn.execute("ANALYZE" if analyze else "PRAGMA optimize")
+            self.conn.commit()
+        logger.info(f"Database optimized: {self.db_path}")
+
     def optimize_and_vacuum(self):
         """Optimizes the database and reclaims the space."""
-        self.cursor.execute("VACUUM")
-        self.conn.commit()
+        with self._lock:
+            self.conn.execute("PRAGMA optimize")
+            self.conn.execute("VACUUM")
+            self.conn.commit()
         logger.info(f"Database optimized and vacuumed: {self.db_path}")
+
+    def incremental_vacuum(self, pages: int = 0, convert: bool = False) -> int:
+        """Returns free pages to the file system, a few at a time.
+
+        Databases created without incremental auto vacuum need a one-off full
+        VACUUM to be converted. It rewrites the whole database while holding
+        the lock, so it only runs when asked for.
+
+        Args:
+            pages (int): The most pages to free, 0 frees all of them.
+            convert (bool): Convert a database without incremental auto vacuum.
+
+        Returns:
+            int: The number of pages freed.
+        """
+        with self._lock:
+            # 2 is INCREMENTAL
+            if self.pragma("auto_vacuum") != 2:
+                if not convert:
+                    logger.info(
+                        f"Incremental vacuum is not enabled, skipping: {self.db_path}",
+                    )
+                    return 0
+                logger.info(f"Enabling incremental vacuum: {self.db_path}")
+                self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self.optimize_and_vacuum()
+
+            free_pages = self.pragma("freelist_count")
+            self.conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            self.conn.commit()
+            freed = free_pages - self.pragma("freelist_count")
+        logger.info(f"Freed {freed} pages: {self.db_path}")
+        return freed
+
+    def checkpoint(self, mode: str = "TRUNCATE") -> list[int]:
+        """Copies the write-ahead log into the database.
+
+        Args:
+            mode (str): PASSIVE, FULL, RESTART or TRUNCATE.
+
+        Returns:
+            list[int]: The busy flag, the pages in the log and the pages
+                checkpointed, or an empty list when the database is not in WAL mode.
+        """
+        mode = mode.upper()
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+
+        with self._lock:
+            if self.pragma("journal_mode") != "wal":
+                return []
+            result = list(
+                self.conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone(),
+            )
+        logger.info(f"Checkpointed write-ahead log: {result}")
+        return result
@@ -0,0 +1,178 @@
+"""
+Runs batches of work in the background and tracks their progress.
+
+Jobs run one at a time on a single background thread, in the order they were
+submitted, so batches never compete with each other for the encode budget.
+Every job fans out its own items with the VolumeScheduler.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Literal
+
+from pydantic import BaseModel
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+JobState = Literal["queued", "running", "finished", "failed"]
+
+
+class Job(BaseModel):
+    """Progress of a batch job.
+
+    Args:
+        job_id (str): The identifier returned on submission.
+        kind (str): What the job does, e.g. `process`.
+        state (str): queued, running, finished or failed.
+        total (int): Items in the batch.
+        done (int): Items completed, including failures and skipped items.
+        failed (int): Items that raised an error.
+        skipped (int): Items that no longer needed the work when their turn came.
+        converted (int): Items that were replaced by a smaller output.
+        total_size (int): Bytes of all items.
+        done_size (int): Bytes of the completed items.
+        saved_size (int): Bytes saved by the completed items.
+        created_at (float): Unix time the job was submitted.
+        started_at (float): Unix time the job started, 0 while queued.
+        finished_at (float): Unix time the job ended, 0 until then.
+        error (str): Why the job failed.
+    """
+
+    job_id: str
+    kind: str
+    state: JobState = "queued"
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    converted: int = 0
+    total_size: int = 0
+    done_size: int = 0
+    saved_size: int = 0
+    created_at: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    error: str = ""
+
+
+class JobManager:
+    """Queues jobs for a background thread and keeps their progress.
+
+    Args:
+        max_jobs (int): Finished jobs are forgotten, oldest first, beyond this many.
+    """
+
+    def __init__(self, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self.lock = threading.Lock()
+        self.pending: queue.Queue = queue.Queue()
+        self.worker: threading.Thread | None = None
+
+    def submit(
+        self,
+        kind: str,
+        work: Callable[[Job], None],
+        total: int = 0,
+        total_size: int = 0,
+    ) -> Job:
+        """Queues work to run in the background.
+
+        Args:
+            kind (str): What the job does.
+            work (Callable): Runs the job, reporting each item with advance().
+            total (int): Items in the batch.
+            total_size (int): Bytes of all items.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(
+            job_id=uuid.uuid4().hex[:12],
+            kind=kind,
+            total=total,
+            total_size=total_size,
+            created_at=time.time(),
+        )
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self._forget_finished()
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self._run_pending,
+                    name="job-manager",
+                    daemon=True,
+                )
+                self.worker.start()
+        self.pending.put((job, work))
+        logger.info(f"Queued {kind} job {job.job_id} with {total} items")
+        return job
+
+    def _forget_finished(self):
+        """Drops the oldest finished jobs beyond max_jobs."""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                return
+            if self.jobs[job_id].state in ("finished", "failed"):
+                del self.jobs[job_id]
+
+    def _run_pending(self):
+        """Runs queued jobs one at a time, forever."""
+        while True:
+            job, work = self.pending.get()
+            job.state = "running"
+            job.started_at = time.time()
+            try:
+                work(job)
+                job.state = "finished"
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Job {job.job_id} failed: {e}")
+                job.error = str(e)
+                job.state = "failed"
+            job.finished_at = time.time()
+            logger.info(
+                f"Job {job.job_id} {job.state}: {job.done}/{job.total} items"
+                f" in {job.finished_at - job.started_at:.1f}s",
+            )
+            self.pending.task_done()
+
+    def advance(
+        self,
+        job: Job,
+        size: int = 0,
+        saved: int = 0,
+        converted: bool = False,
+        failed: bool = False,
+        skipped: bool = False,
+    ):
+        """Records a completed item of a job, safe to call from worker threads."""
+        with self.lock:
+            job.done += 1
+            job.failed += failed
+            job.skipped += skipped
+            job.converted += converted
+            job.done_size += size
+            job.saved_size += saved
+
+    def get(self, job_id: str) -> Job | None:
+        """Returns a job by its identifier."""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def get_jobs(self) -> list[Job]:
+        """Returns the known jobs, newest first."""
+        with self.lock:
+            return list(reversed(self.jobs.values()))
+
+    def join(self):
+        """Blocks until every queued job has finished."""
+        self.pending.join()
+
+
+# Shared manager for the batch routes
+job_manager = JobManager()
@@ -0,0 +1,53 @@
+"""
+Defers importing heavy optional modules until they are first used.
+
+The ffmpeg bindings are only needed once a file is probed or converted, so the
+API and spawned workers start without loading them.
+"""
+
+import importlib
+import sys
+import threading
+import types
+
+_modules: dict[str, "LazyModule"] = {}
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on the first attribute access.
+
+    Attributes set on the stand-in (e.g. by unittest.mock.patch) shadow the
+    attributes of the real module.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self) -> types.ModuleType:
+        module = self._module
+        if module is None:
+            with _lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.__name__)
+                module = self._module
+        return module
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __dir__(self) -> list[str]:
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Returns a module that is imported when it is first used.
+
+    Modules that are already imported are returned as is.
+    """
+    with _lock:
+        module = sys.modules.get(name) or _modules.get(name)
+        if module is None:
+            module = _modules[name] = LazyModule(name)
+    return module
@@ -0,0 +1,210 @@
+"""
+Keeps the database small and its query plans current.
+
+A maintenance run archives deleted and long finished files into a compact
+history table, purges history and encode attempts past their retention, refreshes the planner
+statistics, returns free pages to the file system and checkpoints the
+write-ahead log. The app runs it periodically from its lifespan.
+"""
+
+import asyncio
+import sqlite3
+import time
+from collections.abc import Callable
+
+from models.file import FileMetadata
+from models.history import EncodeAttempt
+from models.setting import SettingsGroup
+from pydantic import BaseModel
+from utils.db import Connector
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class MaintenanceSettings(SettingsGroup):
+    """Settings for database maintenance, stored as `maintenance_<field>`.
+
+    Retention periods of 0 or less disable the matching step.
+
+    Args:
+        enabled (bool): Run maintenance periodically while the app is up.
+        interval_minutes (float): Time between periodic runs.
+        deleted_retention_days (float): Days a deleted file stays in the files
+            table before it is archived.
+        finished_retention_days (float): Days a processed file stays in the
+            files table before it is archived. Archived files are no longer
+            rescanned or checked.
+        history_retention_days (float): Days an archived file or an encode
+            attempt is kept.
+        analyze (bool): Run a full ANALYZE instead of PRAGMA optimize.
+        vacuum_pages (int): The most free pages returned per run, 0 for all.
+        convert_vacuum (bool): Let periodic runs convert a database created
+            without incremental vacuum. The conversion is a full VACUUM that
+            blocks every request until the whole database is rewritten.
+        checkpoint_mode (str): The write-ahead log checkpoint mode.
+    """
+
+    prefix = "maintenance_"
+
+    enabled: bool = True
+    interval_minutes: float = 60.0
+    deleted_retention_days: float = 7.0
+    finished_retention_days: float = 90.0
+    history_retention_days: float = 365.0
+    analyze: bool = False
+    vacuum_pages: int = 0
+    convert_vacuum: bool = False
+    checkpoint_mode: str = "TRUNCATE"
+
+
+class MaintenanceReport(BaseModel):
+    """Outcome of a maintenance run.
+
+    Args:
+        started_at (float): Unix time the run started.
+        seconds (float): Total duration of the run.
+        steps (dict[str, float]): Duration of every step in seconds.
+        errors (dict[str, str]): Steps that failed and their error.
+        stamped (int): Files given an update time for the first time.
+        archived_deleted (int): Deleted files moved to the archive.
+        archived_finished (int): Processed files moved to the archive.
+        purged (int): Archived files removed past their retention.
+        purged_attempts (int): Encode attempts removed past their retention.
+        freed_pages (int): Pages returned to the file system.
+        incremental_vacuum (bool): Incremental vacuum is enabled, false until a
+            database created without it is converted.
+        checkpoint (list[int]): The wal_checkpoint result, empty without WAL.
+    """
+
+    started_at: float
+    seconds: float = 0.0
+    steps: dict[str, float] = {}
+    errors: dict[str, str] = {}
+    stamped: int = 0
+    archived_deleted: int = 0
+    archived_finished: int = 0
+    purged: int = 0
+    purged_attempts: int = 0
+    freed_pages: int = 0
+    incremental_vacuum: bool = False
+    checkpoint: list[int] = []
+
+
+# Report of the most recent run, served by the maintenance route
+last_report: MaintenanceReport | None = None
+
+
+def run_maintenance(
+    settings: MaintenanceSettings | None = None,
+    now: float | None = None,
+    convert_vacuum: bool | None = None,
+) -> MaintenanceReport:
+    """Runs every maintenance step, timing each one.
+
+    A failing step is recorded in the report and does not stop the others.
+
+    Args:
+        settings (MaintenanceSettings): The retention policy, loaded when omitted.
+        now (float): The time retention periods are measured from.
+        convert_vacuum (bool): Convert a database without incremental vacuum,
+            blocking it for a full VACUUM. Defaults to the setting.
+    """
+    global last_report  # pylint: disable=global-statement
+
+    settings = settings or MaintenanceSettings.load()
+    now = time.time() if now is None else now
+    db = Connector()
+    report = MaintenanceReport(started_at=now)
+
+    def step(name: str, func: Callable[[], None]):
+        start = time.perf_counter()
+        try:
+            func()
+        except sqlite3.Error as e:
+            logger.error(f"Maintenance step {name} failed: {e}")
+            report.errors[name] = str(e)
+        report.steps[name] = time.perf_counter() - start
+
+    def stamp():
+        # Rows written before update times were tracked start their retention now
+        report.stamped = db.execute(
+            "UPDATE files SET updated_at = ? WHERE updated_at = 0",
+            (now,),
+        ).rowcount
+
+    def archive():
+        if settings.deleted_retention_days > 0:
+            report.archived_deleted = FileMetadata.archive_records(
+                "deleted = 1 AND updated_at < ?",
+                (now - settings.deleted_retention_days * DAY_SECONDS,),
+            )
+        if settings.finished_retention_days > 0:
+            report.archived_finished = FileMetadata.archive_records(
+                "processed = 1 AND deleted = 0 AND updated_at < ?",
+                (now - settings.finished_retention_days * DAY_SECONDS,),
+            )
+
+    def purge():
+        if settings.history_retention_days > 0:
+            before = now - settings.history_retention_days * DAY_SECONDS
+            report.purged = FileMetadata.purge_archive(before)
+            report.purged_attempts = EncodeAttempt.purge(before)
+
+    def vacuum():
+        convert = settings.convert_vacuum if convert_vacuum is None else convert_vacuum
+        report.freed_pages = db.incremental_vacuum(settings.vacuum_pages, convert)
+        # 2 is INCREMENTAL
+        report.incremental_vacuum = db.pragma("auto_vacuum") == 2
+
+    def checkpoint():
+        report.checkpoint = db.checkpoint(settings.checkpoint_mode)
+
+    start = time.perf_counter()
+    step("stamp", stamp)
+    step("archive", archive)
+    step("purge", purge)
+    step("optimize", lambda: db.optimize(settings.analyze))
+    step("vacuum", vacuum)
+    step("checkpoint", checkpoint)
+    report.seconds = time.perf_counter() - start
+
+    logger.info(
+        f"Maintenance finished in {report.seconds:.3f}s: "
+        + ", ".join(f"{name}={seconds:.3f}s" for name, seconds in report.steps.items()),
+    )
+    last_report = report
+    return report
+
+
+async def run_in_thread(settings: MaintenanceSettings):
+    """Runs maintenance in a thread, finishing the run even when cancelled.
+
+    The thread cannot be interrupted, so a cancelled caller waits for the run
+    to end before the cancellation goes through, e.g. before the app closes
+    the connection it uses.
+    """
+    run = asyncio.ensure_future(asyncio.to_thread(run_maintenance, settings))
+    try:
+        await asyncio.shield(run)
+    except asyncio.CancelledError:
+        await asyncio.wait({run})
+        raise
+
+
+async def run_periodically():
+    """Runs maintenance on the configured interval until cancelled.
+
+    Settings are reloaded before every wait, so changes apply from the next run.
+    """
+    while True:
+        settings = MaintenanceSettings.load()
+        await asyncio.sleep(max(settings.interval_minutes, 1.0) * 60)
+        if not settings.enabled:
+            continue
+        try:
+            await run_in_thread(settings)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error(f"Maintenance run failed: {e}")
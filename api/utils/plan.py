@@ -0,0 +1,156 @@
+"""
+Estimates the time and savings of processing the pending files, without
+touching them.
+
+The estimates come from the probe data stored for every file and the
+OutcomeModel learned from files already processed, so a plan for a large
+library is a single pass over the files table.
+"""
+
+import heapq
+import os
+
+from models.file import FileMetadata, path_prefix_range
+from pydantic import BaseModel
+from utils.logger import get_logger
+from utils.priority import OutcomeModel
+from utils.volumes import CORES_PER_ENCODE
+
+logger = get_logger(__name__)
+
+
+class DirectoryPlan(BaseModel):
+    """Estimates for the pending files of a directory."""
+
+    directory: str
+    files: int = 0
+    initial_size: int = 0
+    expected_saved: int = 0
+    encode_seconds: float = 0.0
+
+
+class CapacityPlan(BaseModel):
+    """Estimates for processing the pending files.
+
+    Args:
+        workers (int): Encodes assumed to run at once.
+        files (int): Pending files.
+        unprobed (int): Pending files without probe data, estimated from their
+            size only. Run /files/probe to improve the estimates.
+        initial_size (int): Bytes of the pending files.
+        expected_saved (int): Bytes the conversions are expected to save.
+        encode_hours (float): Encode time of all files back to back.
+        cpu_hours (float): Core hours, assuming each encode keeps
+            CORES_PER_ENCODE cores busy.
+        wall_hours (float): Time until every file is done with the workers,
+            scheduling the longest encodes first.
+        directories (list[DirectoryPlan]): Estimates by directory, biggest
+            savings first.
+    """
+
+    workers: int
+    files: int = 0
+    unprobed: int = 0
+    initial_size: int = 0
+    expected_saved: int = 0
+    encode_hours: float = 0.0
+    cpu_hours: float = 0.0
+    wall_hours: float = 0.0
+    directories: list[DirectoryPlan] = []
+
+
+def directory_key(file_path: str, depth: int = 0) -> str:
+    """Returns the directory a file is grouped under.
+
+    Args:
+        file_path (str): The path of the file.
+        depth (int): Path components kept, e.g. 3 groups `/mnt/media/movies/a/b.mkv`
+            under `/mnt/media/movies`. 0 uses the parent directory.
+    """
+    parent = os.path.dirname(file_path)
+    if depth <= 0:
+        return parent
+    root = os.sep if parent.startswith(os.sep) else ""
+    return root + os.sep.join(parent.strip(os.sep).split(os.sep)[:depth])
+
+
+def makespan(durations: list[float], workers: int) -> float:
+    """Returns the time workers take to finish jobs assigned longest first."""
+    finish_times = [0.0] * max(workers, 1)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(finish_times, finish_times[0] + duration)
+    return max(finish_times)
+
+
+def plan_capacity(
+    workers: int,
+    directory: str = "",
+    depth: int = 0,
+    limit: int = 100,
+    model: OutcomeModel | None = None,
+) -> CapacityPlan:
+    """Estimates the time and savings of processing the pending files.
+
+    Args:
+        workers (int): Encodes assumed to run at once.
+        directory (str): Only plan the files under this directory.
+        depth (int): Path components of the directories files are grouped
+            under, 0 for their parent directory.
+        limit (int): The number of directories returned.
+        model (OutcomeModel): The estimates to use, built from history when omitted.
+    """
+    model = model or OutcomeModel.from_history()
+    where, params = "converted = 0 AND deleted = 0", ()
+    if directory:
+        where += " AND file_path >= ? AND file_path < ?"
+        params = path_prefix_range(directory)
+
+    # Totals per directory: files, initial size, expected saved, encode seconds
+    totals: dict[str, list] = {}
+    durations = []
+    unprobed = 0
+    for file in FileMetadata.iter_records(where, params):
+        expected_saved = model.expected_saved(file)
+        encode_seconds = model.encode_seconds(file)
+        durations.append(encode_seconds)
+        unprobed += not file.video_codec
+
+        key = directory_key(file.file_path, depth)
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = [0, 0, 0, 0.0]
+        total[0] += 1
+        total[1] += file.initial_size
+        total[2] += expected_saved
+        total[3] += encode_seconds
+
+    directories = [
+        DirectoryPlan(
+            directory=key,
+            files=files,
+            initial_size=initial_size,
+            expected_saved=expected_saved,
+            encode_seconds=encode_seconds,
+        )
+        for key, (files, initial_size, expected_saved, encode_seconds) in totals.items()
+    ]
+    directories.sort(key=lambda group: group.expected_saved, reverse=True)
+
+    workers = max(workers, 1)
+    encode_hours = sum(durations) / 3600
+    plan = CapacityPlan(
+        workers=workers,
+        files=len(durations),
+        unprobed=unprobed,
+        initial_size=sum(group.initial_size for group in directories),
+        expected_saved=sum(group.expected_saved for group in directories),
+        encode_hours=encode_hours,
+        cpu_hours=encode_hours * CORES_PER_ENCODE,
+        wall_hours=makespan(durations, workers) / 3600,
+        directories=directories[:limit],
+    )
+    logger.info(
+        f"Planned {plan.files} files: {plan.wall_hours:.1f}h with {plan.workers}"
+        f" workers, {plan.expected_saved} bytes saved",
+    )
+    return plan
@@ -0,0 +1,167 @@
+"""
+Orders pending files by the bytes a conversion is expected to save per second
+of encode time, so the biggest wins are processed first.
+
+Estimates start from per codec priors and are replaced by the outcomes of
+files that have already been processed as history accumulates.
+"""
+
+from models.file import FileMetadata, FileRecord
+from pydantic import BaseModel
+from utils.convert import REMUX_CODECS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Typical output/input size of a libx265 encode by source codec
+PRIOR_SIZE_RATIOS = {
+    "mpeg1video": 0.25,
+    "mpeg2video": 0.3,
+    "mjpeg": 0.2,
+    "msmpeg4v3": 0.45,
+    "mpeg4": 0.45,
+    "wmv3": 0.5,
+    "vc1": 0.5,
+    "h264": 0.6,
+    "vp8": 0.6,
+    "vp9": 0.9,
+    "hevc": 0.95,
+    "av1": 1.0,
+}
+PRIOR_SIZE_RATIO = 0.6
+
+# Weight of the prior, in files, when blending it with observed outcomes
+PRIOR_WEIGHT = 5
+
+# Encode throughput assumed until there is history: 1080p at half real time
+PRIOR_PIXEL_RATE = 1920 * 1080 * 0.5
+PRIOR_BYTE_RATE = 2 * 1024**2
+
+# Remuxes only copy streams, so they are bound by disk throughput
+REMUX_BYTE_RATE = 100 * 1024**2
+
+# Smallest output libx265 is expected to reach, in bits per pixel per second
+FLOOR_BITS_PER_PIXEL = 0.5
+
+
+class OutcomeModel(BaseModel):
+    """Expected size ratios and encode throughput learned from processed files.
+
+    Args:
+        size_ratios (dict[str, float]): Expected output/input size by source codec.
+        pixel_rate (float): Pixels (width * height * seconds) encoded per second.
+        byte_rate (float): Input bytes encoded per second, used without probe data.
+    """
+
+    size_ratios: dict[str, float] = {}
+    pixel_rate: float = PRIOR_PIXEL_RATE
+    byte_rate: float = PRIOR_BYTE_RATE
+
+    @staticmethod
+    def from_history(stats: list[dict] | None = None) -> "OutcomeModel":
+        """Builds the model from the outcomes of processed files."""
+        stats = FileMetadata.get_outcome_stats() if stats is None else stats
+        model = OutcomeModel()
+
+        pixel_seconds = pixel_encode_seconds = initial_size = encode_seconds = 0.0
+        for outcome in stats:
+            prior = PRIOR_SIZE_RATIOS.get(outcome["video_codec"], PRIOR_SIZE_RATIO)
+            observed = outcome["current_size"] / max(outcome["initial_size"], 1)
+            count = outcome["count"]
+            model.size_ratios[outcome["video_codec"]] = (
+                observed * count + prior * PRIOR_WEIGHT
+            ) / (count + PRIOR_WEIGHT)
+
+            # Remux times would inflate the encode throughput
+            if outcome["video_codec"] in REMUX_CODECS:
+                continue
+            pixel_seconds += outcome["pixel_seconds"]
+            pixel_encode_seconds += outcome["pixel_encode_seconds"]
+            initial_size += outcome["initial_size"]
+            encode_seconds += outcome["encode_seconds"]
+
+        if pixel_encode_seconds > 0:
+            model.pixel_rate = pixel_seconds / pixel_encode_seconds
+        if encode_seconds > 0:
+            model.byte_rate = initial_size / encode_seconds
+        return model
+
+    def size_ratio(self, file: FileRecord) -> float:
+        """Returns the expected output/input size of a file."""
+        if file.processed:
+            # Already attempted, the stored size is the best estimate we have
+            return file.current_size / max(file.initial_size, 1)
+        return self.size_ratios.get(
+            file.video_codec,
+            PRIOR_SIZE_RATIOS.get(file.video_codec, PRIOR_SIZE_RATIO),
+        )
+
+    def expected_saved(self, file: FileRecord) -> int:
+        """Returns the bytes a conversion is expected to save."""
+        expected_size = file.initial_size * self.size_ratio(file)
+        if file.width and file.duration:
+            floor = FLOOR_BITS_PER_PIXEL * file.width * file.height * file.duration / 8
+            expected_size = max(expected_size, min(floor, file.initial_size))
+        return max(int(file.initial_size - expected_size), 0)
+
+    def encode_seconds(self, file: FileRecord) -> float:
+        """Returns the expected encode time of a file in seconds."""
+        if file.video_codec in REMUX_CODECS:
+            return max(file.initial_size, 1) / REMUX_BYTE_RATE
+        if file.width and file.duration:
+            return file.width * file.height * file.duration / self.pixel_rate
+        return max(file.initial_size, 1) / self.byte_rate
+
+
+class RankedFile(BaseModel):
+    """A pending file with its expected savings and cost."""
+
+    file_id: str
+    file_path: str
+    initial_size: int
+    video_codec: str
+    expected_saved: int
+    encode_seconds: float
+    score: float
+
+
+def rank_files(
+    files: list[FileRecord],
+    model: OutcomeModel | None = None,
+) -> list[tuple[FileRecord, RankedFile]]:
+    """Ranks files by expected bytes saved per second of encode time.
+
+    Args:
+        files (list[FileRecord]): The files to rank.
+        model (OutcomeModel): The estimates to use, built from history when omitted.
+
+    Returns:
+        list[tuple[FileRecord, RankedFile]]: The files with their estimates, best first.
+    """
+    model = model or OutcomeModel.from_history()
+    ranked = []
+    for file in files:
+        expected_saved = model.expected_saved(file)
+        encode_seconds = model.encode_seconds(file)
+        ranked.append(
+            (
+                file,
+                RankedFile(
+                    file_id=file.file_id,
+                    file_path=file.file_path,
+                    initial_size=file.initial_size,
+                    video_codec=file.video_codec,
+                    expected_saved=expected_saved,
+                    encode_seconds=encode_seconds,
+                    score=expected_saved / max(encode_seconds, 1e-3),
+                ),
+            ),
+        )
+    ranked.sort(key=lambda item: item[1].score, reverse=True)
+    logger.info(f"Ranked {len(ranked)} pending files")
+    return ranked
+
+
+def get_ranked_queue() -> list[tuple[FileRecord, RankedFile]]:
+    """Returns the unconverted files in the order they should be processed."""
+    return rank_files(FileMetadata.get_records_by_converted_status(converted=False))
@@ -0,0 +1,94 @@
+"""Reads container and stream information from media files using ffprobe."""
+
+from pydantic import BaseModel
+from utils.lazy import lazy_import
+from utils.logger import get_logger
+
+ffmpeg = lazy_import("ffmpeg")
+logger = get_logger(__name__)
+
+
+def parse_rate(rate: str) -> float:
+    """Parses a frame rate reported as a fraction, e.g. `24000/1001`."""
+    numerator, _, denominator = rate.partition("/")
+    try:
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+class MediaInfo(BaseModel):
+    """Summary of a media file as reported by ffprobe.
+
+    Args:
+        duration (float): The container duration in seconds.
+        bit_rate (int): The overall bit rate in bits per second.
+        format_name (str): The container format reported by ffprobe.
+        video_codec (str): The codec of the first video stream.
+        width (int): The width of the first video stream.
+        height (int): The height of the first video stream.
+        frame_rate (float): The average frame rate of the first video stream.
+        streams (list[dict]): The raw stream entries reported by ffprobe.
+    """
+
+    duration: float = 0.0
+    bit_rate: int = 0
+    format_name: str = ""
+    video_codec: str = ""
+    width: int = 0
+    height: int = 0
+    frame_rate: float = 0.0
+    streams: list[dict] = []
+
+    @staticmethod
+    def from_file(file_path: str) -> "MediaInfo":
+        """Probes the file and returns its summary.
+
+        Raises:
+            ffmpeg.Error: If ffprobe cannot read the file.
+        """
+        return MediaInfo.from_probe(ffmpeg.probe(file_path))
+
+    @staticmethod
+    def from_probe(probe: dict) -> "MediaInfo":
+        """Builds the summary from the JSON output of ffprobe."""
+        container = probe.get("format", {})
+        streams = probe.get("streams", [])
+        info = MediaInfo(
+            duration=float(container.get("duration") or 0),
+            bit_rate=int(container.get("bit_rate") or 0),
+            format_name=container.get("format_name", ""),
+            streams=streams,
+        )
+
+        video = info.get_streams("video")
+        if video:
+            info.video_codec = video[0].get("codec_name", "")
+            info.width = int(video[0].get("width") or 0)
+            info.height = int(video[0].get("height") or 0)
+            info.frame_rate = parse_rate(video[0].get("avg_frame_rate", ""))
+        return info
+
+    def apply_to(self, file):
+        """Copies the probed properties onto a FileMetadata or FileRecord."""
+        file.video_codec = self.video_codec or "unknown"
+        file.width = self.width
+        file.height = self.height
+        file.duration = self.duration
+        file.bit_rate = self.bit_rate
+
+    def get_streams(self, codec_type: str) -> list[dict]:
+        """Returns the streams of a type, ignoring cover art for video."""
+        return [
+            stream
+            for stream in self.streams
+            if stream.get("codec_type") == codec_type
+            and not stream.get("disposition", {}).get("attached_pic")
+        ]
+
+    def stream_counts(self) -> dict[str, int]:
+        """Returns the number of video, audio and subtitle streams."""
+        return {
+            codec_type: len(self.get_streams(codec_type))
+            for codec_type in ("video", "audio", "subtitle")
+        }
@@ -0,0 +1,241 @@
+"""
+Caps the memory and read bandwidth of ffmpeg jobs.
+
+The memory available to encodes is read from the cgroup of the service (so
+container limits are honoured) or the physical memory, and shared between the
+parallel encodes. Each encode gets an rlimit on its data segment, an x265
+thread layout that fits in its share, and an input read rate that keeps the
+parallel reads within the configured bandwidth. The number of parallel encodes
+is lowered until the largest file of a batch fits.
+"""
+
+import os
+import subprocess
+from collections.abc import Iterable
+
+from models.setting import SettingsGroup
+from pydantic import BaseModel
+from utils.logger import get_logger
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - resource is POSIX only
+    resource = None
+
+logger = get_logger(__name__)
+
+MIB = 1024**2
+
+# cgroup v2 and v1 memory limits of the service
+CGROUP_MEMORY_FILES = (
+    "/sys/fs/cgroup/memory.max",
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+)
+
+# Memory used by ffmpeg besides the x265 frame buffers: demuxing, decoding, audio
+BASE_ENCODE_MEMORY = 256 * MIB
+
+# x265 memory per pixel: the lookahead once, the frame encoders per frame thread
+LOOKAHEAD_BYTES_PER_PIXEL = 60
+FRAME_THREAD_BYTES_PER_PIXEL = 100
+
+# Resolution assumed for files that were not probed
+DEFAULT_PIXELS = 1920 * 1080
+
+
+class ResourceSettings(SettingsGroup):
+    """Settings for the resources of ffmpeg jobs, stored as `resource_<field>`.
+
+    Args:
+        memory_limit_mb (int): Memory shared by all encodes, 0 to use the cgroup
+            limit or the physical memory minus the reserve.
+        memory_reserve_mb (int): Memory left to the rest of the system when the
+            limit is detected.
+        job_memory_mb (int): Memory cap of each encode, 0 for an even share.
+        read_bandwidth_mb (float): Read rate in MB/s shared by all encodes, e.g.
+            what a NAS link sustains, 0 for no limit.
+        job_read_rate_mb (float): Read rate in MB/s of each encode, 0 for an
+            even share of the bandwidth.
+        auto_workers (bool): Lower the parallel encodes until they fit in the
+            memory and bandwidth.
+    """
+
+    prefix = "resource_"
+
+    memory_limit_mb: int = 0
+    memory_reserve_mb: int = 1024
+    job_memory_mb: int = 0
+    read_bandwidth_mb: float = 0.0
+    job_read_rate_mb: float = 0.0
+    auto_workers: bool = True
+
+    def get_memory_budget(self) -> int:
+        """Returns the bytes of memory shared by all encodes."""
+        if self.memory_limit_mb > 0:
+            return self.memory_limit_mb * MIB
+        return max(detect_memory() - self.memory_reserve_mb * MIB, BASE_ENCODE_MEMORY)
+
+
+def detect_memory() -> int:
+    """Returns the memory limit of the cgroup, or the physical memory without one."""
+    physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    for path in CGROUP_MEMORY_FILES:
+        try:
+            with open(path, encoding="utf-8") as handle:
+                limit = handle.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports a huge number when unlimited
+        if limit.isdigit() and int(limit) < physical:
+            return int(limit)
+    return physical
+
+
+def estimate_encode_memory(width: int, height: int, frame_threads: int = 1) -> int:
+    """Returns the memory an x265 encode is expected to use."""
+    pixels = width * height or DEFAULT_PIXELS
+    return BASE_ENCODE_MEMORY + pixels * (
+        LOOKAHEAD_BYTES_PER_PIXEL + FRAME_THREAD_BYTES_PER_PIXEL * frame_threads
+    )
+
+
+def default_frame_threads(cores: int) -> int:
+    """Returns the frame threads x265 picks for a number of cores."""
+    for min_cores, frame_threads in ((32, 6), (16, 5), (8, 3), (4, 2)):
+        if cores >= min_cores:
+            return frame_threads
+    return 1
+
+
+class EncodeBudget(BaseModel):
+    """Resources given to a single ffmpeg job.
+
+    Args:
+        memory (int): Cap on the data segment of the process in bytes, 0 for none.
+        pools (int): Threads of the x265 pool.
+        frame_threads (int): Frames x265 encodes in parallel.
+        read_rate (float): Input bytes read per second, 0 for no limit.
+    """
+
+    memory: int = 0
+    pools: int = 1
+    frame_threads: int = 1
+    read_rate: float = 0.0
+
+    def x265_params(self) -> str:
+        """Returns the x265-params for the thread layout."""
+        return f"pools={self.pools}:frame-threads={self.frame_threads}"
+
+    def input_options(self, bit_rate: int) -> dict:
+        """Returns the ffmpeg input options throttling the read rate.
+
+        ffmpeg's -readrate is relative to real time, so it is derived from the
+        bit rate of the file.
+        """
+        if not self.read_rate or not bit_rate:
+            return {}
+        return {"readrate": round(self.read_rate / (bit_rate / 8), 3)}
+
+
+def plan_budget(
+    width: int,
+    height: int,
+    settings: ResourceSettings,
+    workers: int = 1,
+) -> EncodeBudget:
+    """Returns the resources of one of the parallel encodes.
+
+    Args:
+        width (int): The width of the video, 0 when unknown.
+        height (int): The height of the video, 0 when unknown.
+        settings (ResourceSettings): The configured limits.
+        workers (int): The encodes running in parallel.
+    """
+    workers = max(workers, 1)
+    memory = settings.job_memory_mb * MIB or settings.get_memory_budget() // workers
+    cores = max(1, (os.cpu_count() or 1) // workers)
+
+    frame_threads = default_frame_threads(cores)
+    while (
+        frame_threads > 1
+        and estimate_encode_memory(width, height, frame_threads) > memory
+    ):
+        frame_threads -= 1
+
+    read_rate = settings.job_read_rate_mb * MIB
+    if settings.read_bandwidth_mb > 0:
+        share = settings.read_bandwidth_mb * MIB / workers
+        read_rate = min(read_rate, share) if read_rate else share
+
+    return EncodeBudget(
+        memory=memory,
+        pools=cores,
+        frame_threads=frame_threads,
+        read_rate=read_rate,
+    )
+
+
+def auto_workers(
+    settings: ResourceSettings,
+    max_workers: int,
+    files: Iterable,
+) -> int:
+    """Returns how many encodes can run in parallel without exhausting the resources.
+
+    Args:
+        settings (ResourceSettings): The configured limits.
+        max_workers (int): The configured parallel encodes, never exceeded.
+        files (Iterable): The files to encode, the largest resolution decides.
+    """
+    if not settings.auto_workers:
+        return max(max_workers, 1)
+
+    memory = max(
+        (estimate_encode_memory(file.width, file.height) for file in files),
+        default=estimate_encode_memory(0, 0),
+    )
+    workers = min(max_workers, settings.get_memory_budget() // memory)
+    if settings.read_bandwidth_mb > 0 and settings.job_read_rate_mb > 0:
+        workers = min(
+            workers,
+            int(settings.read_bandwidth_mb // settings.job_read_rate_mb),
+        )
+
+    workers = max(workers, 1)
+    if workers < max_workers:
+        logger.info(
+            f"Limited parallel encodes to {workers} to fit memory and bandwidth",
+        )
+    return workers
+
+
+def limit_memory(pid: int, memory: int):
+    """Caps the data segment of a running process.
+
+    The cap is set with prlimit right after the process starts, as a preexec_fn
+    is not safe from the threads that run the encodes. Without it a runaway
+    encode is OOM killed along with its neighbours instead of failing alone.
+    """
+    if not memory or resource is None or not hasattr(resource, "prlimit"):
+        return
+    try:
+        resource.prlimit(pid, resource.RLIMIT_DATA, (memory, memory))
+    except (OSError, ValueError) as e:
+        logger.info(f"Unable to limit the memory of {pid}: {e}")
+
+
+def wait_with_usage(process: subprocess.Popen) -> tuple[bytes, float]:
+    """Waits for a process, returning its stderr and the CPU seconds it used.
+
+    The CPU time is read from the rusage of the child itself, so it is not
+    mixed up with the other encodes running in parallel. It is 0 where wait4
+    is not available.
+    """
+    err = process.stderr.read() if process.stderr else b""
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return err, 0.0
+
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return err, usage.ru_utime + usage.ru_stime
@@ -3,9 +3,10 @@
 import mimetypes
 import os
 
-from models.file import FileMetadata
-from pydantic import BaseModel
+from models.file import FileRecord
+from pydantic import BaseModel, ConfigDict
 from utils.logger import get_logger
+from utils.volumes import VolumeScheduler, VolumeSettings
 
 logger = get_logger(__name__)
 
@@ -17,48 +18,102 @@ def is_file_a_video(file_path: str) -> bool:
     return mime_type and mime_type.startswith("video")
 
 
+def find_videos(directory: str, recursive: bool = True) -> list[FileRecord]:
+    """Returns records for the video files in a directory.
+
+    Args:
+        directory (str): The directory to search.
+        recursive (bool): Whether to descend into sub directories.
+    """
+    found = []
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            file_path = os.path.join(root, file)
+
+            if not is_file_a_video(file_path):
+                continue
+
+            file_size = os.path.getsize(file_path)
+            found.append(FileRecord.from_path(file_path, file, file_size))
+            logger.debug(f"Found file: {file_path}")
+
+        if not recursive:
+            dirs.clear()
+    return found
+
+
 class ScanDirectory(BaseModel):
     """Given a directory this class scans the directory and
     returns a list of files and metadata.
 
+    Directories are walked in parallel with a concurrency budget per volume, so
+    libraries spanning several disks are scanned at the speed of all of them.
+
     Args:
         root_dir (str): The directory to scan.
-        valid_extensions (list[str]): List of valid extensions to scan for.
+        root_dirs (list[str]): Additional directories to scan, e.g. one per disk.
+        settings (VolumeSettings): The per volume concurrency, defaults if omitted.
     """
 
-    root_dir: str
-    files: dict[str, FileMetadata] = {}
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
-    def __init__(self, root_dir: str = os.getenv("ROOT_DIR", ".")):
+    root_dir: str
+    root_dirs: list[str] = []
+    settings: VolumeSettings = VolumeSettings()
+    files: dict[str, FileRecord] = {}
+
+    def __init__(
+        self,
+        root_dir: str = os.getenv("ROOT_DIR", "."),
+        root_dirs: list[str] | None = None,
+        settings: VolumeSettings | None = None,
+    ):
         """Post-initialization to set up additional attributes."""
-        super().__init__(root_dir=root_dir)
+        super().__init__(
+            root_dir=root_dir,
+            root_dirs=root_dirs or [],
+            settings=settings or VolumeSettings(),
+        )
         self.scan_directory()
 
-    def get_files(self) -> list[FileMetadata]:
+    def get_files(self) -> list[FileRecord]:
         """Return the list of files."""
         return list(self.files.values())
 
-    def scan_directory(self):
-        """Scans the directory and returns a list of files and metadata."""
-        logger.info(f"Scanning directory: {self.root_dir}")
-        for root, _, files in os.walk(self.root_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_name = os.path.basename(file_path)
-
-                if not is_file_a_video(file_path):
-                    continue
+    def get_work_units(self) -> list[tuple[str, bool]]:
+        """Splits the roots into (directory, recursive) units that can be walked in parallel."""
+        units = []
+        for root_dir in dict.fromkeys([self.root_dir, *self.root_dirs]):
+            units.append((root_dir, False))
+            try:
+                with os.scandir(root_dir) as entries:
+                    units.extend(
+                        (entry.path, True)
+                        for entry in entries
+                        if entry.is_dir(follow_symlinks=False)
+                    )
+            except OSError as e:
+                logger.info(f"Unable to scan {root_dir}: {e}")
+        return units
 
-                file_size = os.path.getsize(file_path)
-                file_metadata = FileMetadata(
-                    file_name=file_name,
-                    file_path=file_path,
-                    initial_size=file_size,
-                )
-
-                if file_metadata.file_id in self.files:
-                    logger.debug(f"File already exists: {file_path} -- Updating...")
-
-                self.files[file_metadata.file_id] = file_metadata
-
-                logger.debug(f"Found file: {file_path}")
+    def scan_directory(self):
+        """Scans the directories and returns a list of files and metadata."""
+        logger.info(f"Scanning directories: {[self.root_dir, *self.root_dirs]}")
+        scheduler = VolumeScheduler(
+            self.settings.scan_concurrency,
+            self.settings.max_workers,
+            self.settings.get_overrides(),
+        )
+        results = scheduler.run(
+            lambda unit: find_videos(*unit),
+            self.get_work_units(),
+            path=lambda unit: unit[0],
+        )
+
+        for _, found, _ in results:
+            for file_record in found or []:
+                if file_record.file_id in self.files:
+                    logger.debug(
+                        f"File already exists: {file_record.file_path} -- Updating...",
+                    )
+                self.files[file_record.file_id] = file_record
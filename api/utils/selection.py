@@ -0,0 +1,79 @@
+"""
+Selects files by directory, glob, extension, size and codec.
+
+Filters are translated into a single query on the files table. The directory
+prefix and glob use the file path index, sizes and codecs have their own.
+"""
+
+from collections.abc import Iterator
+
+from models.file import FileMetadata, FileRecord, path_prefix_range
+from pydantic import BaseModel
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def escape_like(value: str) -> str:
+    """Escapes the LIKE wildcards in a value, using a backslash."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class FileSelection(BaseModel):
+    """Filters selecting files to process.
+
+    Args:
+        directory (str): Only files under this directory.
+        glob (str): Case sensitive pattern matched against the full path,
+            e.g. `/mnt/media/shows/*/Season 1/*`.
+        extensions (list[str]): File extensions, matched case insensitively.
+        min_size (int): Smallest file size in bytes.
+        max_size (int): Largest file size in bytes, 0 for no limit.
+        codecs (list[str]): Video codecs reported by the probe.
+        include_converted (bool): Also select files that were already converted.
+    """
+
+    directory: str = ""
+    glob: str = ""
+    extensions: list[str] = []
+    min_size: int = 0
+    max_size: int = 0
+    codecs: list[str] = []
+    include_converted: bool = False
+
+    def to_where(self) -> tuple[str, tuple]:
+        """Returns the SQL condition and parameters of the filters."""
+        conditions = ["deleted = 0"]
+        params: list = []
+        if not self.include_converted:
+            conditions.append("converted = 0")
+        if self.directory:
+            conditions.append("file_path >= ? AND file_path < ?")
+            params += path_prefix_range(self.directory)
+        if self.glob:
+            conditions.append("file_path GLOB ?")
+            params.append(self.glob)
+        if self.extensions:
+            extensions = [extension.lstrip(".") for extension in self.extensions]
+            conditions.append(
+                "("
+                + " OR ".join(["file_name LIKE ? ESCAPE '\\'"] * len(extensions))
+                + ")",
+            )
+            params += [f"%.{escape_like(extension)}" for extension in extensions]
+        if self.min_size:
+            conditions.append("initial_size >= ?")
+            params.append(self.min_size)
+        if self.max_size:
+            conditions.append("initial_size <= ?")
+            params.append(self.max_size)
+        if self.codecs:
+            conditions.append(f"video_codec IN ({', '.join('?' * len(self.codecs))})")
+            params += self.codecs
+        return " AND ".join(conditions), tuple(params)
+
+    def iter_records(self) -> Iterator[FileRecord]:
+        """Streams the selected files."""
+        where, params = self.to_where()
+        logger.info(f"Selecting files where {where}: {params}")
+        return FileMetadata.iter_records(where, params)
@@ -0,0 +1,196 @@
+"""
+Plans how each audio and subtitle stream is carried into the converted file.
+Compatible audio is copied, lossless or oversized tracks are transcoded (and
+optionally downmixed), languages can be pruned and subtitles are preserved.
+"""
+
+from models.setting import SettingsGroup
+from pydantic import BaseModel
+from utils.logger import get_logger
+from utils.probe import MediaInfo
+
+logger = get_logger(__name__)
+
+LOSSLESS_AUDIO_CODECS = {"truehd", "mlp", "flac", "alac"}
+
+# Subtitle codecs the Matroska muxer accepts as-is
+COPY_SUBTITLE_CODECS = {
+    "subrip",
+    "ass",
+    "ssa",
+    "webvtt",
+    "hdmv_pgs_subtitle",
+    "dvd_subtitle",
+    "dvb_subtitle",
+}
+
+# Text subtitles that have to be converted to SubRip for Matroska
+TEXT_SUBTITLE_CODECS = {"mov_text", "text", "srt"}
+
+UNDEFINED_LANGUAGES = {"", "und"}
+
+
+class StreamSettings(SettingsGroup):
+    """Settings for audio and subtitle handling, stored under the field names.
+
+    Args:
+        audio_codec (str): The codec used when an audio track is transcoded.
+        audio_bitrate_per_channel (int): The transcode bit rate per channel in kb/s.
+        audio_max_bitrate (int): Tracks above this bit rate in kb/s are transcoded.
+        audio_max_channels (int): Tracks with more channels are downmixed, 0 to keep.
+        audio_languages (str): Comma separated languages to keep, empty keeps all.
+        subtitle_languages (str): Comma separated languages to keep, empty keeps all.
+        keep_subtitles (bool): Whether subtitle tracks are carried over at all.
+    """
+
+    audio_codec: str = "aac"
+    audio_bitrate_per_channel: int = 96
+    audio_max_bitrate: int = 1536
+    audio_max_channels: int = 0
+    audio_languages: str = ""
+    subtitle_languages: str = ""
+    keep_subtitles: bool = True
+
+
+class StreamPlan(BaseModel):
+    """The streams mapped to the output and the options applied to them.
+
+    Args:
+        streams (list[str]): Input stream specifiers in output order.
+        options (dict[str, str]): Per output stream ffmpeg options.
+        expected_streams (dict[str, int]): The stream counts of the output.
+    """
+
+    streams: list[str] = []
+    options: dict[str, str] = {}
+    expected_streams: dict[str, int] = {}
+
+
+def parse_languages(languages: str) -> set[str]:
+    """Parses a comma separated list of language codes."""
+    return {
+        language.strip().lower()
+        for language in languages.split(",")
+        if language.strip()
+    }
+
+
+def get_language(stream: dict) -> str:
+    """Returns the language tag of a stream."""
+    return stream.get("tags", {}).get("language", "").lower()
+
+
+def select_languages(
+    streams: list[dict],
+    languages: set[str],
+    fallback: bool = False,
+) -> list[dict]:
+    """Keeps untagged streams and those in one of the languages.
+
+    With fallback, every stream is kept when nothing matches, so a file is never
+    left without audio because of a language filter.
+    """
+    if not languages:
+        return streams
+    selected = [
+        stream
+        for stream in streams
+        if get_language(stream) in languages | UNDEFINED_LANGUAGES
+    ]
+    return selected or (streams if fallback else [])
+
+
+def is_lossless_audio(stream: dict) -> bool:
+    """Returns whether the audio stream uses a lossless codec."""
+    codec = stream.get("codec_name", "")
+    profile = stream.get("profile", "")
+    return (
+        codec in LOSSLESS_AUDIO_CODECS
+        or codec.startswith("pcm_")
+        or (codec == "dts" and "MA" in profile)
+    )
+
+
+def plan_audio(stream: dict, index: int, settings: StreamSettings) -> dict[str, str]:
+    """Returns the options for the audio stream at an output audio index."""
+    channels = int(stream.get("channels") or 2)
+    target_channels = channels
+    if settings.audio_max_channels:
+        target_channels = min(channels, settings.audio_max_channels)
+    bit_rate = int(stream.get("bit_rate") or 0) // 1000
+
+    transcode = (
+        is_lossless_audio(stream)
+        or bit_rate > settings.audio_max_bitrate
+        or target_channels < channels
+    )
+    if not transcode:
+        return {f"c:a:{index}": "copy"}
+
+    options = {
+        f"c:a:{index}": settings.audio_codec,
+        f"b:a:{index}": f"{settings.audio_bitrate_per_channel * target_channels}k",
+    }
+    if target_channels < channels:
+        options[f"ac:a:{index}"] = str(target_channels)
+    logger.debug(f"Transcoding audio stream {stream.get('index')}: {options}")
+    return options
+
+
+def plan_streams(info: MediaInfo, settings: StreamSettings) -> StreamPlan:
+    """Plans the stream mapping for converting a file to Matroska.
+
+    Args:
+        info (MediaInfo): The probed input file.
+        settings (StreamSettings): The audio and subtitle preferences.
+
+    Returns:
+        StreamPlan: Streams to map and the options for the audio and subtitles.
+    """
+    plan = StreamPlan()
+
+    video = info.get_streams("video")
+    plan.streams.extend(str(stream["index"]) for stream in video)
+
+    audio = select_languages(
+        info.get_streams("audio"),
+        parse_languages(settings.audio_languages),
+        fallback=True,
+    )
+    for index, stream in enumerate(audio):
+        plan.streams.append(str(stream["index"]))
+        plan.options.update(plan_audio(stream, index, settings))
+
+    subtitles = []
+    if settings.keep_subtitles:
+        subtitles = select_languages(
+            info.get_streams("subtitle"),
+            parse_languages(settings.subtitle_languages),
+        )
+    subtitle_index = 0
+    for stream in subtitles:
+        codec = stream.get("codec_name", "")
+        if codec in COPY_SUBTITLE_CODECS:
+            plan.options[f"c:s:{subtitle_index}"] = "copy"
+        elif codec in TEXT_SUBTITLE_CODECS:
+            plan.options[f"c:s:{subtitle_index}"] = "srt"
+        else:
+            logger.info(
+                f"Dropping unsupported subtitle stream {stream['index']}: {codec}",
+            )
+            continue
+        plan.streams.append(str(stream["index"]))
+        subtitle_index += 1
+
+    # Fonts attached for styled subtitles
+    attachments = info.get_streams("attachment") if subtitle_index else []
+    if attachments:
+        plan.streams.extend(str(stream["index"]) for stream in attachments)
+        plan.options["c:t"] = "copy"
+
+    plan.expected_streams = {
+        "video": len(video),
+        "audio": len(audio),
+        "subtitle": subtitle_index,
+    }
+    return plan
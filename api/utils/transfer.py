@@ -0,0 +1,288 @@
+"""
+Exports and imports whole tables of the library index in bulk.
+
+Tables are streamed in chunks as gzip compressed NDJSON, one object per row,
+or as Parquet when the optional pyarrow package is installed, so the index can
+be moved between hosts or analysed offline with vectorized tools. Imports are
+written in chunked executemany transactions, so memory stays flat however
+large the table is.
+"""
+
+import gzip
+import importlib.util
+import io
+import json
+import zlib
+from collections.abc import Iterator
+from itertools import islice
+from typing import IO, Literal
+
+from models.file import ARCHIVE_COLUMNS, FileMetadata, file_id_for_path
+from models.history import EncodeAttempt
+from models.setting import Setting
+from pydantic import BaseModel
+from utils.db import Connector
+from utils.lazy import lazy_import
+from utils.logger import get_logger
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+logger = get_logger(__name__)
+
+# Static instance of the database connector
+db = Connector()
+
+TransferFormat = Literal["ndjson", "parquet"]
+
+
+class TransferTable(BaseModel):
+    """A table that can be transferred, described by its model.
+
+    Args:
+        model (type[BaseModel]): Gives the types and defaults of the columns.
+        columns (tuple[str, ...]): The model fields stored in the table, all when empty.
+        extra_columns (dict[str, type]): Columns outside the model, None when missing.
+    """
+
+    model: type[BaseModel]
+    columns: tuple[str, ...] = ()
+    extra_columns: dict[str, type] = {}
+
+    def get_columns(self) -> dict[str, type]:
+        """Returns the columns of the table and their Python types."""
+        fields = self.model.model_fields
+        columns = {
+            column: fields[column].annotation for column in self.columns or fields
+        }
+        return {**self.extra_columns, **columns}
+
+    def get_defaults(self) -> dict:
+        """Returns the values of the columns that may be missing from an export."""
+        fields = self.model.model_fields
+        defaults = {
+            column: fields[column].get_default()
+            for column in self.columns or fields
+            if not fields[column].is_required()
+        }
+        return {**dict.fromkeys(self.extra_columns), **defaults}
+
+
+# Tables that can be transferred. The archive and the encode history move with
+# the files, or archived files are rescanned as new and the tuning starts over
+TABLES: dict[str, TransferTable] = {
+    "files": TransferTable(model=FileMetadata),
+    "files_archive": TransferTable(
+        model=FileMetadata,
+        columns=ARCHIVE_COLUMNS,
+        extra_columns={"archived_at": float},
+    ),
+    "settings": TransferTable(model=Setting),
+    # A missing attempt_id is assigned on import
+    "encode_history": TransferTable(
+        model=EncodeAttempt,
+        extra_columns={"attempt_id": int},
+    ),
+}
+
+# Rows per fetch, Parquet row group and import transaction
+CHUNK_SIZE = 10_000
+
+FILE_EXTENSIONS = {"ndjson": ".ndjson.gz", "parquet": ".parquet"}
+MEDIA_TYPES = {
+    "ndjson": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Returns whether the optional pyarrow package is installed."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def format_for_path(path: str) -> TransferFormat:
+    """Returns the format of a file from its extension, NDJSON unless Parquet."""
+    return "parquet" if path.endswith(".parquet") else "ndjson"
+
+
+def get_columns(table: str) -> dict[str, type]:
+    """Returns the columns of a table and their Python types.
+
+    Raises:
+        ValueError: The table cannot be transferred.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    return TABLES[table].get_columns()
+
+
+def iter_chunks(table: str) -> Iterator[list[tuple]]:
+    """Streams the rows of a table in chunks, with the values of the model types.
+
+    SQLite returns booleans as integers and numeric settings as numbers, so
+    every value is converted back to the type of its column.
+    """
+    columns = get_columns(table)
+    types = tuple(columns.values())
+    cursor = db.query(f"SELECT {', '.join(columns)} FROM {table}")
+    while rows := cursor.fetchmany(CHUNK_SIZE):
+        yield [
+            tuple(
+                value if value is None else kind(value)
+                for kind, value in zip(types, row)
+            )
+            for row in rows
+        ]
+
+
+def iter_ndjson(table: str) -> Iterator[bytes]:
+    """Streams a table as gzip compressed NDJSON."""
+    columns = tuple(get_columns(table))
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in iter_chunks(table):
+        lines = "".join(
+            json.dumps(dict(zip(columns, row)), separators=(",", ":")) + "\n"
+            for row in chunk
+        )
+        if data := compressor.compress(lines.encode()):
+            yield data
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what the Parquet writer wrote since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks: list[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema(table: str):
+    """Returns the Arrow schema of a table."""
+    arrow_types = {
+        str: pa.string(),
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+    }
+    return pa.schema(
+        [(column, arrow_types[kind]) for column, kind in get_columns(table).items()],
+    )
+
+
+def iter_parquet(table: str) -> Iterator[bytes]:
+    """Streams a table as Parquet, one row group per chunk."""
+    schema = arrow_schema(table)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in iter_chunks(table):
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*chunk), schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_table(table: str, file_format: TransferFormat = "ndjson") -> Iterator[bytes]:
+    """Streams a table in the given format.
+
+    Args:
+        table (str): files, files_archive, settings or encode_history.
+        file_format (TransferFormat): ndjson (gzip compressed) or parquet.
+
+    Raises:
+        ValueError: The table cannot be transferred.
+        ImportError: Parquet was asked for without pyarrow.
+    """
+    get_columns(table)
+    if file_format == "parquet":
+        if not parquet_available():
+            raise ImportError("Parquet requires the optional pyarrow package")
+        return iter_parquet(table)
+    return iter_ndjson(table)
+
+
+def read_ndjson(source: IO[bytes]) -> Iterator[dict]:
+    """Streams the rows of a gzip compressed NDJSON file."""
+    with gzip.open(source, "rt", encoding="utf-8") as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_parquet(source: IO[bytes]) -> Iterator[dict]:
+    """Streams the rows of a Parquet file, one row group at a time."""
+    if not parquet_available():
+        raise ImportError("Parquet requires the optional pyarrow package")
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=CHUNK_SIZE):
+        yield from batch.to_pylist()
+
+
+def import_table(
+    table: str,
+    source: IO[bytes],
+    file_format: TransferFormat = "ndjson",
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Writes the rows of an export into a table, replacing rows with the same key.
+
+    Columns missing from the export, e.g. one written before a column was
+    added, take the default of the model, and unknown columns are ignored.
+
+    Args:
+        table (str): files, files_archive, settings or encode_history.
+        source (IO[bytes]): The exported file, opened in binary mode.
+        file_format (TransferFormat): ndjson (gzip compressed) or parquet.
+        chunk_size (int): Rows written per transaction.
+
+    Returns:
+        int: The number of rows imported.
+
+    Raises:
+        ValueError: The table cannot be transferred, or a row lacks a required column.
+        ImportError: Parquet was asked for without pyarrow.
+    """
+    columns = get_columns(table)
+    defaults = TABLES[table].get_defaults()
+
+    def to_params(row: dict) -> tuple:
+        if "file_id" in columns and not row.get("file_id") and row.get("file_path"):
+            row["file_id"] = file_id_for_path(row["file_path"])
+        missing = [
+            column for column in columns if column not in row and column not in defaults
+        ]
+        if missing:
+            raise ValueError(f"Row of {table} is missing {', '.join(missing)}")
+        return tuple(row.get(column, defaults.get(column)) for column in columns)
+
+    rows = read_parquet(source) if file_format == "parquet" else read_ndjson(source)
+    params = map(to_params, rows)
+    sql = (
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)})"
+        f" VALUES ({', '.join('?' * len(columns))})"
+    )
+
+    imported = 0
+    while chunk := list(islice(params, chunk_size)):
+        db.executemany(sql, chunk)
+        imported += len(chunk)
+    logger.info(f"Imported {imported} rows into {table}")
+    return imported
@@ -0,0 +1,133 @@
+"""
+Picks the x265 CRF and preset that save the most bytes per CPU second.
+
+Sources are grouped by codec, resolution and bit rate. Within a group the
+profile with the best history is used, and a share of the encodes tries the
+least tested candidate so the history keeps covering the alternatives.
+"""
+
+import random
+
+from models.history import EncodeAttempt, bitrate_bucket, resolution_bucket
+from models.setting import SettingsGroup
+from pydantic import BaseModel
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TuningSettings(SettingsGroup):
+    """Settings for the adaptive encode profiles, stored as `tuning_<field>`.
+
+    Args:
+        enabled (bool): Pick profiles from history instead of the defaults.
+        default_crf (int): CRF used until a group has enough history.
+        default_preset (str): Preset used until a group has enough history.
+        crfs (str): Comma separated CRF candidates.
+        presets (str): Comma separated preset candidates.
+        min_attempts (int): Attempts before the history of a profile is trusted.
+        explore_rate (float): Share of encodes trying the least tested candidate.
+    """
+
+    prefix = "tuning_"
+
+    enabled: bool = True
+    default_crf: int = 28
+    default_preset: str = "medium"
+    crfs: str = "24,26,28,30"
+    presets: str = "fast,medium,slow"
+    min_attempts: int = 3
+    explore_rate: float = 0.1
+
+    def get_candidates(self) -> list[tuple[int, str]]:
+        """Returns the candidate profiles, the default first."""
+        crfs = [int(crf) for crf in self.crfs.split(",") if crf.strip()]
+        presets = [
+            preset.strip() for preset in self.presets.split(",") if preset.strip()
+        ]
+        default = (self.default_crf, self.default_preset)
+        return [default] + [
+            (crf, preset)
+            for crf in crfs
+            for preset in presets
+            if (crf, preset) != default
+        ]
+
+
+class EncodeProfile(BaseModel):
+    """The x265 settings of an encode and why they were picked.
+
+    Args:
+        crf (int): The constant rate factor.
+        preset (str): The speed preset.
+        reason (str): default, history or explore.
+        score (float): Bytes saved per CPU second in the history, 0 without.
+    """
+
+    crf: int
+    preset: str
+    reason: str = "default"
+    score: float = 0.0
+
+
+def choose_profile(
+    video_codec: str,
+    height: int,
+    bit_rate: int,
+    settings: TuningSettings | None = None,
+    stats: list[dict] | None = None,
+    rng: random.Random | None = None,
+) -> EncodeProfile:
+    """Picks the profile for a source from the history of similar sources.
+
+    Args:
+        video_codec (str): The video codec of the source.
+        height (int): The frame height of the source, 0 when unknown.
+        bit_rate (int): The bit rate of the source, 0 when unknown.
+        settings (TuningSettings): The candidates, loaded when omitted.
+        stats (list[dict]): The profile outcomes, read from history when omitted.
+        rng (random.Random): Decides when to explore.
+    """
+    settings = settings or TuningSettings.load()
+    default = EncodeProfile(crf=settings.default_crf, preset=settings.default_preset)
+    if not settings.enabled:
+        return default
+
+    if stats is None:
+        stats = EncodeAttempt.get_profile_stats(
+            video_codec,
+            resolution_bucket(height),
+            bitrate_bucket(bit_rate),
+        )
+    attempts = {(stat["crf"], stat["preset"]): stat for stat in stats}
+
+    candidates = settings.get_candidates()
+    trusted = [
+        stat
+        for stat in stats
+        if stat["attempts"] >= settings.min_attempts
+        and (stat["crf"], stat["preset"]) in candidates
+    ]
+    if not trusted:
+        # Build up the history of the default profile first
+        return default
+
+    if (rng or random).random() < settings.explore_rate:
+        crf, preset = min(
+            candidates,
+            key=lambda candidate: attempts.get(candidate, {}).get("attempts", 0),
+        )
+        return EncodeProfile(crf=crf, preset=preset, reason="explore")
+
+    best = max(trusted, key=lambda stat: stat["saved"] / max(stat["cpu_seconds"], 1e-3))
+    profile = EncodeProfile(
+        crf=best["crf"],
+        preset=best["preset"],
+        reason="history",
+        score=best["saved"] / max(best["cpu_seconds"], 1e-3),
+    )
+    logger.info(
+        f"Picked crf {profile.crf} {profile.preset} for {video_codec}"
+        f" {resolution_bucket(height)} {bitrate_bucket(bit_rate)}Mb/s",
+    )
+    return profile
@@ -0,0 +1,239 @@
+"""
+Verifies an encoded output before it is allowed to replace the original.
+Checks duration and stream parity, then scores a few sampled segments with
+SSIM/PSNR (and VMAF when ffmpeg is built with libvmaf) against the source.
+"""
+
+import re
+import subprocess
+from functools import cache
+
+from models.setting import SettingsGroup
+from pydantic import BaseModel
+from utils.lazy import lazy_import
+from utils.logger import get_logger
+from utils.probe import MediaInfo
+
+ffmpeg = lazy_import("ffmpeg")
+logger = get_logger(__name__)
+
+# Scores are capped as PSNR is infinite for identical frames, which JSON cannot encode
+MAX_SCORE = 100.0
+
+SSIM_PATTERN = re.compile(r"SSIM .*All:([\d.]+)")
+PSNR_PATTERN = re.compile(r"PSNR .*average:([\d.]+|inf)")
+VMAF_PATTERN = re.compile(r"VMAF score[:=] *([\d.]+)")
+
+
+class QualitySettings(SettingsGroup):
+    """Settings for the post-encode verification, stored as `quality_<field>`.
+
+    Args:
+        enabled (bool): Whether outputs are verified before replacing the source.
+        min_ssim (float): The lowest average SSIM accepted, 0 to disable.
+        min_psnr (float): The lowest average PSNR accepted, 0 to disable.
+        min_vmaf (float): The lowest average VMAF accepted when libvmaf is
+            available, 0 to disable.
+        samples (int): The number of segments scored per file.
+        sample_seconds (float): The length of each scored segment.
+        duration_tolerance (float): The allowed duration difference in seconds.
+    """
+
+    prefix = "quality_"
+
+    enabled: bool = True
+    min_ssim: float = 0.95
+    min_psnr: float = 0.0
+    min_vmaf: float = 0.0
+    samples: int = 3
+    sample_seconds: float = 2.0
+    duration_tolerance: float = 1.0
+
+
+class QualityReport(BaseModel):
+    """Outcome of verifying an encoded output."""
+
+    ssim: float = 0.0
+    psnr: float = 0.0
+    vmaf: float = 0.0
+    passed: bool = False
+    reasons: list[str] = []
+
+
+@cache
+def has_vmaf() -> bool:
+    """Returns whether the installed ffmpeg provides the libvmaf filter."""
+    try:
+        filters = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-filters"],
+            capture_output=True,
+            text=True,
+            check=False,
+        ).stdout
+    except OSError:
+        return False
+    return " libvmaf " in filters
+
+
+def check_parity(
+    source: MediaInfo,
+    output: MediaInfo,
+    duration_tolerance: float,
+    expected_streams: dict[str, int] | None = None,
+) -> list[str]:
+    """Compares the duration and streams of the output with the source.
+
+    Args:
+        source (MediaInfo): The probed source file.
+        output (MediaInfo): The probed output file.
+        duration_tolerance (float): The allowed duration difference in seconds.
+        expected_streams (dict[str, int]): The stream counts the output should
+            have, defaults to the stream counts of the source.
+
+    Returns:
+        list[str]: The reasons the output does not match, empty if it does.
+    """
+    reasons = []
+    if abs(source.duration - output.duration) > duration_tolerance:
+        reasons.append(
+            f"duration {output.duration:.2f}s does not match source {source.duration:.2f}s",
+        )
+
+    expected = expected_streams or source.stream_counts()
+    actual = output.stream_counts()
+    for codec_type, count in expected.items():
+        if actual.get(codec_type, 0) != count:
+            reasons.append(
+                f"{actual.get(codec_type, 0)} {codec_type} streams, expected {count}",
+            )
+    return reasons
+
+
+def sample_offsets(duration: float, samples: int, sample_seconds: float) -> list[float]:
+    """Returns evenly spaced segment start times that avoid the very start and end."""
+    if duration <= sample_seconds or samples <= 1:
+        return [0.0]
+    span = duration - sample_seconds
+    return [span * (index + 1) / (samples + 1) for index in range(samples)]
+
+
+def measure_quality(
+    reference: str,
+    distorted: str,
+    offset: float,
+    sample_seconds: float,
+    vmaf: bool = False,
+) -> dict[str, float]:
+    """Scores one segment of the distorted file against the reference.
+
+    Raises:
+        ffmpeg.Error: If ffmpeg cannot compare the segments.
+    """
+
+    def segment(file_path: str):
+        stream = ffmpeg.input(file_path, ss=offset, t=sample_seconds).video
+        return stream.filter("setpts", "PTS-STARTPTS").split()
+
+    metrics = ["ssim", "psnr"] + (["libvmaf"] if vmaf else [])
+    ref, dist = segment(reference), segment(distorted)
+    scored = [
+        ffmpeg.filter([dist[index], ref[index]], metric)
+        for index, metric in enumerate(metrics)
+    ]
+    _, stderr = ffmpeg.output(*scored, "-", format="null").run(
+        capture_stdout=True,
+        capture_stderr=True,
+    )
+    log = stderr.decode(errors="ignore")
+
+    scores = {}
+    for name, pattern in (
+        ("ssim", SSIM_PATTERN),
+        ("psnr", PSNR_PATTERN),
+        ("vmaf", VMAF_PATTERN),
+    ):
+        match = pattern.search(log)
+        if match:
+            scores[name] = min(float(match.group(1)), MAX_SCORE)
+    return scores
+
+
+def verify_output(
+    source_file: str,
+    output_file: str,
+    settings: QualitySettings | None = None,
+    expected_streams: dict[str, int] | None = None,
+    measure: bool = True,
+) -> QualityReport:
+    """Checks that the output is complete and above the configured quality floor.
+
+    Args:
+        source_file (str): Path to the original file.
+        output_file (str): Path to the encoded file.
+        settings (QualitySettings): The thresholds, loaded from the settings table
+            when omitted.
+        expected_streams (dict[str, int]): The stream counts the output should have.
+        measure (bool): Score sampled segments, skipped for stream copies.
+
+    Returns:
+        QualityReport: The sampled scores and whether the output passed.
+    """
+    settings = settings or QualitySettings.load()
+    report = QualityReport()
+    if not settings.enabled:
+        report.passed = True
+        return report
+
+    try:
+        source = MediaInfo.from_file(source_file)
+        output = MediaInfo.from_file(output_file)
+    except ffmpeg.Error as e:
+        report.reasons.append(f"unable to probe output: {e}")
+        return report
+
+    report.reasons.extend(
+        check_parity(source, output, settings.duration_tolerance, expected_streams),
+    )
+    if report.reasons:
+        logger.info(f"Parity check failed for {output_file}: {report.reasons}")
+        return report
+
+    if not measure:
+        report.passed = True
+        return report
+
+    vmaf = settings.min_vmaf > 0 and has_vmaf()
+    offsets = sample_offsets(source.duration, settings.samples, settings.sample_seconds)
+    totals: dict[str, float] = {}
+    try:
+        for offset in offsets:
+            for name, score in measure_quality(
+                source_file,
+                output_file,
+                offset,
+                settings.sample_seconds,
+                vmaf,
+            ).items():
+                totals[name] = totals.get(name, 0.0) + score
+    except ffmpeg.Error as e:
+        report.reasons.append(f"unable to score output: {e}")
+        return report
+
+    report.ssim = totals.get("ssim", 0.0) / len(offsets)
+    report.psnr = totals.get("psnr", 0.0) / len(offsets)
+    report.vmaf = totals.get("vmaf", 0.0) / len(offsets)
+
+    for name, score, floor in (
+        ("SSIM", report.ssim, settings.min_ssim),
+        ("PSNR", report.psnr, settings.min_psnr),
+        ("VMAF", report.vmaf, settings.min_vmaf if vmaf else 0),
+    ):
+        if floor > 0 and score < floor:
+            report.reasons.append(f"{name} {score:.3f} is below {floor}")
+
+    report.passed = not report.reasons
+    logger.info(
+        f"Verified {output_file}: SSIM {report.ssim:.4f}, PSNR {report.psnr:.2f},"
+        f" VMAF {report.vmaf:.2f} => {'passed' if report.passed else report.reasons}",
+    )
+    return report
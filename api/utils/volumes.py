@@ -0,0 +1,223 @@
+"""
+Runs file system work with a concurrency budget per volume.
+
+Work items are grouped by the device (st_dev) of their path and every device
+gets its own workers, so slow disks or network mounts only hold up their own
+items while the other volumes keep going.
+"""
+
+import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from models.setting import SettingsGroup
+from pydantic import Field
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Cores a libx265 encode keeps busy
+CORES_PER_ENCODE = 4
+
+
+def default_encode_workers() -> int:
+    """Returns the default number of parallel encodes, as libx265 uses several cores each."""
+    return max(1, (os.cpu_count() or 1) // CORES_PER_ENCODE)
+
+
+class VolumeSettings(SettingsGroup):
+    """Settings for multi-volume libraries, stored as `volume_<field>`.
+
+    Args:
+        library_roots (str): Comma separated directories scanned when a scan
+            request does not name any.
+        scan_concurrency (int): Directory walks running at once per device.
+        read_concurrency (int): File checks running at once per device.
+        encode_concurrency (int): Conversions running at once per device.
+        max_encodes (int): Conversions running at once across all devices.
+        max_workers (int): Threads used for scans and checks across all devices.
+        overrides (str): Comma separated `path=concurrency` pairs replacing the
+            per device budget for volumes under the path, e.g. `/mnt/nas=1`.
+    """
+
+    prefix = "volume_"
+
+    library_roots: str = ""
+    scan_concurrency: int = 2
+    read_concurrency: int = 8
+    encode_concurrency: int = 1
+    max_encodes: int = Field(default_factory=default_encode_workers)
+    max_workers: int = 32
+    overrides: str = ""
+
+    def get_library_roots(self) -> list[str]:
+        """Returns the configured library roots."""
+        return [root.strip() for root in self.library_roots.split(",") if root.strip()]
+
+    def get_overrides(self) -> dict[str, int]:
+        """Returns the per path concurrency overrides."""
+        overrides = {}
+        for pair in self.overrides.split(","):
+            path, _, concurrency = pair.partition("=")
+            if path.strip() and concurrency.strip():
+                overrides[os.path.abspath(path.strip())] = int(concurrency)
+        return overrides
+
+
+def device_of(path: str) -> int:
+    """Returns the device of a path, using the closest existing parent for missing files."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return -1
+            path = parent
+
+
+def interleave(groups: Iterable[list]) -> list:
+    """Merges groups round-robin, keeping the order within each group."""
+    queues = [deque(group) for group in groups if group]
+    merged = []
+    while queues:
+        for queue in list(queues):
+            merged.append(queue.popleft())
+            if not queue:
+                queues.remove(queue)
+    return merged
+
+
+class VolumeScheduler:
+    """Runs work items with a concurrency budget per device.
+
+    Args:
+        concurrency (int): The number of items running at once per device.
+        max_workers (int): The number of items running at once across devices.
+        overrides (dict[str, int]): Per path budgets replacing the concurrency
+            for devices whose items live under the path.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        max_workers: int,
+        overrides: dict[str, int] | None = None,
+    ):
+        self.concurrency = max(concurrency, 1)
+        self.max_workers = max(max_workers, 1)
+        self.overrides = overrides or {}
+
+    def budget_for(self, path: str) -> int:
+        """Returns the concurrency for the device holding a path."""
+        path = os.path.abspath(path)
+        for prefix, concurrency in sorted(
+            self.overrides.items(),
+            key=lambda o: -len(o[0]),
+        ):
+            if path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep):
+                return max(concurrency, 1)
+        return self.concurrency
+
+    def group(
+        self,
+        items: Iterable[Any],
+        path: Callable[[Any], str] = str,
+    ) -> dict[int, list]:
+        """Groups items by the device of their path, keeping their order."""
+        groups: dict[int, list] = {}
+        devices: dict[str, int] = {}
+        for item in items:
+            item_path = path(item)
+            if item_path not in devices:
+                devices[item_path] = device_of(item_path)
+            groups.setdefault(devices[item_path], []).append(item)
+        return groups
+
+    def get_budgets(
+        self,
+        groups: dict[int, list],
+        path: Callable[[Any], str] = str,
+    ) -> dict[int, int]:
+        """Returns the workers of every device, never more than it has items.
+
+        The budgets are scaled down when they exceed the global cap, but every
+        device keeps at least one worker, so their sum can still exceed it.
+        """
+        budgets = {
+            device: min(self.budget_for(path(queue[0])), len(queue))
+            for device, queue in groups.items()
+        }
+        scale = min(1.0, self.max_workers / max(sum(budgets.values()), 1))
+        return {
+            device: max(1, int(budget * scale)) for device, budget in budgets.items()
+        }
+
+    def get_concurrency(
+        self,
+        items: Iterable[Any],
+        path: Callable[[Any], str] = str,
+    ) -> int:
+        """Returns how many items run() would run at once."""
+        budgets = self.get_budgets(self.group(items, path), path)
+        return min(self.max_workers, sum(budgets.values()))
+
+    def run(
+        self,
+        func: Callable[[Any], Any],
+        items: Iterable[Any],
+        path: Callable[[Any], str] = str,
+    ) -> list[tuple[Any, Any, Exception | None]]:
+        """Runs func on every item, interleaving work across devices.
+
+        Args:
+            func (Callable): The work to run for an item.
+            items (Iterable): The items, processed in order within each device.
+            path (Callable): Returns the path identifying the volume of an item.
+                Devices are looked up once per distinct path, so pass the
+                directory of a file to avoid a stat per file.
+
+        Returns:
+            list[tuple]: (item, result, error) for every item, in completion order.
+        """
+        groups = self.group(items, path)
+        if not groups:
+            return []
+
+        budgets = self.get_budgets(groups, path)
+        queues = {device: deque(queue) for device, queue in groups.items()}
+        results = []
+
+        # Enforces the global cap, as every device has a worker even when
+        # there are more devices than the cap
+        slots = threading.Semaphore(self.max_workers)
+
+        def worker(queue: deque):
+            while True:
+                with slots:
+                    try:
+                        item = queue.popleft()
+                    except IndexError:
+                        return
+                    try:
+                        results.append((item, func(item), None))
+                    except Exception as e:  # pylint: disable=broad-except
+                        logger.info(f"Failed to process {item}: {e}")
+                        results.append((item, None, e))
+
+        # Start one worker per device before the second of any, so every
+        # volume is busy as early as possible
+        workers = interleave(
+            [[queues[device]] * budget for device, budget in budgets.items()],
+        )
+        logger.info(
+            f"Running {sum(map(len, groups.values()))} items on {len(groups)} volumes",
+        )
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            for queue in workers:
+                executor.submit(worker, queue)
+        return results